@@ -16,21 +16,36 @@
 #
 """Bigquery implementation to read big data for manifest files."""
 import os
+import queue
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from src.config.settings import SETTINGS
+from src.source.base_source import BaseSource
 from google.cloud.bigquery.job import QueryJobConfig
 from google.cloud.bigquery.client import Client
 
+try:
+    from google.cloud import bigquery_storage_v1
+except ImportError:  # pragma: no cover
+    bigquery_storage_v1 = None
+
 logger = logging.getLogger(__name__)
 
+# Marks the end of a single read stream in the shared batch queue.
+_STREAM_DONE = object()
+
 
-class Bigquery():
+class Bigquery(BaseSource):
     """Base big query class."""
 
+    supports_query = True
+
     def __init__(self, query_job_config=None):
         """Initialize big query object."""
         self.client = None
         self.job_query_obj = None
+        self.jobs = {}
 
         self._configure_gcp_client(query_job_config)
 
@@ -52,11 +67,95 @@ class Bigquery():
         """Run the bigquery synchronously."""
         if self.client and query:
             self.job_query_obj = self.client.query(query, job_config=self.query_job_config)
+            self.jobs[self.job_query_obj.job_id] = self.job_query_obj
             return self.job_query_obj.job_id
         else:
             raise Exception('Client or query missing')
 
-    def get_result(self):
-        """Get the result of the job."""
-        assert self.job_query_obj is not None, 'Job is not initialized'
-        yield from self.job_query_obj.result()
+    def get_result(self, job_id=None, start_index=0):
+        """Get the result of the given job, the last started one by default.
+
+        Jobs started by an earlier process are looked up by id, a start index resumes
+        reading their destination table without running the query again.
+        """
+        job_query_obj = self.jobs.get(job_id) if job_id else self.job_query_obj
+        if job_query_obj is None and job_id:
+            job_query_obj = self.jobs[job_id] = self.client.get_job(job_id)
+        assert job_query_obj is not None, 'Job is not initialized'
+        if start_index:
+            job_query_obj.result()
+            yield from self.client.list_rows(job_query_obj.destination, start_index=start_index)
+        elif SETTINGS.bigquery_fetch_mode == 'storage':
+            yield from self._get_storage_result(job_query_obj)
+        else:
+            yield from job_query_obj.result()
+
+    def _get_storage_result(self, job_query_obj):
+        """Read the job destination table over parallel Storage Read API streams."""
+        if bigquery_storage_v1 is None:
+            raise Exception('google-cloud-bigquery-storage is required for storage fetch mode')
+
+        # Wait for the job, the destination table is only complete once it is done.
+        job_query_obj.result()
+        table = job_query_obj.destination
+
+        read_client = bigquery_storage_v1.BigQueryReadClient()
+        requested_session = bigquery_storage_v1.types.ReadSession(
+            table='projects/{}/datasets/{}/tables/{}'.format(
+                table.project, table.dataset_id, table.table_id),
+            data_format=bigquery_storage_v1.types.DataFormat.AVRO)
+        session = read_client.create_read_session(
+            parent='projects/{}'.format(table.project),
+            read_session=requested_session,
+            max_stream_count=SETTINGS.bigquery_read_stream_count)
+
+        streams = [stream.name for stream in session.streams]
+        logger.info('Reading result table over %d storage streams', len(streams))
+        if not streams:
+            return
+
+        batches = queue.Queue(maxsize=2 * len(streams))
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+            futures = [executor.submit(self._read_stream, read_client, session,
+                                       stream, batches, stop) for stream in streams]
+            try:
+                pending = len(streams)
+                while pending:
+                    batch = batches.get()
+                    if batch is _STREAM_DONE:
+                        pending -= 1
+                        continue
+                    yield from batch
+            finally:
+                stop.set()
+
+            for future in futures:
+                future.result()
+
+    def _read_stream(self, read_client, session, stream, batches, stop):
+        """Push rows of one read stream to the batch queue, in batch size chunks."""
+        try:
+            batch = []
+            for row in read_client.read_rows(stream).rows(session):
+                batch.append(row)
+                if len(batch) >= SETTINGS.bigquery_read_batch_size:
+                    if not self._put(batches, batch, stop):
+                        return
+                    batch = []
+
+            if batch:
+                self._put(batches, batch, stop)
+        finally:
+            self._put(batches, _STREAM_DONE, stop)
+
+    @staticmethod
+    def _put(batches, item, stop):
+        """Put an item in the queue unless the consumer has stopped reading."""
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,94 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Iterator that fetches result pages on a background thread."""
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the result in the page queue.
+_DONE = object()
+
+
+class PrefetchIterator():
+    """Iterate over rows while the next pages are fetched into a bounded queue."""
+
+    def __init__(self, rows, depth, page_size):
+        """Initialize prefetch iterator over given rows."""
+        self.rows = rows
+        self.depth = depth
+        self.page_size = page_size
+        self.consumer_wait_time = 0.0
+        self.producer_wait_time = 0.0
+
+        self._error = None
+        self._stop = threading.Event()
+
+    def __iter__(self):
+        """Yield rows, pages are fetched ahead on a background thread."""
+        pages = queue.Queue(maxsize=self.depth)
+        producer = threading.Thread(target=self._produce, args=(pages,), daemon=True)
+        producer.start()
+        try:
+            while True:
+                start = time.monotonic()
+                page = pages.get()
+                self.consumer_wait_time += time.monotonic() - start
+                if page is _DONE:
+                    break
+                yield from page
+        finally:
+            self._stop.set()
+            producer.join()
+
+        if self._error:
+            raise self._error
+
+    def _produce(self, pages):
+        """Read rows from the source and queue them page by page."""
+        try:
+            page = []
+            for row in self.rows:
+                page.append(row)
+                if len(page) >= self.page_size:
+                    if not self._put(pages, page):
+                        return
+                    page = []
+
+            if page:
+                self._put(pages, page)
+        except Exception as e:
+            logger.error('Prefetching failed with %s', e)
+            self._error = e
+        finally:
+            self._put(pages, _DONE)
+
+    def _put(self, pages, page):
+        """Put a page in the queue unless the consumer has stopped reading."""
+        start = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    pages.put(page, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.producer_wait_time += time.monotonic() - start
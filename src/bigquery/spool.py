@@ -0,0 +1,128 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Write query result rows to a compressed JSONL spool file and replay them."""
+import io
+import gzip
+import json
+import logging
+import threading
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Size of the read buffer used while replaying a spool file.
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def _is_zstd(path):
+    """Spool files ending with .zst are zstd compressed, others are gzip compressed."""
+    if not path.endswith('.zst'):
+        return False
+    if zstandard is None:
+        raise Exception('zstandard is required for zstd spool file {}'.format(path))
+    return True
+
+
+class SpoolWriter():
+    """Write rows in independently compressed chunks of JSON lines."""
+
+    def __init__(self, path, chunk_size):
+        """Open spool file for writing."""
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rows = 0
+
+        self._lock = threading.Lock()
+        self._zstd = _is_zstd(path)
+        # A zstd compressor is not thread safe, each result thread gets its own.
+        self._local = threading.local()
+        self._file = open(path, 'wb')
+        logger.info('Spooling query result rows to %s', path)
+
+    def tee(self, rows):
+        """Yield given rows while writing them to the spool file."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+            yield row
+
+        if chunk:
+            self._write_chunk(chunk)
+
+    def close(self):
+        """Close spool file."""
+        self._file.close()
+        logger.info('Spooled %d rows to %s', self.rows, self.path)
+
+    def _write_chunk(self, chunk):
+        """Compress and append a chunk, chunks from multiple threads never interleave."""
+        data = ''.join(json.dumps(self._get_record(row)) + '\n' for row in chunk).encode('utf-8')
+        data = self._compress(data)
+        with self._lock:
+            self._file.write(data)
+            self.rows += len(chunk)
+
+    def _compress(self, data):
+        """Compress a chunk into a complete gzip member or zstd frame."""
+        if not self._zstd:
+            return gzip.compress(data, compresslevel=6)
+
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor()
+        return compressor.compress(data)
+
+    @staticmethod
+    def _get_record(row):
+        """Get spooled fields of a row, count is only present for deduplicated results."""
+        record = {'path': row.get('path'), 'content': row.get('content')}
+        if row.get('count') is not None:
+            record['count'] = row.get('count')
+        return record
+
+
+class SpoolReader():
+    """Replay rows of a spool file with sequential, streaming decompression.
+
+    Uncompressed JSONL dumps ending with .jsonl are read as well.
+    """
+
+    def __init__(self, path):
+        """Initialize spool reader."""
+        self.path = path
+
+    def __iter__(self):
+        """Yield spooled rows in the order they were written."""
+        with open(self.path, 'rb', buffering=READ_BUFFER_SIZE) as raw:
+            if self.path.endswith('.jsonl'):
+                stream = raw
+            elif _is_zstd(self.path):
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            else:
+                stream = gzip.GzipFile(fileobj=raw)
+
+            with io.TextIOWrapper(io.BufferedReader(stream, READ_BUFFER_SIZE),
+                                  encoding='utf-8') as lines:
+                for line in lines:
+                    yield json.loads(line)
@@ -15,23 +15,142 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Base collector class to parse and extract dependencies from manifests."""
+from array import array
 from collections import Counter
+from src.config.settings import SETTINGS
+from src.collector.spill_counter import SpillCounter
+from src.collector.heavy_hitters import HeavyHitters
+
+# Package names of these ecosystems do not depend on case.
+CASE_INSENSITIVE_ECOSYSTEMS = ('pypi',)
 
 
 class BaseCollector:
     """Base class to handle manifests and extract dependencies."""
 
+    # Content without any of these substrings can not have dependencies, none means unknown.
+    dependency_markers = ()
+
     def __init__(self, name):
         """Collector init."""
         self.name = name
-        self.counter = Counter()
+        self._byte_markers = tuple(marker.encode() for marker in self.dependency_markers)
+        # Package sets are counted under packed arrays of interned package ids, the
+        # comma separated string of names is only built for the final output.
+        self.counter = self._get_counter()
+        self.package_ids = {}
+        self.package_names = []
+        # Equal package sets share a key, unless the legacy document order is kept.
+        self.canonical = SETTINGS.package_set_order == 'canonical'
+        self.ignore_case = name in CASE_INSENSITIVE_ECOSYSTEMS
+        # Counts added since the last checkpoint, only kept while checkpointing.
+        self.journal = None
+        # Parsing statistics, like how many manifests each parser handled.
+        self.stats = Counter()
+        # Isolated workers quarantine manifests running out of memory, elsewhere
+        # they are skipped like any other manifest that fails to parse.
+        self.raise_memory_errors = False
 
-    def _update_counter(self, packages):
-        """Add packages to a collection."""
+    def _update_counter(self, packages, count=1):
+        """Add packages to a collection, returns the key they are counted under."""
+        key = None
         if packages:
-            pkg_string = ', '.join(packages)
-            self.counter.update([pkg_string])
+            if self.canonical:
+                packages = self._get_canonical_packages(packages)
+            key = self._get_key(packages)
+            self.counter[key] += count
+            if self.journal is not None:
+                self.journal[key] += count
+        return key
+
+    def may_have_dependencies(self, content):
+        """Cheap substring search, false only for content that can not have any dependency."""
+        if not self.dependency_markers:
+            return True
+
+        if isinstance(content, bytes):
+            # Byte search does not work for UTF-16 / UTF-32 content.
+            return b'\x00' in content or any(marker in content for marker in self._byte_markers)
+        return any(marker in content for marker in self.dependency_markers)
+
+    def get_errors(self):
+        """Get max overestimation of the most_common() counts, None when counts are exact."""
+        if not isinstance(self.counter, HeavyHitters):
+            return None
+        return {self.get_package_string(key): self.counter.error(key)
+                for key, _ in self.counter.most_common()}
+
+    def close(self):
+        """Release resources of the aggregation backend, like spilled runs."""
+        if isinstance(self.counter, SpillCounter):
+            self.counter.close()
+
+    def check_parse_error(self, error):
+        """Raise an error of parsing content when it is running out of memory in a worker."""
+        if self.raise_memory_errors and isinstance(error, MemoryError):
+            raise error
+
+    def collect_package_string(self, pkg_string, count=1):
+        """Count a comma separated package string, like the ones of an existing collated file."""
+        return self._update_counter(pkg_string.split(', ') if pkg_string else None, count)
+
+    def _get_counter(self):
+        """Get an in-memory Counter, a counter spilling to disk or an approximate top-K one."""
+        if SETTINGS.aggregation_backend == 'counter':
+            return Counter()
+
+        if SETTINGS.aggregation_backend == 'spill':
+            return SpillCounter(SETTINGS.aggregation_memory_budget * 1024 * 1024,
+                                SETTINGS.aggregation_spill_path)
+
+        if SETTINGS.aggregation_backend == 'topk':
+            return HeavyHitters(SETTINGS.topk_size, SETTINGS.topk_capacity_factor)
+
+        raise Exception('Unknown aggregation backend {}'.format(SETTINGS.aggregation_backend))
+
+    def _get_canonical_packages(self, packages):
+        """Get sorted distinct package names, lower cased for case insensitive ecosystems."""
+        if self.ignore_case:
+            return sorted({package.lower() for package in packages})
+        return sorted(set(packages))
+
+    def _get_key(self, packages):
+        """Get compact key of a package set, new package names get the next id."""
+        ids = array('I')
+        for package in packages:
+            package_id = self.package_ids.get(package)
+            if package_id is None:
+                package_id = self.package_ids[package] = len(self.package_names)
+                self.package_names.append(package)
+            ids.append(package_id)
+        return ids.tobytes()
+
+    def get_packages(self, key):
+        """Get package names of a key, in the order they were collected."""
+        ids = array('I')
+        ids.frombytes(key)
+        return [self.package_names[package_id] for package_id in ids]
+
+    def get_package_string(self, key):
+        """Get comma separated package names of a key, as written to the collated output."""
+        return ', '.join(self.get_packages(key))
+
+    def most_common(self, n=None):
+        """Get (package string, count) pairs of the collection, most common first."""
+        return list(self.iter_most_common(n))
+
+    def iter_most_common(self, n=None):
+        """Yield (package string, count) pairs, package strings are built one at a time."""
+        for key, count in self.counter.most_common(n):
+            yield self.get_package_string(key), count
+
+    def collect_key(self, key, count=1):
+        """Count a package set key returned by parse_and_collect() once more."""
+        if key:
+            self.counter[key] += count
+            if self.journal is not None:
+                self.journal[key] += count
 
-    def parse_and_collect(self, _content, _validate):
-        """To be implemented by all its child ecosystem."""
+    def parse_and_collect(self, _content, _validate, _count=1):
+        """To be implemented by all its child ecosystem, returns the collected key."""
         raise Exception("Missing parse_and_collect() method implementation!!")
@@ -0,0 +1,106 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Approximate counter keeping only the most frequent keys, with Space-Saving."""
+import heapq
+
+
+class HeavyHitters():
+    """Space-Saving counter of a fixed number of keys.
+
+    When all slots are taken, a new key replaces the key with the smallest count and
+    inherits that count as its error. Every estimated count is an upper bound and
+    overestimates the true count by at most its error, which is at most N / capacity
+    for a total count N. Keys with a true count above that are always kept.
+
+    The min-heap has one entry per tracked key. Counts only grow, so an entry is only
+    refreshed with the current count when it reaches the top of the heap.
+
+    Item access supports counting with counter[key] += count, like SpillCounter.
+    """
+
+    def __init__(self, size, capacity_factor):
+        """Keep top size keys, tracking capacity_factor times as many keys."""
+        self.size = size
+        self.capacity = max(size, int(size * capacity_factor))
+        self.total = 0
+
+        # key -> [count, error, first seen sequence number]
+        self._entries = {}
+        # (count, first seen sequence number, key), the count may be older.
+        self._heap = []
+        self._next_seq = 0
+
+    def __getitem__(self, key):
+        """Get estimated count of a key, 0 when it is not tracked."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else 0
+
+    def __setitem__(self, key, count):
+        """Add the difference to the estimated count of a key."""
+        entry = self._entries.get(key)
+        if entry:
+            self._add(key, entry, count - entry[0])
+        else:
+            self._insert(key, count)
+
+    def __bool__(self):
+        """Check if anything was counted."""
+        return bool(self._entries)
+
+    def __len__(self):
+        """Get number of tracked keys."""
+        return len(self._entries)
+
+    def error(self, key):
+        """Get max overestimation of the count of a key."""
+        entry = self._entries.get(key)
+        return entry[1] if entry else 0
+
+    def most_common(self, n=None):
+        """Get (key, estimated count) pairs of the top keys, first seen first on ties."""
+        n = self.size if n is None else min(n, self.size)
+        top = heapq.nsmallest(n, self._entries.items(),
+                              key=lambda item: (-item[1][0], item[1][2]))
+        return [(key, entry[0]) for key, entry in top]
+
+    def _add(self, key, entry, count):
+        """Add to the count of a tracked key."""
+        entry[0] += count
+        self.total += count
+
+    def _insert(self, key, count):
+        """Track a new key, replacing the key with the smallest count when full."""
+        error = 0
+        if len(self._entries) >= self.capacity:
+            error = self._pop_min()
+
+        entry = self._entries[key] = [error, error, self._next_seq]
+        heapq.heappush(self._heap, (error, self._next_seq, key))
+        self._next_seq += 1
+        self._add(key, entry, count)
+
+    def _pop_min(self):
+        """Stop tracking the key with the smallest count, returns its count."""
+        while True:
+            count, seq, key = self._heap[0]
+            entry = self._entries[key]
+            if entry[0] == count:
+                heapq.heappop(self._heap)
+                del self._entries[key]
+                return count
+            # An older count is smaller, refreshing it keeps the heap order valid.
+            heapq.heapreplace(self._heap, (entry[0], seq, key))
@@ -17,7 +17,9 @@
 """Handle maven manifests and extract dependencies."""
 import logging
 from rudra.utils.mercator import SimpleMercator
+from src.config.settings import SETTINGS
 from src.collector.base_collector import BaseCollector
+from src.collector.maven_extractor import extract_dependencies
 
 logger = logging.getLogger(__name__)
 
@@ -25,25 +27,36 @@ logger = logging.getLogger(__name__)
 class MavenCollector(BaseCollector):
     """Handle maven manifests and extract dependencies."""
 
+    # Every collected dependency is a <dependency> element, tag names can not be escaped.
+    dependency_markers = ('dependency',)
+
     def __init__(self):
         """Maven collectors init."""
         super().__init__('maven')
+        self.streaming = SETTINGS.maven_parser == 'streaming'
 
-    def parse_and_collect(self, content, _):
+    def parse_and_collect(self, content, _, count=1):
         """Parse dependencies and add it to collection."""
         result = list()
         allowed_scopes = ['compile', 'run', 'provided']
 
         try:
-            mercator_ins = SimpleMercator(content)
-            for dep in mercator_ins.get_dependencies():
-                scope, aid, gid = str(dep.scope), str(
-                    dep.artifact_id), str(dep.group_id)
-
+            for gid, aid, scope in self._get_dependencies(content):
                 if scope in allowed_scopes and aid and gid:
                     result.append('{g}:{a}'.format(
                         g=gid.strip(), a=aid.strip()))
         except Exception as e:
+            self.check_parse_error(e)
             logger.warning('Error in content, it raises %s', e)
 
-        self._update_counter(result)
+        return self._update_counter(result, count)
+
+    def _get_dependencies(self, content):
+        """Yield (group id, artifact id, scope) of all dependencies in the manifest."""
+        if self.streaming:
+            yield from extract_dependencies(content)
+            return
+
+        mercator_ins = SimpleMercator(content)
+        for dep in mercator_ins.get_dependencies():
+            yield str(dep.group_id), str(dep.artifact_id), str(dep.scope)
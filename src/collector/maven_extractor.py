@@ -0,0 +1,73 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Stream pom.xml and extract direct dependencies without building the document tree."""
+import xml.etree.ElementTree as ET
+
+# Content is fed to the pull parser in chunks, so parsing stops once dependencies are read.
+CHUNK_SIZE = 64 * 1024
+
+DEPENDENCIES_PATH = ['project', 'dependencies']
+DEPENDENCY_PATH = DEPENDENCIES_PATH + ['dependency']
+
+
+def _local_name(tag):
+    """Strip namespace of a tag like {http://maven.apache.org/POM/4.0.0}groupId."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element, name):
+    """Get stripped text of a child element by local name."""
+    for child in element:
+        if _local_name(child.tag) == name:
+            return (child.text or '').strip()
+    return ''
+
+
+def extract_dependencies(content):
+    """Get (group_id, artifact_id, scope) of every project/dependencies/dependency element.
+
+    Elements are cleared as soon as they are read and parsing stops once the
+    project dependencies section is closed. Scope defaults to compile.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    dependencies = []
+    elements = []
+    path = []
+
+    for start in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[start:start + CHUNK_SIZE])
+        for event, element in parser.read_events():
+            if event == 'start':
+                path.append(_local_name(element.tag))
+                elements.append(element)
+                continue
+
+            if path == DEPENDENCY_PATH:
+                dependencies.append((_child_text(element, 'groupId'),
+                                     _child_text(element, 'artifactId'),
+                                     _child_text(element, 'scope') or 'compile'))
+            elif path == DEPENDENCIES_PATH:
+                return dependencies
+
+            path.pop()
+            elements.pop()
+            # Children of a dependency are read when the dependency ends, others are dropped.
+            if elements and path[:3] != DEPENDENCY_PATH:
+                elements[-1].remove(element)
+
+    parser.close()
+    return dependencies
@@ -16,33 +16,88 @@
 #
 """Handle NPM manifests and extract dependencies."""
 import re
+import json
 import demjson
 import logging
+from src.config.settings import SETTINGS
 from src.collector.base_collector import BaseCollector
+from src.collector.npm_extractor import extract_dependencies, recover_dependencies
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# C accelerated parser for strict JSON, demjson only handles the rest.
+_decode_json = orjson.loads if orjson else json.loads
+
+
+def _demjson_decode(content):
+    """Decode with demjson, running out of memory is raised as it is and not as bad content."""
+    try:
+        return demjson.decode(content)
+    except demjson.JSONError as e:
+        if isinstance(e.__context__, MemoryError):
+            raise e.__context__
+        raise
+
 
 class NpmCollector(BaseCollector):
     """Handle NPM manifests and extract dependencies."""
 
+    # A dependencies key is only hidden from a substring search by escapes in the key.
+    dependency_markers = ('dependencies', '\\')
+
     def __init__(self):
         """Npm collector init."""
         super().__init__('npm')
+        self.streaming = SETTINGS.npm_parser == 'streaming'
 
-    def parse_and_collect(self, content, _):
+    def parse_and_collect(self, content, _, count=1):
         """Parse dependencies and add it to collection."""
         content = content.decode() if not isinstance(content, str) else content
+        if self.streaming:
+            return self._update_counter(self._extract(content), count)
+
         dependencies = {}
+        decoded_json = self._decode(content)
+        if decoded_json and isinstance(decoded_json, dict):
+            dependencies = decoded_json.get('dependencies', {})
+
+        packages = list(dependencies.keys()) if isinstance(dependencies, dict) else []
+        return self._update_counter(packages, count)
+
+    def _extract(self, content):
+        """Scan only top-level dependencies, corrupt content is recovered in linear time."""
+        dependencies = extract_dependencies(content)
+        if dependencies is not None:
+            self.stats['streaming'] += 1
+            return dependencies
+
+        self.stats['recovered'] += 1
+        return recover_dependencies(content)
+
+    def _decode(self, content):
+        """Decode with the fastest parser accepting the content, counts the tier used."""
+        try:
+            decoded_json = _decode_json(content)
+            self.stats['json'] += 1
+            return decoded_json
+        except Exception as e:
+            self.check_parse_error(e)
+
         try:
-            decoded_json = demjson.decode(content)
+            decoded_json = _demjson_decode(content)
+            self.stats['demjson'] += 1
+            return decoded_json
         except Exception as e:
+            self.check_parse_error(e)
             logger.warning('Error in content, it raises %s', e)
-            decoded_json = self._handle_corrupt_packagejson(content)
-        if decoded_json and isinstance(decoded_json, dict):
-            dependencies = decoded_json.get('dependencies', {})
 
-        self._update_counter(list(dependencies.keys() if isinstance(dependencies, dict) else []))
+        self.stats['corrupt'] += 1
+        return self._handle_corrupt_packagejson(content)
 
     def _handle_corrupt_packagejson(self, content):
         """Find dependencies from corrupted/invalid package.json."""
@@ -61,7 +116,8 @@ class NpmCollector(BaseCollector):
                         dependencies.append('"{}": "{}"'.format(
                             matches['pkg'], matches['ver']))
 
-            return demjson.decode('{"dependencies": {%s}}' % ', '.join(dependencies))
+            return _demjson_decode('{"dependencies": {%s}}' % ', '.join(dependencies))
         except Exception as e:
+            self.check_parse_error(e)
             logger.warning('Error in content, it raises %s', e)
             return {}
@@ -0,0 +1,144 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Extract top-level dependencies of package.json without decoding the whole document."""
+import re
+import json
+
+# Strings (an unterminated one runs to the end of content) and structural characters,
+# anything else like numbers, literals and whitespace is skipped by the regex engine.
+# The unrolled string pattern never backtracks, so a scan is linear in the content size.
+_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}\[\]:,]')
+_OPENING = {'}': '{', ']': '['}
+
+# Recovery of corrupt manifests, a dependencies key followed by an object. Bare keys
+# of non-strict JSON only start after a character which cannot be part of them.
+_DEPENDENCIES = re.compile(r'dependencies[\'"]?\s*:\s*\{')
+_DEPENDENCY = re.compile(
+    r'["\']([^"\'\n]*)["\']\s*:\s*["\']|(?<![\w$@/.-])([\w$@/.-]+)\s*:\s*["\']')
+
+
+def _is_terminated(token):
+    """Check a string token has an unescaped closing quote."""
+    if len(token) < 2 or token[-1] != '"':
+        return False
+    backslashes = len(token) - 1 - len(token[:-1].rstrip('\\'))
+    return backslashes % 2 == 0
+
+
+def _decode_string(token):
+    """Decode a terminated string token, None when it has invalid escapes."""
+    if '\\' not in token:
+        return token[1:-1]
+    try:
+        return json.loads(token)
+    except ValueError:
+        return None
+
+
+def extract_dependencies(content):
+    """Get keys of the top-level dependencies object of package.json content.
+
+    Only keys of the top-level object and of its dependencies object are decoded,
+    other values are skipped. Returns None when content is not well formed, like
+    unbalanced brackets, unterminated strings, keys which are not double quoted
+    strings or data after the top-level value.
+    """
+    containers = []
+    done = False
+    expect_key = False
+    last_string = None
+    in_dependencies = False
+    expect_dependencies = False
+    dependencies = {}
+
+    for match in _TOKENS.finditer(content):
+        token = content[match.start()]
+        if done:
+            return None
+
+        if expect_key and token not in '"}':
+            # Single quoted or bare keys of non-strict JSON are skipped by the tokenizer.
+            return None
+        expect_key = False
+
+        if expect_dependencies and token not in '{[':
+            # Dependencies value is a scalar, a later duplicate key replaces the value.
+            dependencies = {}
+            expect_dependencies = False
+
+        if token == '"':
+            # Only the last token can run to the end of content without a closing quote.
+            if match.end() == len(content) and not _is_terminated(match.group()):
+                return None
+            if len(containers) == 1 or (in_dependencies and len(containers) == 2):
+                last_string = match.group()
+            continue
+
+        if token == ':':
+            if last_string is not None:
+                key = _decode_string(last_string)
+                if key is None:
+                    return None
+                if len(containers) == 1:
+                    expect_dependencies = key == 'dependencies'
+                else:
+                    dependencies[key] = None
+            last_string = None
+            continue
+
+        last_string = None
+        if token == ',':
+            expect_key = containers[-1:] == ['{']
+        elif token in '{[':
+            containers.append(token)
+            expect_key = token == '{'
+            if expect_dependencies:
+                # A later duplicate key replaces the value, like json does.
+                dependencies = {}
+                in_dependencies = token == '{'
+                expect_dependencies = False
+        else:
+            if not containers or containers.pop() != _OPENING[token]:
+                return None
+            if len(containers) == 1:
+                in_dependencies = False
+            done = not containers
+
+    if not done:
+        return None
+    return list(dependencies.keys())
+
+
+def recover_dependencies(content):
+    """Find dependencies of a corrupt package.json, in linear time.
+
+    Keys of the first dependencies object followed by a closing brace are returned,
+    matching the entries the regex based recovery of the npm collector finds, bare
+    keys of non-strict JSON included.
+    """
+    for match in _DEPENDENCIES.finditer(content):
+        end = content.find('}', match.end())
+        if end < 0:
+            # No later dependencies object can be closed either.
+            return []
+
+        dependencies = {}
+        for dependency in _DEPENDENCY.finditer(content, match.end(), end):
+            dependencies[dependency.group(dependency.lastindex)] = None
+        return list(dependencies.keys())
+
+    return []
@@ -0,0 +1,80 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Memoize package set keys of manifests by a hash of their content."""
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+def content_digest(content):
+    """Get a fast 128 bit hash of manifest content."""
+    if isinstance(content, str):
+        content = content.encode('utf-8', 'surrogatepass')
+    if xxhash:
+        return xxhash.xxh3_128_digest(content)
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class ParseCache():
+    """Bounded cache of the package set key every collector produced for a content."""
+
+    def __init__(self, size, policy='lru'):
+        """Initialize cache with max number of entries and eviction policy."""
+        if policy not in EVICTION_POLICIES:
+            raise Exception('Unknown parse cache eviction policy {}'.format(policy))
+
+        self.size = size
+        self.policy = policy
+        self.stats = Counter()
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse_and_collect(self, collector, content, validate, count=1):
+        """Collect content with the collector, known contents are not parsed again."""
+        digest = (collector.name, bool(validate), content_digest(content))
+        with self._lock:
+            found = digest in self._entries
+            if found:
+                key = self._entries[digest]
+                if self.policy == 'lru':
+                    self._entries.move_to_end(digest)
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+
+        if found:
+            collector.collect_key(key, count)
+            return key
+
+        key = collector.parse_and_collect(content, validate, count)
+        with self._lock:
+            self._entries[digest] = key
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return key
@@ -15,13 +15,21 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Handle Pypi manifests and extract dependencies."""
+import re
 import logging
 from rudra.utils.pypi_parser import pip_req
 from rudra.utils.validation import BQValidation
+from src.config.settings import SETTINGS
 from src.collector.base_collector import BaseCollector
+from src.collector import pypi_parser
+from src.collector.validation_cache import ValidationCache
 
 logger = logging.getLogger(__name__)
 
+# Content of only blank and comment lines.
+_EMPTY_REQUIREMENTS = re.compile(r'(?:[ \t\r\f\v]*(?:#[^\n]*)?\n)*[ \t\r\f\v]*(?:#[^\n]*)?')
+_EMPTY_REQUIREMENTS_BYTES = re.compile(_EMPTY_REQUIREMENTS.pattern.encode())
+
 
 class PypiCollector(BaseCollector):
     """Handle Pypi manifests and extract dependencies."""
@@ -30,15 +38,55 @@ class PypiCollector(BaseCollector):
         """Initialize BG validation."""
         super().__init__('pypi')
         self.bq_validation = BQValidation()
+        self.native = SETTINGS.pypi_parser == 'native'
+        # Run wide validation verdict of each package name seen so far.
+        self.verdicts = {}
+        # Verdicts of previous runs, shared through a sqlite file.
+        self.validation_cache = None
+        if SETTINGS.pypi_validation_cache_path:
+            self.validation_cache = ValidationCache(SETTINGS.pypi_validation_cache_path,
+                                                    SETTINGS.pypi_validation_cache_ttl)
 
-    def parse_and_collect(self, content, validate):
+    def parse_and_collect(self, content, validate, count=1):
         """Parse dependencies and add it to collection."""
         packages = None
         try:
-            packages = sorted({p for p in pip_req.parse_requirements(content)})
+            packages = sorted({p for p in self._parse_requirements(content)})
             if validate:
-                packages = sorted(self.bq_validation.validate_pypi(packages))
+                packages = self._validate(packages)
         except Exception as e:
+            self.check_parse_error(e)
             logger.warning('Error in content, it raises %s', e)
 
-        self._update_counter(packages)
+        return self._update_counter(packages, count)
+
+    def may_have_dependencies(self, content):
+        """Check that there is any line other than blank and comment lines."""
+        if isinstance(content, bytes):
+            return b'\x00' in content or not _EMPTY_REQUIREMENTS_BYTES.fullmatch(content)
+        return not _EMPTY_REQUIREMENTS.fullmatch(content)
+
+    def _parse_requirements(self, content):
+        """Get names of required packages, with the native line parser by default."""
+        if self.native:
+            return pypi_parser.parse_requirements(content)
+        return pip_req.parse_requirements(content)
+
+    def _validate(self, packages):
+        """Keep valid packages, each distinct name is validated only once per run."""
+        unseen = [p for p in packages if p not in self.verdicts]
+        if unseen and self.validation_cache is not None:
+            cached = self.validation_cache.get_many(unseen)
+            self.verdicts.update(cached)
+            self.stats['validation_cache_hits'] += len(cached)
+            unseen = [p for p in unseen if p not in cached]
+
+        if unseen:
+            valid = set(self.bq_validation.validate_pypi(unseen))
+            verdicts = {name: name in valid for name in unseen}
+            self.verdicts.update(verdicts)
+            if self.validation_cache is not None:
+                self.validation_cache.put_many(verdicts)
+            self.stats['validated'] += len(unseen)
+
+        return [p for p in packages if self.verdicts[p]]
@@ -0,0 +1,76 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Single pass requirements.txt parser returning the names of required packages."""
+import re
+
+# Comment starts a line or follows whitespace, like in pip requirement files.
+_COMMENT = re.compile(r'(^|\s+)#.*$')
+_COMMENT_LINE = re.compile(r'^\s*#')
+# PEP 508 name followed by the end of line, extras, version specifier, marker or URL.
+_NAME = re.compile(r'([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:$|[\[(<>=!~;@,])')
+_EGG = re.compile(r'[#&]egg=([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+# Only editable options name a requirement, others like -r, -c or -i are ignored.
+_EDITABLE_OPTIONS = ('-e', '--editable')
+
+
+def _logical_lines(content):
+    """Yield lines with continuations joined and comments removed."""
+    line = ''
+    for physical_line in content.splitlines():
+        if _COMMENT_LINE.match(physical_line):
+            # Comment lines are never continued and end a continued line, like in pip.
+            physical_line = ' ' + physical_line
+        elif physical_line.endswith('\\'):
+            line += physical_line[:-1]
+            continue
+        line += physical_line
+        yield _COMMENT.sub('', line).strip()
+        line = ''
+
+    if line:
+        yield _COMMENT.sub('', line).strip()
+
+
+def _get_name(line):
+    """Get the package name required by a logical line, None when there is none."""
+    if line.startswith('-'):
+        option, _, value = line.partition(' ')
+        if '=' in option:
+            option, _, value = line.partition('=')
+        if option not in _EDITABLE_OPTIONS:
+            # -r / -c includes, index options and hashes are ignored.
+            return None
+        line = value.strip()
+
+    name = _NAME.match(line)
+    if name:
+        return name.group(1)
+
+    # URL or local path, only named through an #egg= fragment.
+    egg = _EGG.search(line)
+    return egg.group(1) if egg else None
+
+
+def parse_requirements(content):
+    """Get lower case names of all packages required in requirements.txt content."""
+    names = []
+    for line in _logical_lines(content):
+        name = _get_name(line) if line else None
+        if name:
+            names.append(name.lower())
+    return names
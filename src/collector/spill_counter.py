@@ -0,0 +1,198 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Counter that spills sorted runs to local disk when over a memory budget."""
+import heapq
+import struct
+import logging
+import tempfile
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# Record of a run: key length, count and first seen sequence number, then the key.
+_RECORD = struct.Struct('>IQQ')
+# Rough size of a buffered entry next to its key: dict slot, count and key objects.
+ENTRY_OVERHEAD = 150
+# Buffer size of run files.
+RUN_BUFFER_SIZE = 1024 * 1024
+# Max number of runs merged at once, more runs are first merged in several passes.
+MAX_MERGE_WIDTH = 64
+
+
+def _write_run(path, records):
+    """Write (key, count, seq) records to a run file."""
+    with open(path, 'wb', buffering=RUN_BUFFER_SIZE) as f:
+        for key, count, seq in records:
+            f.write(_RECORD.pack(len(key), count, seq))
+            f.write(key)
+
+
+def _read_run(path):
+    """Yield (key, count, seq) records of a run file."""
+    with open(path, 'rb', buffering=RUN_BUFFER_SIZE) as f:
+        while True:
+            header = f.read(_RECORD.size)
+            if not header:
+                return
+            length, count, seq = _RECORD.unpack(header)
+            yield f.read(length), count, seq
+
+
+def _count_order(record):
+    """Sort key of a (key, count, seq) record, most common first and first seen first on ties."""
+    return -record[1], record[2]
+
+
+class SpillCounter():
+    """Count bytes keys in a bounded buffer, spilled to sorted runs on local disk.
+
+    Item access only sees the in-memory buffer, it supports counting with
+    counter[key] += count. most_common() merges the buffer and all runs and
+    returns the same order as collections.Counter would.
+    """
+
+    def __init__(self, memory_budget, directory=None):
+        """Initialize counter with a memory budget in bytes, runs go to a temporary directory."""
+        self.memory_budget = memory_budget
+        self.spills = 0
+
+        self._buffer = {}
+        self._seqs = {}
+        self._size = 0
+        self._next_seq = 0
+        self._runs = []
+        self._directory = None
+        self._directory_path = directory
+
+    def __getitem__(self, key):
+        """Get buffered count of a key."""
+        return self._buffer.get(key, 0)
+
+    def __setitem__(self, key, count):
+        """Set buffered count of a key, the buffer is spilled when over the memory budget."""
+        if key not in self._buffer:
+            self._size += len(key) + ENTRY_OVERHEAD
+            self._seqs[key] = self._next_seq
+            self._next_seq += 1
+        self._buffer[key] = count
+
+        if self._size > self.memory_budget:
+            self.spill()
+
+    def __bool__(self):
+        """Check if anything was counted."""
+        return bool(self._buffer or self._runs)
+
+    def spill(self):
+        """Write buffered counts to a run sorted by key and empty the buffer."""
+        if not self._buffer:
+            return
+
+        path = self._get_run_path()
+        _write_run(path, ((key, self._buffer[key], self._seqs[key])
+                          for key in sorted(self._buffer)))
+        self._runs.append(path)
+        self.spills += 1
+        logger.debug('Spilled %d keys to %s', len(self._buffer), path)
+
+        self._buffer = {}
+        self._seqs = {}
+        self._size = 0
+
+    def most_common(self, n=None):
+        """Iterate over (key, count) pairs, most common first and first seen first on ties."""
+        if not self._runs:
+            # Keys are buffered in first seen order, a stable sort keeps it for ties.
+            items = sorted(self._buffer.items(), key=lambda item: item[1], reverse=True)
+            return iter(items[:n] if n is not None else items)
+
+        self.spill()
+        logger.info('Merging %d spilled runs', len(self._runs))
+        while len(self._runs) > MAX_MERGE_WIDTH:
+            runs, self._runs = self._runs[:MAX_MERGE_WIDTH], self._runs[MAX_MERGE_WIDTH:]
+            self._runs.append(self._write_merged_run(self._merge_runs(runs)))
+
+        ordered = self._sort_by_count(self._merge_runs(self._runs))
+        return islice(ordered, n) if n is not None else ordered
+
+    def close(self):
+        """Remove spilled runs."""
+        self._buffer = {}
+        self._seqs = {}
+        self._runs = []
+        if self._directory:
+            self._directory.cleanup()
+            self._directory = None
+
+    def _merge_runs(self, runs):
+        """K-way merge runs sorted by key, yields total count and first seen seq of each key."""
+        key, count, seq = None, 0, 0
+        for run_key, run_count, run_seq in heapq.merge(*[_read_run(path) for path in runs]):
+            if run_key == key:
+                count += run_count
+                seq = min(seq, run_seq)
+                continue
+
+            if key is not None:
+                yield key, count, seq
+            key, count, seq = run_key, run_count, run_seq
+
+        if key is not None:
+            yield key, count, seq
+
+    def _sort_by_count(self, records):
+        """External sort of (key, count, seq) records by descending count and ascending seq."""
+        runs = []
+        chunk, size = [], 0
+        for record in records:
+            chunk.append(record)
+            size += len(record[0]) + ENTRY_OVERHEAD
+            if size > self.memory_budget:
+                runs.append(self._write_sorted_chunk(chunk))
+                chunk, size = [], 0
+
+        if not runs:
+            chunk.sort(key=_count_order)
+        else:
+            runs.append(self._write_sorted_chunk(chunk))
+            while len(runs) > MAX_MERGE_WIDTH:
+                merged = heapq.merge(*[_read_run(path) for path in runs[:MAX_MERGE_WIDTH]],
+                                     key=_count_order)
+                runs = runs[MAX_MERGE_WIDTH:] + [self._write_merged_run(merged)]
+            chunk = heapq.merge(*[_read_run(path) for path in runs], key=_count_order)
+
+        for key, count, _ in chunk:
+            yield key, count
+
+    def _write_sorted_chunk(self, chunk):
+        """Write a chunk of records to a run sorted by count, returns its path."""
+        chunk.sort(key=_count_order)
+        return self._write_merged_run(chunk)
+
+    def _write_merged_run(self, records):
+        """Write ordered records to a new run, returns its path."""
+        path = self._get_run_path()
+        _write_run(path, records)
+        self.spills += 1
+        return path
+
+    def _get_run_path(self):
+        """Get path of a new run file."""
+        if self._directory is None:
+            self._directory = tempfile.TemporaryDirectory(prefix='spill-counter-',
+                                                          dir=self._directory_path or None)
+        return '{}/run-{}'.format(self._directory.name, self.spills)
@@ -0,0 +1,82 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Persistent cache of PyPI package name validation verdicts."""
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Max number of names looked up in a single query, below sqlite's host parameter limit.
+_LOOKUP_CHUNK_SIZE = 500
+
+
+class ValidationCache():
+    """Verdicts of package names in a sqlite file, entries older than the ttl are ignored."""
+
+    def __init__(self, path, ttl):
+        """Open or create the cache file, ttl is in seconds."""
+        self.path = path
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS verdicts '
+                         '(name TEXT PRIMARY KEY, valid INTEGER NOT NULL, '
+                         'checked_at REAL NOT NULL)')
+        self._db.commit()
+
+    def get_many(self, names):
+        """Get fresh verdicts of given names, names without one are left out."""
+        names = list(names)
+        oldest = time.time() - self.ttl
+        verdicts = {}
+        with self._lock:
+            for i in range(0, len(names), _LOOKUP_CHUNK_SIZE):
+                chunk = names[i:i + _LOOKUP_CHUNK_SIZE]
+                rows = self._db.execute(
+                    'SELECT name, valid FROM verdicts WHERE checked_at >= ? AND name IN ({})'
+                    .format(', '.join('?' * len(chunk))), [oldest] + chunk)
+                verdicts.update((name, bool(valid)) for name, valid in rows)
+        return verdicts
+
+    def put_many(self, verdicts):
+        """Store verdicts of names, replacing the previous ones."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany('INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)',
+                                 [(name, int(valid), now) for name, valid in verdicts.items()])
+            self._db.commit()
+
+    def expire(self):
+        """Delete entries older than the ttl, returns the number of deleted entries."""
+        with self._lock:
+            deleted = self._db.execute('DELETE FROM verdicts WHERE checked_at < ?',
+                                       (time.time() - self.ttl,)).rowcount
+            self._db.commit()
+        return deleted
+
+    def __len__(self):
+        """Get number of cached verdicts, including expired ones."""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    def close(self):
+        """Close the cache file."""
+        with self._lock:
+            self._db.close()
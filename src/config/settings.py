@@ -26,6 +26,46 @@ class Settings(BaseSettings):
     use_cloud_services = Field(env="USE_CLOUD_SERVICES", default=True)
     logging_level = Field(env="JOB_LOGGING_LEVEL", default=logging.getLevelName(logging.INFO))
     bigquery_credentials_filepath = Field(env="BIGQUERY_CREDENTIALS_FILEPATH", default="")
+    bigquery_fetch_mode = Field(env="BIGQUERY_FETCH_MODE", default="rest")
+    bigquery_read_stream_count = Field(env="BIGQUERY_READ_STREAM_COUNT", default=4)
+    bigquery_read_batch_size = Field(env="BIGQUERY_READ_BATCH_SIZE", default=1000)
+    bigquery_query_mode = Field(env="BIGQUERY_QUERY_MODE", default="per_ecosystem")
+    bigquery_dedup_content = Field(env="BIGQUERY_DEDUP_CONTENT", default=False)
+    job_ecosystems = Field(env="JOB_ECOSYSTEMS", default="")
+    prefetch_queue_depth = Field(env="PREFETCH_QUEUE_DEPTH", default=0)
+    prefetch_page_size = Field(env="PREFETCH_PAGE_SIZE", default=1000)
+    spool_path = Field(env="SPOOL_PATH", default="")
+    spool_chunk_size = Field(env="SPOOL_CHUNK_SIZE", default=1000)
+    row_source_path = Field(env="ROW_SOURCE_PATH", default="")
+    prefilter_manifests = Field(env="PREFILTER_MANIFESTS", default=True)
+    parse_cache_size = Field(env="PARSE_CACHE_SIZE", default=0)
+    parse_cache_policy = Field(env="PARSE_CACHE_POLICY", default="lru")
+    npm_parser = Field(env="NPM_PARSER", default="tiered")
+    maven_parser = Field(env="MAVEN_PARSER", default="mercator")
+    pypi_parser = Field(env="PYPI_PARSER", default="native")
+    package_set_order = Field(env="PACKAGE_SET_ORDER", default="canonical")
+    aggregation_backend = Field(env="AGGREGATION_BACKEND", default="counter")
+    aggregation_memory_budget = Field(env="AGGREGATION_MEMORY_BUDGET", default=256)
+    aggregation_spill_path = Field(env="AGGREGATION_SPILL_PATH", default="")
+    topk_size = Field(env="TOPK_SIZE", default=10000)
+    topk_capacity_factor = Field(env="TOPK_CAPACITY_FACTOR", default=4)
+    pypi_validation_cache_path = Field(env="PYPI_VALIDATION_CACHE_PATH", default="")
+    pypi_validation_cache_ttl = Field(env="PYPI_VALIDATION_CACHE_TTL", default=30 * 24 * 3600)
+    collector_workers = Field(env="COLLECTOR_WORKERS", default=0)
+    collector_batch_size = Field(env="COLLECTOR_BATCH_SIZE", default=500)
+    isolated_parsing = Field(env="ISOLATED_PARSING", default=False)
+    isolated_parse_timeout = Field(env="ISOLATED_PARSE_TIMEOUT", default=30)
+    isolated_parse_memory_limit = Field(env="ISOLATED_PARSE_MEMORY_LIMIT", default=1024)
+    quarantine_path = Field(env="QUARANTINE_PATH", default="quarantine.jsonl")
+    checkpoint_path = Field(env="CHECKPOINT_PATH", default="")
+    checkpoint_interval = Field(env="CHECKPOINT_INTERVAL", default=600)
+    checkpoint_s3 = Field(env="CHECKPOINT_S3", default=False)
+    shard_run_id = Field(env="SHARD_RUN_ID", default="latest")
+    reducer_wait_timeout = Field(env="REDUCER_WAIT_TIMEOUT", default=0)
+    output_streaming = Field(env="OUTPUT_STREAMING", default=False)
+    multipart_part_size = Field(env="MULTIPART_PART_SIZE", default=8)
+    output_layout = Field(env="OUTPUT_LAYOUT", default="collated")
+    output_compression = Field(env="OUTPUT_COMPRESSION", default="")
 
 
 class AWSSettings(BaseSettings):
@@ -36,6 +76,11 @@ class AWSSettings(BaseSettings):
     s3_secret_access_key = Field(env="AWS_S3_SECRET_ACCESS_KEY", default="")
     s3_bucket_name = Field(env="AWS_S3_BUCKET_NAME", default="developer-analytics-audit-report")
     s3_collated_filename = Field(env="AWS_S3_COLLATED_FILENAME", default="collated.json")
+    s3_collated_errors_filename = Field(env="AWS_S3_COLLATED_ERRORS_FILENAME",
+                                        default="collated_errors.json")
+    s3_index_filename = Field(env="AWS_S3_INDEX_FILENAME", default="index.json")
+    s3_pypi_validation_cache_filename = Field(env="AWS_S3_PYPI_VALIDATION_CACHE_FILENAME",
+                                              default="pypi_validation_cache.sqlite")
 
 
 SETTINGS = Settings()
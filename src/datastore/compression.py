@@ -0,0 +1,101 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Compress objects while they are written, gzip or zstd."""
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# File extension of each codec.
+CODECS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# Objects are stored as compressed files, a Content-Encoding would make HTTP clients
+# decompress them on download, behind the back of readers going by the extension.
+CONTENT_TYPES = {
+    '': 'application/json',
+    'gzip': 'application/gzip',
+    'zstd': 'application/zstd',
+}
+
+# Compressed data is only produced once this much input is buffered.
+BUFFER_SIZE = 64 * 1024
+
+
+def get_extension(encoding):
+    """Get file extension of an encoding, empty for uncompressed output.
+
+    Raises for an unknown encoding, or one whose codec is not installed.
+    """
+    if not encoding:
+        return ''
+    if encoding not in CODECS:
+        raise Exception('Unknown output compression {}'.format(encoding))
+    if encoding == 'zstd' and zstandard is None:
+        raise Exception('zstandard is required for zstd output compression')
+    return CODECS[encoding]
+
+
+def get_encoding(filename):
+    """Get encoding of a file from its extension, empty for an uncompressed file."""
+    for encoding, extension in CODECS.items():
+        if filename.endswith(extension):
+            return encoding
+    return ''
+
+
+class CompressingWriter():
+    """Binary writer compressing its content into another writer, one buffer at a time."""
+
+    def __init__(self, stream, encoding, level=None):
+        """Initialize writer with a compressor of the encoding."""
+        self.stream = stream
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        if encoding == 'gzip':
+            # wbits of 31 writes a gzip header and trailer, with a zero modification time.
+            self._compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        elif encoding == 'zstd':
+            if zstandard is None:
+                raise Exception('zstandard is required for zstd output compression')
+            self._compressor = zstandard.ZstdCompressor(
+                level=3 if level is None else level).compressobj()
+        else:
+            raise Exception('Unknown output compression {}'.format(encoding))
+
+    def write(self, data):
+        """Buffer data, compressing it whenever the buffer is full."""
+        self._buffer += data
+        self.bytes_written += len(data)
+        if len(self._buffer) >= BUFFER_SIZE:
+            self._compress()
+        return len(data)
+
+    def close(self):
+        """Compress the rest of the data and write the end of the compressed stream."""
+        self._compress()
+        self.stream.write(self._compressor.flush())
+
+    def _compress(self):
+        compressed = self._compressor.compress(bytes(self._buffer))
+        self._buffer = bytearray()
+        if compressed:
+            self.stream.write(compressed)
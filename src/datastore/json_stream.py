@@ -0,0 +1,45 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Serialize JSON objects chunk by chunk, without building the whole string."""
+import json
+
+
+def iter_json_object(items):
+    """Yield UTF-8 chunks of a JSON object of (key, value) items, as json.dumps() writes it.
+
+    A dict value is written at once, any other value is an iterable of (key, value)
+    pairs written one pair at a time as a nested object.
+    """
+    yield b'{'
+    for index, (key, value) in enumerate(items):
+        prefix = ', ' if index else ''
+        if isinstance(value, dict):
+            yield '{}{}: {}'.format(prefix, json.dumps(key), json.dumps(value)).encode('utf-8')
+            continue
+
+        yield '{}{}: '.format(prefix, json.dumps(key)).encode('utf-8')
+        yield from iter_json_pairs(value)
+    yield b'}'
+
+
+def iter_json_pairs(pairs):
+    """Yield UTF-8 chunks of a flat JSON object of (key, value) pairs, one pair at a time."""
+    yield b'{'
+    for index, (key, value) in enumerate(pairs):
+        yield '{}{}: {}'.format(', ' if index else '', json.dumps(key),
+                                json.dumps(value)).encode('utf-8')
+    yield b'}'
@@ -0,0 +1,90 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Local filesystem stand-in of the S3 client calls used by the persistence store."""
+import os
+import uuid
+import shutil
+import hashlib
+
+
+class LocalS3Client():
+    """Keep objects as files under root/<bucket>/<key>, like a boto3 S3 client would in S3.
+
+    Only the calls used by the job are implemented, with the same arguments and results.
+    """
+
+    def __init__(self, root, min_part_size=0):
+        """Initialize client storing objects under root."""
+        self.root = root
+        self.min_part_size = min_part_size
+        self.metadata = {}
+        self._uploads = {}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        """Start a multipart upload, parts are kept in a temporary directory."""
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.root, '.uploads', upload_id)
+        os.makedirs(path)
+        self._uploads[upload_id] = (Bucket, Key, path, kwargs)
+        return {'Bucket': Bucket, 'Key': Key, 'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, PartNumber, UploadId, Body):
+        """Store a part of an upload."""
+        _, _, path, _ = self._uploads[UploadId]
+        with open(os.path.join(path, str(PartNumber)), 'wb') as f:
+            f.write(Body)
+        return {'ETag': '"{}"'.format(hashlib.md5(Body).hexdigest())}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        """Concatenate the parts into the object."""
+        _, _, path, kwargs = self._uploads.pop(UploadId)
+        parts = MultipartUpload['Parts']
+        for part in parts[:-1]:
+            if os.path.getsize(os.path.join(path, str(part['PartNumber']))) < self.min_part_size:
+                raise Exception('Part {} is too small'.format(part['PartNumber']))
+
+        with open(self._get_path(Bucket, Key, create=True), 'wb') as f:
+            for part in parts:
+                with open(os.path.join(path, str(part['PartNumber'])), 'rb') as part_file:
+                    shutil.copyfileobj(part_file, f)
+        shutil.rmtree(path)
+        self.metadata[(Bucket, Key)] = kwargs
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        """Drop the parts of an upload."""
+        _, _, path, _ = self._uploads.pop(UploadId)
+        shutil.rmtree(path)
+        return {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        """Store an object at once."""
+        with open(self._get_path(Bucket, Key, create=True), 'wb') as f:
+            f.write(Body)
+        self.metadata[(Bucket, Key)] = kwargs
+        return {}
+
+    def get_object(self, Bucket, Key):
+        """Get an object, its body is an open binary file."""
+        return dict(self.metadata.get((Bucket, Key), {}),
+                    Body=open(self._get_path(Bucket, Key), 'rb'))
+
+    def _get_path(self, bucket, key, create=False):
+        path = os.path.join(self.root, bucket, key)
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
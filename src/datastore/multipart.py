@@ -0,0 +1,96 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Upload an object of unknown size in parts, holding only one part in memory."""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# S3 accepts parts of at least 5 MiB, but for the last one, and at most 10000 parts.
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+class MultipartWriter():
+    """Binary writer sending its content to S3 with a multipart upload.
+
+    The client is a boto3 S3 client, or any object with its multipart upload methods.
+    Leaving the writer with an exception aborts the upload, no object is created then.
+    """
+
+    def __init__(self, client, bucket_name, filename, part_size=MIN_PART_SIZE,
+                 content_type='application/json'):
+        """Start a multipart upload of the object."""
+        self.client = client
+        self.bucket_name = bucket_name
+        self.filename = filename
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = client.create_multipart_upload(
+            Bucket=bucket_name, Key=filename, ContentType=content_type)['UploadId']
+
+    def __enter__(self):
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Complete the upload, or abort it on an exception."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        """Buffer data, uploading a part whenever the buffer is full."""
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return len(data)
+
+    def close(self):
+        """Upload the last part and complete the upload."""
+        if self._buffer or not self._parts:
+            self._upload_part(bytes(self._buffer))
+            self._buffer = bytearray()
+
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name, Key=self.filename, UploadId=self._upload_id,
+            MultipartUpload={'Parts': self._parts})
+        logger.info('Uploaded %d bytes to %s in %d parts', self.bytes_written, self.filename,
+                    len(self._parts))
+
+    def abort(self):
+        """Abort the upload, dropping the parts uploaded so far."""
+        self._buffer = bytearray()
+        self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.filename,
+                                           UploadId=self._upload_id)
+        logger.warning('Aborted upload of %s', self.filename)
+
+    def _upload_part(self, part):
+        if len(self._parts) >= MAX_PARTS:
+            raise Exception('Upload of {} exceeds {} parts'.format(self.filename, MAX_PARTS))
+
+        number = len(self._parts) + 1
+        response = self.client.upload_part(Bucket=self.bucket_name, Key=self.filename,
+                                           PartNumber=number, UploadId=self._upload_id,
+                                           Body=part)
+        self._parts.append({'PartNumber': number, 'ETag': response['ETag']})
@@ -15,9 +15,18 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Implementation persistence store using S3."""
+import io
+import gzip
+import json
 import logging
+import threading
+from contextlib import closing, contextmanager
 from rudra.data_store.aws import AmazonS3
 from src.config.settings import SETTINGS, AWS_SETTINGS
+from src.datastore.json_stream import iter_json_object, iter_json_pairs
+from src.datastore.multipart import MultipartWriter
+from src.datastore.compression import (CODECS, CONTENT_TYPES, CompressingWriter, get_encoding,
+                                       get_extension, zstandard)
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +34,16 @@ logger = logging.getLogger(__name__)
 class PersistenceStore:
     """Persistence store to save Bigquery Data, it uses AWS S3 as of now as data store."""
 
-    def __init__(self, s3_client=None):
-        """Initialize DataProcessing object."""
+    def __init__(self, s3_client=None, multipart_client=None):
+        """Initialize DataProcessing object.
+
+        Streamed uploads use the boto3 client of the S3 connection, unless another
+        multipart client is given, like a LocalS3Client.
+        """
+        # Fail before any work is done when the output compression is not available.
+        get_extension(SETTINGS.output_compression)
+        self.multipart_client = multipart_client
+        self.multipart_lock = threading.Lock()
         self.s3_client = s3_client
         if s3_client:
             self.s3_client = s3_client
@@ -40,20 +57,154 @@ class PersistenceStore:
             )
 
     def update(self, data, bucket_name, filename='collated.json'):
-        """Upload s3 bucket."""
-        # connect after creating or with existing s3 client
-        self.s3_client.connect()
-        if not self.s3_client.is_connected():
-            raise Exception('Unable to connect to s3.')
+        """Upload s3 bucket.
+
+        Compressed output is written with stream_update(), the S3 connection only writes
+        plain JSON. Returns name of the object, with the extension of the output compression.
+        """
+        if SETTINGS.output_compression:
+            return self.stream_update(data, bucket_name, filename)
+
+        self._connect()
 
         json_data = dict()
 
-        if self.s3_client.object_exists(filename):
-            logger.info('%s exists, updating it.', filename)
-            json_data = self.s3_client.read_json_file(filename)
+        existing_filename = self._get_existing_filename(filename)
+        if existing_filename:
+            logger.info('%s exists, updating it.', existing_filename)
+            json_data = self._read_json(bucket_name, existing_filename)
             if not json_data:
                 raise Exception(f'Unable to get the json data path:{bucket_name}/{filename}')
 
         json_data.update(data)
         self.s3_client.write_json_file(filename, json_data)
         logger.info('Updated file Succefully!')
+        return filename
+
+    def stream_update(self, sections, bucket_name, filename='collated.json', merge=True):
+        """Stream sections into a JSON object uploaded in parts, the JSON is never built at once.
+
+        Sections map top level keys to iterables of (key, value) pairs, or to dicts. With
+        merge, other keys of an existing file are kept in place like update() does, which
+        needs to read it. Returns name of the object, with the extension of the output
+        compression.
+        """
+        self._connect()
+        existing_filename = self._get_existing_filename(filename) if merge else None
+        filename = self.get_output_filename(filename)
+
+        items = list(sections.items())
+        if existing_filename:
+            logger.info('%s exists, updating it into %s.', existing_filename, filename)
+            existing = self._read_json(bucket_name, existing_filename)
+            if not existing:
+                raise Exception(f'Unable to get the json data path:{bucket_name}/{filename}')
+            items = ([(key, sections.get(key, value)) for key, value in existing.items()] +
+                     [(key, value) for key, value in sections.items() if key not in existing])
+            del existing
+
+        with self._stream_object(bucket_name, filename) as writer:
+            for chunk in iter_json_object(items):
+                writer.write(chunk)
+        logger.info('Updated file Succefully!')
+        return filename
+
+    def write_object(self, pairs, bucket_name, filename):
+        """Write (key, value) pairs as a JSON object, replacing the object without reading it.
+
+        The object is streamed in parts when output streaming or compression is enabled,
+        writes of different objects are safe to run in parallel threads. Returns name of
+        the object, with the extension of the output compression.
+        """
+        filename = self.get_output_filename(filename)
+        if SETTINGS.output_streaming or SETTINGS.output_compression:
+            with self._stream_object(bucket_name, filename) as writer:
+                for chunk in iter_json_pairs(pairs):
+                    writer.write(chunk)
+        else:
+            self._get_multipart_client().put_object(
+                Bucket=bucket_name, Key=filename, ContentType=CONTENT_TYPES[''],
+                Body=json.dumps(dict(pairs)).encode('utf-8'))
+        logger.info('Wrote %s', filename)
+        return filename
+
+    @staticmethod
+    def get_output_filename(filename):
+        """Get object name of an output file, with the extension of the output compression."""
+        return filename + get_extension(SETTINGS.output_compression)
+
+    def download_file(self, filename, path):
+        """Download an object to a local file, returns False when the object does not exist."""
+        self._connect()
+        if not self.s3_client.object_exists(filename):
+            logger.info('%s does not exist yet.', filename)
+            return False
+
+        self.s3_client.download_file(filename, path)
+        logger.info('Downloaded %s to %s', filename, path)
+        return True
+
+    def upload_file(self, path, filename):
+        """Upload a local file as an object."""
+        self._connect()
+        self.s3_client.upload_file(path, filename)
+        logger.info('Uploaded %s to %s', path, filename)
+
+    @contextmanager
+    def _stream_object(self, bucket_name, filename):
+        """Open a multipart upload, compressed on the fly when output compression is enabled."""
+        encoding = SETTINGS.output_compression
+        with MultipartWriter(self._get_multipart_client(), bucket_name, filename,
+                             SETTINGS.multipart_part_size * 1024 * 1024,
+                             content_type=CONTENT_TYPES[encoding]) as writer:
+            if not encoding:
+                yield writer
+                return
+
+            compressor = CompressingWriter(writer, encoding)
+            yield compressor
+            compressor.close()
+            logger.info('Compressed %s with %s, ratio %.2f', filename, encoding,
+                        compressor.bytes_written / max(writer.bytes_written, 1))
+
+    def _get_existing_filename(self, filename):
+        """Get name of the existing output file, with any compression, None when there is none.
+
+        The file with the current output compression is looked up first, a file written
+        before the output compression was changed is merged when there is none yet.
+        """
+        filenames = [self.get_output_filename(filename), filename]
+        filenames += [filename + extension for extension in CODECS.values()]
+        for existing_filename in dict.fromkeys(filenames):
+            if self.s3_client.object_exists(existing_filename):
+                return existing_filename
+        return None
+
+    def _read_json(self, bucket_name, filename):
+        """Read a JSON object, decompressing it as it is read when its name says so."""
+        encoding = get_encoding(filename)
+        if not encoding:
+            return self.s3_client.read_json_file(filename)
+
+        body = self._get_multipart_client().get_object(Bucket=bucket_name, Key=filename)['Body']
+        # Bodies of boto3 responses can be closed, but are no context managers.
+        with closing(body):
+            if encoding == 'gzip':
+                stream = gzip.GzipFile(fileobj=body)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(body, read_across_frames=True)
+            return json.load(io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8'))
+
+    def _get_multipart_client(self):
+        """Get low level client of the S3 connection, it is thread safe unlike the resource."""
+        with self.multipart_lock:
+            if self.multipart_client is None:
+                self._connect()
+                self.multipart_client = self.s3_client._s3.meta.client
+        return self.multipart_client
+
+    def _connect(self):
+        """Connect after creating or with existing s3 client."""
+        self.s3_client.connect()
+        if not self.s3_client.is_connected():
+            raise Exception('Unable to connect to s3.')
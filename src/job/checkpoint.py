@@ -0,0 +1,152 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Incremental checkpoints of a data job run, to resume it after a failure."""
+import os
+import gzip
+import json
+import logging
+from array import array
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = 'checkpoint.json'
+
+
+class Checkpoint():
+    """Read offsets of query results and incremental snapshots of the collectors.
+
+    Every save writes a delta file with the counts and package names added since the
+    previous save, then replaces the manifest listing jobs, offsets and delta files.
+    """
+
+    def __init__(self, path, data_store=None, prefix='big-query-data/checkpoint'):
+        """Keep checkpoint files in a local directory, and under the prefix on S3 with a store."""
+        self.path = path
+        self.data_store = data_store
+        self.prefix = prefix
+        self.manifest = None
+        self.names_saved = {}
+        os.makedirs(path, exist_ok=True)
+
+    def load(self):
+        """Load manifest of an unfinished run, returns it or None."""
+        if self.data_store and not os.path.exists(self._get_path(MANIFEST_FILENAME)):
+            self._download(MANIFEST_FILENAME)
+        if not os.path.exists(self._get_path(MANIFEST_FILENAME)):
+            return None
+
+        with open(self._get_path(MANIFEST_FILENAME), 'r') as f:
+            manifest = json.load(f)
+        if manifest['complete']:
+            return None
+
+        self.manifest = manifest
+        return manifest
+
+    def start(self, jobs, collectors):
+        """Start checkpoints of a new run of given jobs, keyed by ecosystem."""
+        for filename in os.listdir(self.path):
+            if filename.startswith('delta-'):
+                os.remove(self._get_path(filename))
+
+        self.manifest = {
+            'ecosystems': list(collectors),
+            'jobs': [[ecosystem, job_id] for ecosystem, job_id in jobs.items()],
+            'offsets': {job_id: 0 for job_id in jobs.values()},
+            'deltas': [],
+            'complete': False,
+        }
+        self.names_saved = {ecosystem: 0 for ecosystem in collectors}
+        for collector in collectors.values():
+            collector.journal = Counter()
+
+    def restore(self, collectors):
+        """Replay delta files of the loaded manifest into the collectors, returns offsets."""
+        if sorted(self.manifest['ecosystems']) != sorted(collectors):
+            raise Exception('Checkpoint of ecosystems {} does not match {}'.format(
+                ', '.join(sorted(self.manifest['ecosystems'])), ', '.join(sorted(collectors))))
+
+        for filename in self.manifest['deltas']:
+            if self.data_store and not os.path.exists(self._get_path(filename)):
+                self._download(filename)
+            with gzip.open(self._get_path(filename), 'rt') as f:
+                delta = json.load(f)
+
+            for ecosystem, snapshot in delta.items():
+                collector = collectors[ecosystem]
+                for name in snapshot['names']:
+                    collector.package_ids[name] = len(collector.package_names)
+                    collector.package_names.append(name)
+                for ids, count in snapshot['counts']:
+                    collector.counter[array('I', ids).tobytes()] += count
+
+        self.names_saved = {ecosystem: len(collector.package_names)
+                            for ecosystem, collector in collectors.items()}
+        for collector in collectors.values():
+            collector.journal = Counter()
+        logger.info('Restored %d checkpoint snapshots', len(self.manifest['deltas']))
+        return dict(self.manifest['offsets'])
+
+    def save(self, collectors, offsets):
+        """Write counts added since the previous save and the current offsets."""
+        delta = {}
+        for ecosystem, collector in collectors.items():
+            names_saved = self.names_saved[ecosystem]
+            delta[ecosystem] = {
+                'names': collector.package_names[names_saved:],
+                'counts': [[array('I', key).tolist(), count]
+                           for key, count in collector.journal.items()],
+            }
+            self.names_saved[ecosystem] = len(collector.package_names)
+            collector.journal = Counter()
+
+        filename = 'delta-{}.json.gz'.format(len(self.manifest['deltas']))
+        with gzip.open(self._get_path(filename), 'wt', compresslevel=1) as f:
+            json.dump(delta, f)
+        self._upload(filename)
+
+        self.manifest['deltas'].append(filename)
+        self.manifest['offsets'] = dict(offsets)
+        self._write_manifest()
+        logger.info('Saved checkpoint %s at offsets %s', filename, self.manifest['offsets'])
+
+    def complete(self):
+        """Mark the run as complete, the next run starts over."""
+        self.manifest['complete'] = True
+        self._write_manifest()
+
+    def _write_manifest(self):
+        """Replace the manifest atomically."""
+        temp_path = self._get_path(MANIFEST_FILENAME + '.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, self._get_path(MANIFEST_FILENAME))
+        self._upload(MANIFEST_FILENAME)
+
+    def _upload(self, filename):
+        if self.data_store:
+            self.data_store.upload_file(self._get_path(filename), self._get_key(filename))
+
+    def _download(self, filename):
+        self.data_store.download_file(self._get_key(filename), self._get_path(filename))
+
+    def _get_path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def _get_key(self, filename):
+        return '{}/{}'.format(self.prefix, filename)
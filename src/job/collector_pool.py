@@ -0,0 +1,128 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Parse manifests in worker processes and merge their counters."""
+import logging
+import threading
+from collections import Counter, deque
+from multiprocessing import Pool
+from src.config.settings import SETTINGS
+from src.collector.parse_cache import ParseCache
+
+logger = logging.getLogger(__name__)
+
+# Collectors and parse cache of the current worker process, set by the pool initializer.
+_worker_collectors = {}
+_worker_cache = []
+
+
+def _init_worker(collector_classes):
+    """Create one collector per ecosystem in the worker process."""
+    for ecosystem, collector_class in collector_classes.items():
+        _worker_collectors[ecosystem] = collector_class()
+
+    if SETTINGS.parse_cache_size > 0:
+        _worker_cache.append(ParseCache(SETTINGS.parse_cache_size, SETTINGS.parse_cache_policy))
+
+
+def _collect_batch(batch):
+    """Parse a batch of (ecosystem, content, count) items.
+
+    Returns per ecosystem counters and parsing stats, and parse cache stats of the batch.
+    Package ids are interned per process, so counters are keyed by tuples of names.
+    """
+    for collector in _worker_collectors.values():
+        collector.counter = Counter()
+        collector.stats = Counter()
+
+    cache = _worker_cache[0] if _worker_cache else None
+    if cache:
+        cache.stats = Counter()
+
+    for ecosystem, content, count in batch:
+        if cache:
+            cache.parse_and_collect(_worker_collectors[ecosystem], content, True, count)
+        else:
+            _worker_collectors[ecosystem].parse_and_collect(content, True, count)
+
+    counters = {ecosystem: (Counter({tuple(collector.get_packages(key)): count
+                                     for key, count in collector.counter.items()}),
+                            collector.stats)
+                for ecosystem, collector in _worker_collectors.items()
+                if collector.counter or collector.stats}
+    return counters, cache.stats if cache else Counter()
+
+
+class CollectorPool():
+    """Send manifests in batches to worker processes and merge the partial counters."""
+
+    def __init__(self, collectors, workers, batch_size):
+        """Start worker processes with the same collectors as given ones."""
+        self.collectors = collectors
+        self.workers = workers
+        self.batch_size = batch_size
+
+        self.batch = []
+        self.pending = deque()
+        self.cache_stats = Counter()
+        self.lock = threading.Lock()
+        collector_classes = {ecosystem: type(collector)
+                             for ecosystem, collector in collectors.items()}
+        self.pool = Pool(workers, initializer=_init_worker, initargs=(collector_classes,))
+
+    def add(self, ecosystem, content, count=1):
+        """Queue a manifest for parsing, safe to call from multiple threads."""
+        with self.lock:
+            self.batch.append((ecosystem, content, count))
+            if len(self.batch) >= self.batch_size:
+                self._submit()
+
+    def flush(self):
+        """Wait for all queued manifests and merge them into the collectors."""
+        with self.lock:
+            if self.batch:
+                self._submit()
+
+            while self.pending:
+                self._merge(*self.pending.popleft().get())
+
+    def close(self):
+        """Wait for all batches and merge them into the collectors."""
+        try:
+            self.flush()
+        finally:
+            self.pool.terminate()
+            self.pool.join()
+
+    def _submit(self):
+        """Submit current batch, keeping a bounded number of batches in flight."""
+        self.pending.append(self.pool.apply_async(_collect_batch, (self.batch,)))
+        self.batch = []
+
+        # Merge strictly in submission order, so that counter keys keep the insertion
+        # order of a serial run and most_common() ties come out identical.
+        while self.pending and (len(self.pending) > 2 * self.workers or
+                                self.pending[0].ready()):
+            self._merge(*self.pending.popleft().get())
+
+    def _merge(self, counters, cache_stats):
+        """Merge partial counters of a batch into the collectors."""
+        for ecosystem, (counter, stats) in counters.items():
+            collector = self.collectors[ecosystem]
+            for packages, count in counter.items():
+                collector._update_counter(packages, count)
+            collector.stats.update(stats)
+        self.cache_stats.update(cache_stats)
@@ -15,12 +15,26 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Main job that queries, collected and update manifest files from big query."""
+import os
 import time
 import logging
-from src.config.settings import AWS_SETTINGS
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import SETTINGS, AWS_SETTINGS
 from src.datastore.persistence_store import PersistenceStore
 from src.bigquery.bigquery import Bigquery
+from src.bigquery.prefetch import PrefetchIterator
+from src.bigquery.spool import SpoolWriter
+from src.source.file_source import FileSource
+from src.job.collector_pool import CollectorPool
+from src.job.isolated_pool import IsolatedPool
+from src.job.checkpoint import Checkpoint
+from src.job.shard import (check_shard_backend, get_shard_filter, get_partial_filename,
+                           write_partial)
 from src.collector.base_collector import BaseCollector
+from src.collector.parse_cache import ParseCache
 from src.collector.maven_collector import MavenCollector
 from src.collector.npm_collector import NpmCollector
 from src.collector.pypi_collector import PypiCollector
@@ -34,77 +48,369 @@ ECOSYSTEM_MANIFEST_MAP = {
     'pypi': 'requirements.txt',
 }
 
+# Only manifests of repositories written in these languages are queried.
+ECOSYSTEM_LANGUAGE_MAP = {
+    'maven': 'java',
+    'pypi': 'python',
+}
+
+
+def get_ecosystems(ecosystems=None):
+    """Get ecosystems of the job, the configured ones or all by default."""
+    if ecosystems is None:
+        ecosystems = [e.strip() for e in SETTINGS.job_ecosystems.split(',') if e.strip()]
+
+    for ecosystem in ecosystems:
+        if ecosystem not in ECOSYSTEM_MANIFEST_MAP:
+            raise Exception('Unknown ecosystem {}'.format(ecosystem))
+    return ecosystems or list(ECOSYSTEM_MANIFEST_MAP.keys())
+
+
+def update_collated(data_store, collectors):
+    """Save package set counts of the collectors to the collated file on S3."""
+    logger.info('Updating file content to S3')
+    errors = {}
+    for ecosystem, object in collectors.items():
+        # Approximate counts of the top-K mode are published with their error estimates.
+        ecosystem_errors = object.get_errors()
+        if ecosystem_errors is not None:
+            errors[ecosystem] = ecosystem_errors
+
+    filename = 'big-query-data/{}'.format(AWS_SETTINGS.s3_collated_filename)
+
+    if SETTINGS.output_streaming:
+        # Other ecosystems of the existing file are only kept when some are not collected.
+        data_store.stream_update(
+            sections={ecosystem: object.iter_most_common()
+                      for ecosystem, object in collectors.items()},
+            bucket_name=AWS_SETTINGS.s3_bucket_name,
+            filename=filename,
+            merge=set(collectors) != set(ECOSYSTEM_MANIFEST_MAP))
+    else:
+        data_store.update(data={ecosystem: dict(object.most_common())
+                                for ecosystem, object in collectors.items()},
+                          bucket_name=AWS_SETTINGS.s3_bucket_name,
+                          filename=filename)
+
+    if errors:
+        data_store.update(data=errors,
+                          bucket_name=AWS_SETTINGS.s3_bucket_name,
+                          filename='big-query-data/{}'.format(
+                              AWS_SETTINGS.s3_collated_errors_filename))
+
+    logger.info('Succefully saved BigQuery data to persistance store')
+
+
+def update_ecosystem_objects(data_store, collectors):
+    """Write package set counts of each ecosystem to its own object, in parallel.
+
+    The index object lists the object of every ecosystem with the version of its last
+    run, it is updated once all objects are written.
+    """
+    version = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    with ThreadPoolExecutor(max_workers=len(collectors)) as executor:
+        index = dict(zip(collectors, executor.map(
+            lambda ecosystem: _write_ecosystem_object(data_store, ecosystem,
+                                                      collectors[ecosystem], version),
+            collectors)))
+
+    data_store.update(data=index,
+                      bucket_name=AWS_SETTINGS.s3_bucket_name,
+                      filename='big-query-data/{}'.format(AWS_SETTINGS.s3_index_filename))
+    logger.info('Saved objects of %s version %s', ', '.join(collectors), version)
+
+
+def _write_ecosystem_object(data_store, ecosystem, collector, version):
+    """Write counts of an ecosystem, returns its index entry."""
+    entry = {'version': version}
+    if SETTINGS.output_compression:
+        entry['encoding'] = SETTINGS.output_compression
+    entry['filename'] = data_store.write_object(
+        collector.iter_most_common(), AWS_SETTINGS.s3_bucket_name,
+        'big-query-data/{}.json'.format(ecosystem))
+
+    errors = collector.get_errors()
+    if errors is not None:
+        entry['errors_filename'] = data_store.write_object(
+            errors.items(), AWS_SETTINGS.s3_bucket_name,
+            'big-query-data/{}_errors.json'.format(ecosystem))
+    return entry
+
+
+def save_output(data_store, collectors):
+    """Save package set counts in the configured output layout."""
+    if SETTINGS.output_layout not in ('collated', 'ecosystem', 'both'):
+        raise Exception('Unknown output layout {}'.format(SETTINGS.output_layout))
+
+    if SETTINGS.output_layout in ('ecosystem', 'both'):
+        update_ecosystem_objects(data_store, collectors)
+    # The legacy collated file is written for readers that do not know the index yet.
+    if SETTINGS.output_layout in ('collated', 'both'):
+        update_collated(data_store, collectors)
+
 
 class DataJob():
     """Big query data fetching and processing class."""
 
-    def __init__(self):
-        """Initialize the BigQueryDataProcessing object."""
-        self.big_query = Bigquery()
+    def __init__(self, ecosystems=None, source_path=None, resume=True, shard=None):
+        """Initialize the BigQueryDataProcessing object.
 
-        self.collectors = {}
-        for ecosystem in ECOSYSTEM_MANIFEST_MAP.keys():
-            self.collectors[ecosystem] = self._get_collector(ecosystem)
+        With checkpoints enabled an unfinished earlier run is resumed, unless resume is False.
+        A shard given as an (index, count) tuple restricts the query to that shard of the
+        manifests and saves a partial result instead of the collated file.
+        """
+        # Reading rows from local files or a spool does not need any BigQuery client.
+        source_path = source_path or SETTINGS.row_source_path
+        if source_path:
+            self.source = FileSource(source_path, ECOSYSTEM_MANIFEST_MAP.values(),
+                                     SETTINGS.prefetch_page_size)
+        else:
+            self.source = Bigquery()
+        self.shard = shard
+        if shard and not self.source.supports_query:
+            raise Exception('Shards are only supported with Big Query')
+        if shard:
+            check_shard_backend()
+        self.pool = None
+        self.spool = None
+        self.parse_cache = None
+        # Manifests read and skipped by the prefilter, per ecosystem.
+        self.prefilter_stats = {'rows': Counter(), 'skipped': Counter()}
+        self.prefilter_lock = threading.Lock()
+        if SETTINGS.parse_cache_size > 0:
+            self.parse_cache = ParseCache(SETTINGS.parse_cache_size, SETTINGS.parse_cache_policy)
 
         self.data_store = PersistenceStore()
+        if SETTINGS.pypi_validation_cache_path:
+            self._load_validation_cache()
+
+        self.collectors = {ecosystem: self._get_collector(ecosystem)
+                           for ecosystem in get_ecosystems(ecosystems)}
+
+        # Jobs of a resumed run and the number of rows read from each of their results.
+        self.jobs = None
+        self.offsets = {}
+        self.checkpoint = None
+        self.checkpoint_lock = threading.Lock()
+        if SETTINGS.checkpoint_path:
+            self._load_checkpoint(resume)
 
     def run(self):
         """Process Bigquery response data."""
         start = time.monotonic()
-        index = 0
+        jobs = self.jobs
+        if jobs is None:
+            jobs = self._run_queries()
+            if self.checkpoint:
+                self.checkpoint.start(jobs, self.collectors)
+                self.offsets = {job_id: 0 for job_id in jobs.values()}
+        self.next_checkpoint = time.monotonic() + SETTINGS.checkpoint_interval
+
+        if SETTINGS.spool_path and self.source.supports_query:
+            if self.jobs is None:
+                self.spool = SpoolWriter(SETTINGS.spool_path, SETTINGS.spool_chunk_size)
+            else:
+                logger.warning('Not spooling rows of a resumed run, they would be incomplete')
+
+        if SETTINGS.isolated_parsing:
+            workers = max(SETTINGS.collector_workers, 1)
+            logger.info('Parsing manifests with %d supervised worker processes', workers)
+            self.pool = IsolatedPool(self.collectors, workers, SETTINGS.collector_batch_size,
+                                     SETTINGS.isolated_parse_timeout,
+                                     SETTINGS.isolated_parse_memory_limit * 1024 * 1024,
+                                     SETTINGS.quarantine_path)
+        elif SETTINGS.collector_workers > 1:
+            logger.info('Parsing manifests with %d worker processes', SETTINGS.collector_workers)
+            self.pool = CollectorPool(self.collectors, SETTINGS.collector_workers,
+                                      SETTINGS.collector_batch_size)
+
+        # Result streams are consumed in parallel, each one by the collector of its ecosystem.
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            index = sum(executor.map(self._process_result, jobs.keys(), jobs.values()))
+
+        if self.pool:
+            self.pool.close()
+            if self.parse_cache and isinstance(self.pool, CollectorPool):
+                self.parse_cache.stats.update(self.pool.cache_stats)
+            self.pool = None
+
+        if self.spool:
+            self.spool.close()
+            self.spool = None
+
+        # All rows are counted, a failure from here on resumes without reading any of them.
+        if self.checkpoint:
+            self.checkpoint.save(self.collectors, self.offsets)
+
+        elapsed = time.monotonic() - start
+        logger.info('Processed %d manifests in time: %f (%.1f manifests/s)',
+                    index, elapsed, index / elapsed if elapsed else 0.0)
+        for ecosystem, collector in self.collectors.items():
+            rows = self.prefilter_stats['rows'][ecosystem]
+            if SETTINGS.prefilter_manifests and rows:
+                skipped = self.prefilter_stats['skipped'][ecosystem]
+                logger.info('Prefilter skipped %d of %d %s manifests (%.1f%%)',
+                            skipped, rows, ecosystem, 100.0 * skipped / rows)
+            if collector.stats:
+                logger.info('Parsing stats of %s: %s', ecosystem, dict(collector.stats))
+        if self.parse_cache:
+            logger.info('Parse cache hits: %d misses: %d evictions: %d',
+                        self.parse_cache.stats['hits'], self.parse_cache.stats['misses'],
+                        self.parse_cache.stats['evictions'])
+        if self.shard:
+            self._save_partial()
+        else:
+            self._update_s3()
+        if SETTINGS.pypi_validation_cache_path and 'pypi' in self.collectors:
+            self._save_validation_cache()
+        if self.checkpoint:
+            self.checkpoint.complete()
+
+        for collector in self.collectors.values():
+            collector.close()
+
+    def _run_queries(self):
+        """Start the queries, returns job ids keyed by the ecosystem of their rows."""
+        if not self.source.supports_query:
+            return {None: self.source.run(None)}
+
         logger.info('Running Bigquery synchronously')
-        self.big_query.run(self._get_big_query())
-        for object in self.big_query.get_result():
-            index += 1
+        if SETTINGS.bigquery_query_mode == 'combined':
+            return {None: self.source.run(self._get_big_query(self.collectors.keys()))}
 
-            path = object.get('path', None)
-            content = object.get('content', None)
+        return {ecosystem: self.source.run(self._get_big_query([ecosystem]))
+                for ecosystem in self.collectors}
 
-            if not path or not content:
-                logger.warning('Either path %s or content %s is null', path, content)
+    def _process_result(self, ecosystem, job_id):
+        """Parse all rows of a query result, returns the number of rows read."""
+        index = 0
+        rows, skipped = Counter(), Counter()
+        result = self._get_result(job_id, self.offsets.get(job_id, 0))
+        for object in result:
+            index += 1
+            if self.checkpoint is None:
+                self._process_row(ecosystem, object, rows, skipped)
                 continue
 
-            ecosystem = None
-            for _ecosystem, manifest in ECOSYSTEM_MANIFEST_MAP.items():
-                if path.endswith(manifest):
-                    ecosystem = _ecosystem
+            # Rows of all results are counted under the lock, so that a checkpoint
+            # never holds a row without its offset or the other way around.
+            with self.checkpoint_lock:
+                self._process_row(ecosystem, object, rows, skipped)
+                self.offsets[job_id] += 1
+                if time.monotonic() >= self.next_checkpoint:
+                    self._save_checkpoint()
 
-            if not ecosystem:
-                logger.warning('Could not find ecosystem for given path %s', path)
-                continue
+        with self.prefilter_lock:
+            self.prefilter_stats['rows'].update(rows)
+            self.prefilter_stats['skipped'].update(skipped)
+
+        if isinstance(result, PrefetchIterator):
+            logger.info('Prefetch wait time of %s result, consumer: %f producer: %f',
+                        ecosystem or 'combined', result.consumer_wait_time,
+                        result.producer_wait_time)
+        return index
+
+    def _process_row(self, ecosystem, object, rows, skipped):
+        """Collect a result row, updating the prefilter stats."""
+        path = object.get('path', None)
+        content = object.get('content', None)
+        # Deduplicated results carry the number of files sharing the content.
+        count = object.get('count', None) or 1
+
+        if not path or not content:
+            logger.warning('Either path %s or content %s is null', path, content)
+            return
 
-            self.collectors[ecosystem].parse_and_collect(content, True)
+        row_ecosystem = ecosystem or self._get_ecosystem(path)
+        if not row_ecosystem:
+            logger.warning('Could not find ecosystem for given path %s', path)
+            return
 
-        logger.info('Processed %d manifests in time: %f', index, time.monotonic() - start)
-        self._update_s3()
+        rows[row_ecosystem] += 1
+        if (SETTINGS.prefilter_manifests and
+                not self.collectors[row_ecosystem].may_have_dependencies(content)):
+            skipped[row_ecosystem] += 1
+            return
+
+        self._collect(row_ecosystem, content, count)
+
+    def _collect(self, ecosystem, content, count):
+        """Parse content with the collector of the ecosystem, or queue it for a worker."""
+        if self.pool:
+            self.pool.add(ecosystem, content, count)
+        elif self.parse_cache:
+            self.parse_cache.parse_and_collect(self.collectors[ecosystem], content, True, count)
+        else:
+            self.collectors[ecosystem].parse_and_collect(content, True, count)
+
+    def _get_ecosystem(self, path):
+        """Find ecosystem of a manifest path."""
+        ecosystem = None
+        for _ecosystem, manifest in ECOSYSTEM_MANIFEST_MAP.items():
+            if _ecosystem in self.collectors and path.endswith(manifest):
+                ecosystem = _ecosystem
+        return ecosystem
+
+    def _get_result(self, job_id, start_index=0):
+        """Get query result rows, prefetched on a background thread when enabled."""
+        if start_index:
+            logger.info('Resuming result of job %s from row %d', job_id, start_index)
+            rows = self.source.get_result(job_id, start_index)
+        else:
+            rows = self.source.get_result(job_id)
+        if self.spool:
+            rows = self.spool.tee(rows)
+
+        if SETTINGS.prefetch_queue_depth > 0:
+            return PrefetchIterator(rows, SETTINGS.prefetch_queue_depth,
+                                    SETTINGS.prefetch_page_size)
+        return rows
+
+    def _get_big_query(self, ecosystems) -> str:
+        manifest_filters = []
+        for ecosystem in ecosystems:
+            manifest_filter = "files.path LIKE '%{}'".format(ECOSYSTEM_MANIFEST_MAP[ecosystem])
+            language = ECOSYSTEM_LANGUAGE_MAP.get(ecosystem)
+            if language:
+                manifest_filter = ("REGEXP_CONTAINS(TO_JSON_STRING(language), r'(?i){}') AND "
+                                   "{}".format(language, manifest_filter))
+            manifest_filters.append('({})'.format(manifest_filter))
+
+        if SETTINGS.bigquery_dedup_content:
+            # Identical blobs share con.id, each one is returned once with its file count.
+            select = ('ANY_VALUE(con.content) AS content, ANY_VALUE(L.path) AS path, '
+                      'COUNT(*) AS count')
+            group_by = 'GROUP BY con.id'
+            if len(ecosystems) > 1:
+                # A blob saved under manifest names of several ecosystems is counted once
+                # per ecosystem, ANY_VALUE(path) alone would give its count to one of them.
+                select += ', CASE {} END AS manifest'.format(' '.join(
+                    "WHEN L.path LIKE '%{0}' THEN '{0}'".format(ECOSYSTEM_MANIFEST_MAP[e])
+                    for e in ecosystems))
+                group_by = 'GROUP BY con.id, manifest'
+        else:
+            select = 'con.content AS content, L.path AS path'
+            group_by = ''
+
+        # Identical blobs share files.id as well, so they always fall in the same shard.
+        shard_filter = ''
+        if self.shard:
+            shard_filter = ' AND {}'.format(get_shard_filter(self.shard, 'files.id'))
 
-    def _get_big_query(self) -> str:
         return """
-            SELECT con.content AS content, L.path AS path
+            SELECT {select}
             FROM `bigquery-public-data.github_repos.contents` AS con
             INNER JOIN (
                 SELECT files.id AS id, files.path as path
                 FROM `bigquery-public-data.github_repos.languages` AS langs
                 INNER JOIN `bigquery-public-data.github_repos.files` AS files
                 ON files.repo_name = langs.repo_name
-                    WHERE (
-                        (
-                            REGEXP_CONTAINS(TO_JSON_STRING(language), r'(?i)java') AND
-                            files.path LIKE '%{m}'
-                        ) OR
-                        (
-                            REGEXP_CONTAINS(TO_JSON_STRING(language), r'(?i)python') AND
-                            files.path LIKE '%{p}'
-                        ) OR
-                        (
-                            files.path LIKE '%{n}'
-                        )
-                    )
+                    WHERE ({filters}){shard_filter}
             ) AS L
-            ON con.id = L.id;
-        """.format(m=ECOSYSTEM_MANIFEST_MAP['maven'],
-                   p=ECOSYSTEM_MANIFEST_MAP['pypi'],
-                   n=ECOSYSTEM_MANIFEST_MAP['npm'])
+            ON con.id = L.id
+            {group_by};
+        """.format(select=select, filters=' OR '.join(manifest_filters), group_by=group_by,
+                   shard_filter=shard_filter)
 
     def _get_collector(self, ecosystem) -> BaseCollector:
         if ecosystem == 'maven':
@@ -117,15 +423,58 @@ class DataJob():
             return PypiCollector()
 
     def _update_s3(self):
-        logger.info('Updating file content to S3')
-        data = {}
-        for ecosystem, object in self.collectors.items():
-            data[ecosystem] = dict(object.counter.most_common())
+        save_output(self.data_store, self.collectors)
+
+    def _save_partial(self):
+        """Upload package set counts of the shard, for the reducer to merge."""
+        filename = get_partial_filename(SETTINGS.shard_run_id, self.shard)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, os.path.basename(filename))
+            write_partial(path, self.shard, self.collectors)
+            self.data_store.upload_file(path, filename)
+        logger.info('Saved partial result of shard %d/%d', *self.shard)
+
+    def _load_checkpoint(self, resume):
+        """Open checkpoints of the run, restoring the collectors of an unfinished one."""
+        if self.source.supports_query and SETTINGS.bigquery_fetch_mode == 'storage':
+            raise Exception('Checkpoints are only supported with the rest fetch mode')
+        # The journal of counts since the last checkpoint is an in-memory Counter, it would
+        # grow past the spill budget and replay evicted top-K keys in another order.
+        if SETTINGS.aggregation_backend != 'counter':
+            raise Exception('Checkpoints are only supported with the counter aggregation backend')
+
+        prefix = 'big-query-data/checkpoint'
+        if self.shard:
+            prefix = '{}/{}/shard-{}-of-{}'.format(prefix, SETTINGS.shard_run_id, *self.shard)
+        self.checkpoint = Checkpoint(SETTINGS.checkpoint_path,
+                                     self.data_store if SETTINGS.checkpoint_s3 else None, prefix)
+        if not resume or self.checkpoint.load() is None:
+            return
+
+        self.offsets = self.checkpoint.restore(self.collectors)
+        self.jobs = {ecosystem: job_id
+                     for ecosystem, job_id in self.checkpoint.manifest['jobs']}
+        logger.info('Resuming unfinished run at offsets %s', self.offsets)
+
+    def _save_checkpoint(self):
+        """Merge manifests queued for workers and save a checkpoint."""
+        if self.pool:
+            self.pool.flush()
+        self.checkpoint.save(self.collectors, self.offsets)
+        self.next_checkpoint = time.monotonic() + SETTINGS.checkpoint_interval
 
-        filename = 'big-query-data/{}'.format(AWS_SETTINGS.s3_collated_filename)
+    def _get_validation_cache_filename(self):
+        return 'big-query-data/{}'.format(AWS_SETTINGS.s3_pypi_validation_cache_filename)
 
-        self.data_store.update(data=data,
-                               bucket_name=AWS_SETTINGS.s3_bucket_name,
-                               filename=filename)
+    def _load_validation_cache(self):
+        """Restore PyPI validation verdicts of previous runs before collectors open them."""
+        if self.data_store.download_file(self._get_validation_cache_filename(),
+                                         SETTINGS.pypi_validation_cache_path):
+            logger.info('Loaded PyPI validation cache from persistance store')
 
-        logger.info('Succefully saved BigQuery data to persistance store')
+    def _save_validation_cache(self):
+        """Drop expired PyPI validation verdicts and save the rest for the next run."""
+        validation_cache = self.collectors['pypi'].validation_cache
+        logger.info('Expired %d PyPI validation verdicts', validation_cache.expire())
+        self.data_store.upload_file(SETTINGS.pypi_validation_cache_path,
+                                    self._get_validation_cache_filename())
@@ -0,0 +1,264 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Parse manifests in supervised worker processes with time and memory limits."""
+import json
+import queue
+import logging
+import resource
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from multiprocessing import get_context
+
+logger = logging.getLogger(__name__)
+
+# Result of an item whose parsing ran out of memory.
+_MEMORY_EXCEEDED = 'memory'
+
+
+def _limit_memory(memory_limit):
+    """Limit address space of the process to its current size plus given bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            size = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:  # pragma: no cover
+        logger.warning('Unable to read process size, memory of parsing is not limited')
+        return
+
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (size + memory_limit, hard))
+
+
+def _isolated_worker(conn, collector_classes, memory_limit):
+    """Parse items of received batches, each result is sent as soon as it is ready.
+
+    Results are the package names of an item, or None, then the parsing stats of
+    the batch follow.
+    """
+    collectors = {ecosystem: collector_class()
+                  for ecosystem, collector_class in collector_classes.items()}
+    for collector in collectors.values():
+        collector.raise_memory_errors = True
+    # Collectors may load data when built, like the package validation of pypi.
+    if memory_limit:
+        _limit_memory(memory_limit)
+
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            return
+
+        for collector in collectors.values():
+            collector.counter = Counter()
+            collector.stats = Counter()
+
+        for ecosystem, content, count in batch:
+            collector = collectors[ecosystem]
+            try:
+                key = collector.parse_and_collect(content, True, count)
+                conn.send(tuple(collector.get_packages(key)) if key else None)
+            except MemoryError:
+                conn.send(_MEMORY_EXCEEDED)
+
+        conn.send({ecosystem: collector.stats for ecosystem, collector in collectors.items()
+                   if collector.stats})
+
+
+class IsolatedPool():
+    """Send manifests in batches to supervised worker processes.
+
+    A worker taking longer than the timeout for a single manifest is killed and
+    replaced, a manifest running out of memory fails on its own. Such manifests are
+    counted and written to a JSONL quarantine file instead of being collected.
+    """
+
+    def __init__(self, collectors, workers, batch_size, timeout, memory_limit,
+                 quarantine_path):
+        """Start supervisor threads, worker processes are started on demand."""
+        self.collectors = collectors
+        self.workers = workers
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.quarantine_path = quarantine_path
+
+        self.batch = []
+        self.pending = deque()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.quarantine_lock = threading.Lock()
+        self.quarantine = None
+        self.batches = queue.Queue()
+        self.collector_classes = {ecosystem: type(collector)
+                                  for ecosystem, collector in collectors.items()}
+        # Workers are forked from a single threaded server, not from the supervisor threads.
+        self.context = get_context('forkserver')
+        self.supervisors = [threading.Thread(target=self._supervise, daemon=True)
+                            for _ in range(workers)]
+        for supervisor in self.supervisors:
+            supervisor.start()
+
+    def add(self, ecosystem, content, count=1):
+        """Queue a manifest for parsing, safe to call from multiple threads."""
+        with self.lock:
+            self.batch.append((ecosystem, content, count))
+            if len(self.batch) >= self.batch_size:
+                self._submit()
+
+    def flush(self):
+        """Wait for all queued manifests and merge them into the collectors."""
+        with self.lock:
+            if self.batch:
+                self._submit()
+
+            while self.pending:
+                self._merge(*self.pending.popleft().result())
+
+    def close(self):
+        """Wait for all batches, merge them into the collectors and stop the workers."""
+        try:
+            self.flush()
+        finally:
+            for _ in self.supervisors:
+                self.batches.put(None)
+            for supervisor in self.supervisors:
+                supervisor.join()
+            if self.quarantine:
+                self.quarantine.close()
+
+        logger.info('Isolated parsing timeouts: %d memory: %d crashes: %d quarantined: %d',
+                    self.stats['timeouts'], self.stats['memory'], self.stats['crashes'],
+                    self.stats['quarantined'])
+
+    def _submit(self):
+        """Submit current batch, keeping a bounded number of batches in flight."""
+        future = Future()
+        self.batches.put((self.batch, future))
+        self.pending.append(future)
+        self.batch = []
+
+        # Merge strictly in submission order, like CollectorPool.
+        while self.pending and (len(self.pending) > 2 * self.workers or
+                                self.pending[0].done()):
+            self._merge(*self.pending.popleft().result())
+
+    def _merge(self, batch, results, stats):
+        """Count package names of a parsed batch in the collectors."""
+        for (ecosystem, _, count), packages in zip(batch, results):
+            if packages:
+                self.collectors[ecosystem]._update_counter(packages, count)
+        for ecosystem, ecosystem_stats in stats.items():
+            self.collectors[ecosystem].stats.update(ecosystem_stats)
+
+    def _supervise(self):
+        """Parse batches in a worker process, replacing it when a manifest stalls it."""
+        worker = None
+        while True:
+            item = self.batches.get()
+            if item is None:
+                break
+
+            batch, future = item
+            try:
+                results, stats = [], {}
+                while len(results) < len(batch):
+                    if worker is None:
+                        worker = self._start_worker()
+                    if not self._parse(worker, batch, results, stats):
+                        self._stop_worker(worker, kill=True)
+                        worker = None
+                future.set_result((batch, results, stats))
+            except Exception as e:
+                logger.error('Isolated parsing failed with %s', e)
+                future.set_exception(e)
+
+        if worker:
+            self._stop_worker(worker)
+
+    def _parse(self, worker, batch, results, stats):
+        """Send rest of the batch to a worker and read its results.
+
+        Returns False when the worker has to be replaced, the item it got stuck on
+        is then quarantined.
+        """
+        process, conn = worker
+        remaining = batch[len(results):]
+        conn.send(remaining)
+        for ecosystem, content, count in remaining:
+            reason = None
+            if not conn.poll(self.timeout):
+                reason = 'timeouts'
+            else:
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    reason = 'crashes'
+
+            if reason is None and result == _MEMORY_EXCEEDED:
+                self._quarantine('memory', ecosystem, content, count)
+                results.append(None)
+                continue
+
+            if reason:
+                self._quarantine(reason, ecosystem, content, count)
+                results.append(None)
+                return False
+
+            results.append(result)
+
+        if not conn.poll(self.timeout):
+            return False
+        for ecosystem, ecosystem_stats in conn.recv().items():
+            stats.setdefault(ecosystem, Counter()).update(ecosystem_stats)
+        return True
+
+    def _quarantine(self, reason, ecosystem, content, count):
+        """Count a manifest that could not be parsed and record it in the quarantine file."""
+        logger.warning('Quarantined %s manifest of %d bytes, reason: %s',
+                       ecosystem, len(content), reason)
+        with self.quarantine_lock:
+            self.stats[reason] += 1
+            self.stats['quarantined'] += 1
+            if self.quarantine is None:
+                self.quarantine = open(self.quarantine_path, 'a')
+            content = content.decode('utf-8', 'replace') if isinstance(content, bytes) else content
+            self.quarantine.write(json.dumps({'ecosystem': ecosystem, 'reason': reason,
+                                              'count': count, 'content': content}) + '\n')
+            self.quarantine.flush()
+
+    def _start_worker(self):
+        """Start a worker process, returns it with the parent end of its pipe."""
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_isolated_worker, daemon=True,
+                                       args=(child_conn, self.collector_classes,
+                                             self.memory_limit))
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def _stop_worker(self, worker, kill=False):
+        """Stop a worker process, a stuck one is killed."""
+        process, conn = worker
+        if kill:
+            process.terminate()
+        else:
+            try:
+                conn.send(None)
+            except OSError:
+                process.terminate()
+        process.join()
+        conn.close()
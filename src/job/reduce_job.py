@@ -0,0 +1,76 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Job merging partial results of a sharded run into the collated file."""
+import os
+import time
+import logging
+import tempfile
+from src.config.settings import SETTINGS
+from src.datastore.persistence_store import PersistenceStore
+from src.collector.base_collector import BaseCollector
+from src.job.data_job import get_ecosystems, save_output
+from src.job.shard import check_shard_backend, get_partial_filename, read_partial
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for partial results of shards still running.
+POLL_INTERVAL = 30
+
+
+class ReduceJob():
+    """Stream the partial results of all shards into one collector per ecosystem."""
+
+    def __init__(self, shards, ecosystems=None):
+        """Initialize reduce job of a run split in given number of shards."""
+        check_shard_backend()
+        self.shards = shards
+        self.data_store = PersistenceStore()
+        # Partials hold package strings only, no manifest has to be parsed again.
+        self.collectors = {ecosystem: BaseCollector(ecosystem)
+                           for ecosystem in get_ecosystems(ecosystems)}
+
+    def run(self):
+        """Merge partial results of all shards and save the collated file."""
+        start = time.monotonic()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for index in range(self.shards):
+                shard = (index, self.shards)
+                path = os.path.join(tmp_dir, 'partial.jsonl.gz')
+                self._download_partial(shard, path)
+
+                entries = 0
+                for ecosystem, package_string, count in read_partial(path, shard,
+                                                                     self.collectors):
+                    self.collectors[ecosystem].collect_package_string(package_string, count)
+                    entries += 1
+                os.remove(path)
+                logger.info('Merged %d package sets of shard %d/%d', entries, *shard)
+
+        logger.info('Merged %d shards in time: %f', self.shards, time.monotonic() - start)
+        save_output(self.data_store, self.collectors)
+        for collector in self.collectors.values():
+            collector.close()
+
+    def _download_partial(self, shard, path):
+        """Download partial result of a shard, waiting for shards that are still running."""
+        filename = get_partial_filename(SETTINGS.shard_run_id, shard)
+        deadline = time.monotonic() + SETTINGS.reducer_wait_timeout
+        while not self.data_store.download_file(filename, path):
+            if time.monotonic() >= deadline:
+                raise Exception('Partial result {} is missing'.format(filename))
+            logger.info('Waiting for partial result %s', filename)
+            time.sleep(POLL_INTERVAL)
@@ -0,0 +1,92 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Partial results of a job run over one shard of the Big Query manifests."""
+import gzip
+import json
+from src.config.settings import SETTINGS
+
+
+def parse_shard(value):
+    """Parse a shard given as i/N, returns the (index, count) tuple."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError('Invalid shard {}, expected i/N'.format(value))
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError('Invalid shard {}, expected 0 <= i < N'.format(value))
+    return index, count
+
+
+def check_shard_backend():
+    """Refuse aggregation backends whose counts can not be merged across shards.
+
+    Top-K counts of a shard are truncated and only bound by errors of that shard,
+    summing them in the reducer would give counts below the true ones.
+    """
+    if SETTINGS.aggregation_backend == 'topk':
+        raise Exception('Shards are not supported with the topk aggregation backend')
+
+
+def get_shard_filter(shard, column):
+    """Get SQL condition selecting rows of a shard by the fingerprint of a column.
+
+    The inner MOD keeps ABS() from overflowing on the smallest INT64 fingerprint.
+    """
+    index, count = shard
+    return 'MOD(ABS(MOD(FARM_FINGERPRINT({column}), {count})), {count}) = {index}'.format(
+        column=column, count=count, index=index)
+
+
+def get_partial_filename(run_id, shard):
+    """Get S3 object name of the partial result of a shard."""
+    index, count = shard
+    return 'big-query-data/shards/{}/partial-{:04d}-of-{:04d}.jsonl.gz'.format(
+        run_id, index, count)
+
+
+def write_partial(path, shard, collectors):
+    """Write package set counts of all collectors to a gzip compressed JSONL file.
+
+    The first line describes the shard, each following one is an
+    [ecosystem, package string, count] triple.
+    """
+    index, count = shard
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'shard': index, 'shards': count,
+                            'ecosystems': list(collectors)}) + '\n')
+        for ecosystem, collector in collectors.items():
+            for package_string, package_count in collector.iter_most_common():
+                f.write(json.dumps([ecosystem, package_string, package_count]) + '\n')
+
+
+def read_partial(path, shard, ecosystems):
+    """Yield (ecosystem, package string, count) triples of a partial result file."""
+    index, count = shard
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if (header['shard'], header['shards']) != (index, count):
+            raise Exception('Partial of shard {}/{} found instead of {}/{}'.format(
+                header['shard'], header['shards'], index, count))
+        if sorted(header['ecosystems']) != sorted(ecosystems):
+            raise Exception('Partial of shard {}/{} has ecosystems {} instead of {}'.format(
+                index, count, ', '.join(sorted(header['ecosystems'])),
+                ', '.join(sorted(ecosystems))))
+
+        for line in f:
+            ecosystem, package_string, package_count = json.loads(line)
+            yield ecosystem, package_string, package_count
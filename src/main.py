@@ -17,14 +17,30 @@
 """The main script for the Big Query manifests retrieval."""
 
 import time
+import argparse
 from rudra import logger
 from src.job.data_job import DataJob
+from src.job.shard import parse_shard
 
 
-def main():
+def parse_args(args=None):
+    """Parse command line arguments of the job."""
+    parser = argparse.ArgumentParser(description='Retrieve, process and store manifest files.')
+    parser.add_argument('--source', default=None,
+                        help='Directory tree of manifests or JSONL / Parquet dump of rows '
+                             'to read instead of running Big Query')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Start a new run even if a checkpoint of an unfinished one exists')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='Process shard i of N, given as i/N, and save its partial result '
+                             'for src/reduce.py instead of the collated file')
+    return parser.parse_args(args)
+
+
+def main(source_path=None, resume=True, shard=None):
     """Retrieve, process and store the manifest files from Big Query."""
     logger.info('Initializing Big query object')
-    dataJob = DataJob()
+    dataJob = DataJob(source_path=source_path, resume=resume, shard=shard)
 
     logger.info('Starting big query job')
     start = time.monotonic()
@@ -33,4 +49,5 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    main(args.source, not args.fresh, args.shard)
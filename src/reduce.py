@@ -0,0 +1,42 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""The script merging partial results of a sharded Big Query manifests run."""
+
+import time
+import argparse
+from rudra import logger
+from src.job.reduce_job import ReduceJob
+
+
+def parse_args(args=None):
+    """Parse command line arguments of the reducer."""
+    parser = argparse.ArgumentParser(description='Merge partial results of sharded runs.')
+    parser.add_argument('--shards', type=int, required=True,
+                        help='Number of shards the run was split in')
+    return parser.parse_args(args)
+
+
+def main(shards):
+    """Merge partial results of all shards into the collated file."""
+    logger.info('Starting reduce job of %d shards', shards)
+    start = time.monotonic()
+    ReduceJob(shards).run()
+    logger.info('Finished reduce job, time taken: %f', time.monotonic() - start)
+
+
+if __name__ == '__main__':
+    main(parse_args().shards)
@@ -0,0 +1 @@
+"""Sources of manifest rows like Google Bigquery or local files."""
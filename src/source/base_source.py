@@ -0,0 +1,32 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Base source class to read manifest rows from."""
+
+
+class BaseSource:
+    """Base class of sources yielding rows with path and content of manifests."""
+
+    # Sources that can run a query get one query per ecosystem, others are read once.
+    supports_query = False
+
+    def run(self, query):
+        """To be implemented by all its child sources, returns a job id."""
+        raise Exception("Missing run() method implementation!!")
+
+    def get_result(self, job_id=None, start_index=0):
+        """To be implemented by all its child sources, rows before start index are skipped."""
+        raise Exception("Missing get_result() method implementation!!")
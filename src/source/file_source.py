@@ -0,0 +1,91 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Read manifest rows from local files instead of Google Bigquery."""
+import os
+import logging
+from itertools import islice
+from src.bigquery.spool import SpoolReader
+from src.source.base_source import BaseSource
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Suffixes of row dump files, anything else must be a directory tree of manifests.
+DUMP_SUFFIXES = ('.jsonl', '.jsonl.gz', '.jsonl.zst', '.parquet')
+
+
+class FileSource(BaseSource):
+    """Yield manifest rows of a directory tree or of a JSONL / Parquet dump."""
+
+    def __init__(self, path, manifests=None, batch_size=1000):
+        """Initialize file source, directory trees are filtered by manifest file names."""
+        if not os.path.exists(path):
+            raise Exception('Source path {} does not exist'.format(path))
+
+        self.path = path
+        self.manifests = tuple(manifests) if manifests else None
+        self.batch_size = batch_size
+
+    def run(self, query):
+        """Query is ignored, all rows of the path are read."""
+        logger.info('Reading manifest rows from %s', self.path)
+        return self.path
+
+    def get_result(self, job_id=None, start_index=0):
+        """Yield rows with path and content of manifests, from the row at start index."""
+        yield from islice(self._get_rows(), start_index, None)
+
+    def _get_rows(self):
+        """Yield all rows of the path."""
+        if os.path.isdir(self.path):
+            yield from self._get_directory_rows()
+        elif self.path.endswith('.parquet'):
+            yield from self._get_parquet_rows()
+        elif self.path.endswith(DUMP_SUFFIXES):
+            yield from SpoolReader(self.path)
+        else:
+            raise Exception('Unsupported source file {}'.format(self.path))
+
+    def _get_directory_rows(self):
+        """Walk directory tree in a stable order and read the manifests found."""
+        for root, dirs, files in os.walk(self.path):
+            dirs.sort()
+            for name in sorted(files):
+                if self.manifests and name not in self.manifests:
+                    continue
+
+                file_path = os.path.join(root, name)
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    yield {
+                        'path': os.path.relpath(file_path, self.path),
+                        'content': f.read(),
+                    }
+
+    def _get_parquet_rows(self):
+        """Read path, content and optional count columns of a Parquet dump, batch by batch."""
+        if pq is None:
+            raise Exception('pyarrow is required for Parquet source {}'.format(self.path))
+
+        parquet_file = pq.ParquetFile(self.path)
+        columns = [column for column in ('path', 'content', 'count')
+                   if column in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=columns):
+            yield from batch.to_pylist()
@@ -17,8 +17,10 @@
 """Test big query."""
 import pytest
 import unittest
+from types import SimpleNamespace
 from unittest import mock
 from unittest.mock import patch
+from src.config.settings import SETTINGS
 from src.bigquery.bigquery import Bigquery
 
 
@@ -29,6 +31,8 @@ class DummyBigquery():
         """Set default counter and dummy job id."""
         self.counter = 0
         self.job_id = 12345
+        self.destination = SimpleNamespace(project='project', dataset_id='dataset',
+                                           table_id='table')
 
     def done(self):
         """Run the bigquery synchronously."""
@@ -89,6 +93,44 @@ class MockClient(mock.Mock):
         return {'state': 'COMPLETED'}
 
 
+class MockReadRowsStream():
+    """Storage read API rows stream mock class."""
+
+    def __init__(self, rows):
+        """Set rows of the stream."""
+        self._rows = rows
+
+    def rows(self, session=None):
+        """Iterate over stream rows."""
+        return iter(self._rows)
+
+
+class MockReadClient():
+    """Storage read API client mock class."""
+
+    STREAMS = {
+        'stream-0': [{'path': 'a/pom.xml', 'content': 'pom'}] * 3,
+        'stream-1': [{'path': 'b/package.json', 'content': 'npm'}] * 4,
+        'stream-2': [],
+    }
+
+    def create_read_session(self, parent, read_session, max_stream_count):
+        """Create read session with one stream per mocked stream."""
+        assert parent == 'projects/project'
+        assert read_session['table'] == 'projects/project/datasets/dataset/tables/table'
+        names = sorted(self.STREAMS)[:max_stream_count]
+        return SimpleNamespace(streams=[SimpleNamespace(name=name) for name in names])
+
+    def read_rows(self, name):
+        """Open a stream for reading."""
+        return MockReadRowsStream(self.STREAMS[name])
+
+
+MockStorageModule = SimpleNamespace(
+    BigQueryReadClient=MockReadClient,
+    types=SimpleNamespace(ReadSession=dict, DataFormat=SimpleNamespace(AVRO='AVRO')))
+
+
 class TestBigQuery(unittest.TestCase):
     """Unite test cases for big query class."""
 
@@ -145,3 +187,41 @@ class TestBigQuery(unittest.TestCase):
             total_count += 1
 
         assert total_count == 5
+
+    @patch('src.bigquery.bigquery.Client', new_callable=MockClient)
+    def test_get_result_resume(self, _c):
+        """Test reading the destination table of an earlier job from a start index."""
+        bq = Bigquery(MockQueryJobConfig())
+        job = DummyBigquery()
+        bq.client.get_job = lambda job_id: job
+        bq.client.list_rows = lambda table, start_index=None: job.result()[start_index:]
+
+        paths = [object.get('path') for object in bq.get_result('earlier-job', 3)]
+
+        assert paths == ['tests/data/invalid.file'] * 2
+        assert bq.jobs['earlier-job'] is job
+
+    @patch.object(SETTINGS, 'bigquery_read_batch_size', 2)
+    @patch.object(SETTINGS, 'bigquery_fetch_mode', 'storage')
+    @patch('src.bigquery.bigquery.bigquery_storage_v1', MockStorageModule)
+    @patch('src.bigquery.bigquery.Client', new_callable=MockClient)
+    def test_get_result_storage_mode(self, _c):
+        """Test get result over storage read API streams."""
+        bq = Bigquery(MockQueryJobConfig())
+        bq.run('Query string goes here')
+
+        paths = sorted(object.get('path') for object in bq.get_result())
+        assert paths == ['a/pom.xml'] * 3 + ['b/package.json'] * 4
+
+    @patch.object(SETTINGS, 'bigquery_fetch_mode', 'storage')
+    @patch('src.bigquery.bigquery.bigquery_storage_v1', None)
+    @patch('src.bigquery.bigquery.Client', new_callable=MockClient)
+    def test_get_result_storage_mode_missing_client(self, _c):
+        """Test storage mode without the storage client library."""
+        bq = Bigquery(MockQueryJobConfig())
+        bq.run('Query string goes here')
+
+        with pytest.raises(Exception) as e:
+            list(bq.get_result())
+
+        assert str(e.value) == 'google-cloud-bigquery-storage is required for storage fetch mode'
@@ -0,0 +1,73 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test prefetch iterator."""
+import time
+import pytest
+from src.bigquery.prefetch import PrefetchIterator
+
+
+def slow_rows(count, delay=0.0):
+    """Generate rows with a delay between them."""
+    for index in range(count):
+        time.sleep(delay)
+        yield {'path': 'path/{}/package.json'.format(index), 'content': 'content'}
+
+
+def failing_rows():
+    """Generate a row and fail."""
+    yield {'path': 'package.json', 'content': 'content'}
+    raise Exception('Network failure')
+
+
+class TestPrefetchIterator:
+    """Prefetch iterator test cases."""
+
+    def test_all_rows_in_order(self):
+        """Test rows are returned once and in order."""
+        rows = list(PrefetchIterator(slow_rows(25), 2, 4))
+        assert [row['path'] for row in rows] == [
+            'path/{}/package.json'.format(index) for index in range(25)]
+
+    def test_empty_result(self):
+        """Test empty result."""
+        assert list(PrefetchIterator(iter([]), 2, 4)) == []
+
+    def test_consumer_wait_time(self):
+        """Test consumer waits for a slow producer."""
+        prefetch = PrefetchIterator(slow_rows(4, 0.05), 2, 1)
+        assert len(list(prefetch)) == 4
+        assert prefetch.consumer_wait_time > 0.1
+
+    def test_producer_wait_time(self):
+        """Test producer waits for a slow consumer on a full queue."""
+        prefetch = PrefetchIterator(slow_rows(8), 1, 1)
+        for _ in prefetch:
+            time.sleep(0.05)
+        assert prefetch.producer_wait_time > 0.1
+
+    def test_producer_error(self):
+        """Test producer failure is raised to the consumer."""
+        with pytest.raises(Exception) as e:
+            list(PrefetchIterator(failing_rows(), 2, 1))
+
+        assert str(e.value) == 'Network failure'
+
+    def test_early_close(self):
+        """Test consumer can stop before the result is exhausted."""
+        prefetch = iter(PrefetchIterator(slow_rows(100), 1, 1))
+        assert next(prefetch)['path'] == 'path/0/package.json'
+        prefetch.close()
@@ -0,0 +1,103 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test spool writer and reader."""
+import gzip
+import pytest
+import threading
+from src.bigquery.spool import SpoolReader, SpoolWriter
+
+ROWS = [{'path': 'repo/{}/package.json'.format(index), 'content': '{"dependencies": {}}'}
+        for index in range(10)]
+
+
+class TestSpool:
+    """Spool test cases."""
+
+    def test_spool_and_replay(self, tmp_path):
+        """Test replay returns spooled rows in order."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        writer = SpoolWriter(path, 3)
+        assert list(writer.tee(iter(ROWS))) == ROWS
+        writer.close()
+
+        assert writer.rows == 10
+        assert list(SpoolReader(path)) == ROWS
+
+    def test_spool_is_chunked_gzip(self, tmp_path):
+        """Test spool file is a valid gzip file of JSON lines."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        writer = SpoolWriter(path, 4)
+        list(writer.tee(iter(ROWS)))
+        writer.close()
+
+        with gzip.open(path, 'rt') as f:
+            assert len(f.read().splitlines()) == 10
+
+    def test_multiple_streams(self, tmp_path):
+        """Test rows of multiple result streams end up in one spool."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        writer = SpoolWriter(path, 2)
+        list(writer.tee(iter(ROWS[:5])))
+        list(writer.tee(iter(ROWS[5:])))
+        writer.close()
+
+        assert sorted(row['path'] for row in SpoolReader(path)) == sorted(
+            row['path'] for row in ROWS)
+
+    def test_spool_count(self, tmp_path):
+        """Test count of deduplicated rows is spooled."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        writer = SpoolWriter(path, 3)
+        list(writer.tee(iter([{'path': 'pom.xml', 'content': '<project/>', 'count': 7}])))
+        writer.close()
+
+        assert list(SpoolReader(path)) == [{'path': 'pom.xml', 'content': '<project/>', 'count': 7}]
+
+    def test_empty_spool(self, tmp_path):
+        """Test replay of an empty spool."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        SpoolWriter(path, 2).close()
+        assert list(SpoolReader(path)) == []
+
+    def test_zstd_spool_and_replay(self, tmp_path):
+        """Test zstd compressed spool."""
+        pytest.importorskip('zstandard')
+        path = str(tmp_path / 'rows.jsonl.zst')
+        writer = SpoolWriter(path, 3)
+        list(writer.tee(iter(ROWS)))
+        writer.close()
+
+        assert list(SpoolReader(path)) == ROWS
+
+    def test_zstd_spool_of_threads(self, tmp_path):
+        """Test result threads writing to one zstd spool at the same time."""
+        pytest.importorskip('zstandard')
+        path = str(tmp_path / 'rows.jsonl.zst')
+        writer = SpoolWriter(path, 1)
+        rows = [[{'path': '{}/{}/package.json'.format(thread, index), 'content': str(index) * 1000}
+                 for index in range(500)] for thread in range(8)]
+        threads = [threading.Thread(target=lambda r: list(writer.tee(iter(r))), args=(r,))
+                   for r in rows]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        assert writer.rows == 4000
+        assert sorted(row['path'] for row in SpoolReader(path)) == sorted(
+            row['path'] for thread_rows in rows for row in thread_rows)
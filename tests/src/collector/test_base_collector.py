@@ -16,6 +16,8 @@
 #
 """Test base collector class."""
 import pytest
+from unittest.mock import patch
+from src.config.settings import SETTINGS
 from src.collector.base_collector import BaseCollector
 
 
@@ -29,3 +31,122 @@ class TestBaseCollector:
             bc.parse_and_collect(None, True)
 
         assert str(e.value) == 'Missing parse_and_collect() method implementation!!'
+
+    def test_update_counter_with_count(self):
+        """Test packages of deduplicated manifests are counted count times."""
+        bc = BaseCollector("ecosystem")
+        bc._update_counter(['a', 'b'], 3)
+        bc._update_counter(['a', 'b'])
+        bc._update_counter([], 2)
+
+        assert dict(bc.most_common()) == {'a, b': 4}
+
+    def test_iter_most_common(self):
+        """Test package strings are yielded most common first."""
+        bc = BaseCollector("ecosystem")
+        bc._update_counter(['b'])
+        bc._update_counter(['a', 'c'], 2)
+
+        pairs = bc.iter_most_common()
+        assert next(pairs) == ('a, c', 2)
+        assert list(pairs) == [('b', 1)]
+
+    def test_collect_key(self):
+        """Test counting a key returned earlier."""
+        bc = BaseCollector("ecosystem")
+        key = bc._update_counter(['a', 'b'])
+        bc.collect_key(key, 2)
+        bc.collect_key(None, 2)
+
+        assert bc.get_package_string(key) == 'a, b'
+        assert bc._update_counter([]) is None
+        assert dict(bc.most_common()) == {'a, b': 3}
+
+    @patch.object(SETTINGS, 'package_set_order', 'document')
+    def test_interned_keys(self):
+        """Test package names are interned and sets keep their order."""
+        bc = BaseCollector("ecosystem")
+        first = bc._update_counter(['b', 'a'])
+        second = bc._update_counter(['a', 'c', 'b'])
+        bc._update_counter(['b', 'a'], 2)
+
+        assert bc.package_names == ['b', 'a', 'c']
+        assert first == bc._get_key(['b', 'a'])
+        assert first != bc._get_key(['a', 'b'])
+        assert bc.get_packages(second) == ['a', 'c', 'b']
+        assert bc.most_common() == [('b, a', 3), ('a, c, b', 1)]
+        assert bc.most_common(1) == [('b, a', 3)]
+
+    def test_canonical_keys(self):
+        """Test package sets are deduplicated and sorted, case is kept by default."""
+        bc = BaseCollector("ecosystem")
+        bc._update_counter(['b', 'a', 'b'])
+        bc._update_counter(['a', 'b'])
+        bc._update_counter(['B', 'a'])
+
+        assert bc.most_common() == [('a, b', 2), ('B, a', 1)]
+
+    def test_canonical_keys_ignore_case(self):
+        """Test package names of case insensitive ecosystems are lower cased."""
+        bc = BaseCollector("pypi")
+        bc._update_counter(['Flask', 'requests'])
+        bc._update_counter(['flask', 'Requests', 'FLASK'])
+
+        assert bc.most_common() == [('flask, requests', 2)]
+
+    def test_collect_package_string(self):
+        """Test package strings of a legacy collated file are merged under canonical keys."""
+        bc = BaseCollector("ecosystem")
+        for pkg_string, count in {'b, a': 3, 'a, b': 2, 'c': 1, '': 4}.items():
+            bc.collect_package_string(pkg_string, count)
+
+        assert bc.most_common() == [('a, b', 5), ('c', 1)]
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'spill')
+    @patch.object(SETTINGS, 'aggregation_memory_budget', 0)
+    def test_spill_backend(self):
+        """Test package sets spilled to disk give the same output as the Counter."""
+        bc = BaseCollector("ecosystem")
+        for packages in [['a', 'b'], ['c'], ['b', 'a'], ['c'], ['d'], ['a', 'b']]:
+            bc._update_counter(packages)
+
+        assert bc.counter.spills > 0
+        assert bc.most_common() == [('a, b', 3), ('c', 2), ('d', 1)]
+        bc.close()
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'topk')
+    @patch.object(SETTINGS, 'topk_size', 2)
+    @patch.object(SETTINGS, 'topk_capacity_factor', 1)
+    def test_topk_backend(self):
+        """Test only the top package sets are written, with their error estimates."""
+        bc = BaseCollector("ecosystem")
+        for packages in [['a', 'b'], ['a', 'b'], ['a', 'b'], ['c'], ['d']]:
+            bc._update_counter(packages)
+
+        assert bc.most_common() == [('a, b', 3), ('d', 2)]
+        assert bc.get_errors() == {'a, b': 0, 'd': 1}
+
+    def test_exact_backend_errors(self):
+        """Test exact counts have no error estimates."""
+        assert BaseCollector("ecosystem").get_errors() is None
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'sqlite')
+    def test_unknown_backend(self):
+        """Test unknown aggregation backend."""
+        with pytest.raises(Exception) as e:
+            BaseCollector("ecosystem")
+
+        assert str(e.value) == 'Unknown aggregation backend sqlite'
+
+    def test_may_have_dependencies(self):
+        """Test substring prefilter of str and bytes content."""
+        bc = BaseCollector("ecosystem")
+        assert bc.may_have_dependencies('anything')
+
+        bc.dependency_markers = ('dependency',)
+        bc._byte_markers = (b'dependency',)
+        assert bc.may_have_dependencies('<dependency>')
+        assert bc.may_have_dependencies(b'<dependency>')
+        assert not bc.may_have_dependencies('<project/>')
+        assert not bc.may_have_dependencies(b'<project/>')
+        assert bc.may_have_dependencies('<project/>'.encode('utf-16'))
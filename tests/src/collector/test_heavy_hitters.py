@@ -0,0 +1,80 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test heavy hitters class."""
+import random
+from collections import Counter
+from src.collector.heavy_hitters import HeavyHitters
+
+
+def _get_keys(size, alpha):
+    """Get keys with a long tail, like package sets of manifests."""
+    rng = random.Random(42)
+    return ['k{}'.format(int(rng.paretovariate(alpha))) for _ in range(size)]
+
+
+class TestHeavyHitters:
+    """Heavy hitters test cases."""
+
+    def test_exact_below_capacity(self):
+        """Test counts are exact while all keys fit, ties keep first seen order."""
+        counter = HeavyHitters(2, 2)
+        for key, count in [('a', 1), ('b', 2), ('c', 1), ('a', 1), ('d', 2)]:
+            counter[key] += count
+
+        assert counter.capacity == 4
+        assert len(counter) == 4
+        assert counter.most_common() == [('a', 2), ('b', 2)]
+        assert counter.most_common(1) == [('a', 2)]
+        assert counter.most_common(5) == [('a', 2), ('b', 2)]
+        assert counter.error('a') == 0
+
+    def test_replaces_smallest(self):
+        """Test a new key replaces the smallest count and inherits it as error."""
+        counter = HeavyHitters(2, 1)
+        counter['a'] += 3
+        counter['b'] += 1
+        counter['c'] += 1
+
+        assert counter['b'] == 0
+        assert counter['c'] == 2
+        assert counter.error('c') == 1
+        assert counter.most_common() == [('a', 3), ('c', 2)]
+        assert counter.total == 5
+
+    def test_error_bounds(self):
+        """Test estimates bound the true counts and heavy keys are found."""
+        keys = _get_keys(50000, 0.6)
+        counter = HeavyHitters(20, 10)
+        exact = Counter()
+        for key in keys:
+            counter[key] += 2
+            exact[key] += 2
+
+        assert len(exact) > counter.capacity == len(counter) == len(counter._heap)
+        for key, count in counter.most_common():
+            assert exact[key] <= count <= exact[key] + counter.error(key)
+            assert counter.error(key) <= counter.total / counter.capacity
+        assert {key for key, _ in counter.most_common()} == {
+            key for key, _ in exact.most_common(20)}
+
+    def test_bool(self):
+        """Test an empty counter is false."""
+        counter = HeavyHitters(1, 1)
+        assert not counter
+
+        counter['a'] += 1
+        assert counter
@@ -15,6 +15,8 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Test maven manifests and extract dependencies."""
+from unittest.mock import patch
+from src.config.settings import SETTINGS
 from src.collector.maven_collector import MavenCollector
 
 MANIFEST_START = """
@@ -73,7 +75,7 @@ class TestMavenCollector:
         """Test single dep."""
         collector = MavenCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'org.springframework:spring-websocket': 1
         }
@@ -84,7 +86,7 @@ class TestMavenCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'org.springframework:spring-websocket': 3
         }
@@ -93,19 +95,29 @@ class TestMavenCollector:
         """Test single dep and a test dep."""
         collector = MavenCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + TEST_DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'org.springframework:spring-websocket': 1
         }
 
+    def test_single_dep_with_count(self):
+        """Test single dep of a manifest shared by multiple files."""
+        collector = MavenCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True, 4)
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'org.springframework:spring-websocket': 5
+        }
+
     def test_multiple_dep(self):
         """Test mutiple deps."""
         collector = MavenCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
-            'org.springframework:spring-websocket, '
-            'org.springframework.boot:spring-boot-starter-web': 1
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 1
         }
 
     def test_multiple_manifest_multiple_dep(self):
@@ -113,10 +125,10 @@ class TestMavenCollector:
         collector = MavenCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
-            'org.springframework:spring-websocket, '
-            'org.springframework.boot:spring-boot-starter-web': 2
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 2
         }
 
     def test_multiple_dep_test_dep(self):
@@ -124,10 +136,10 @@ class TestMavenCollector:
         collector = MavenCollector()
         collector.parse_and_collect(
             MANIFEST_START + DEP_1 + DEP_2 + TEST_DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
-            'org.springframework:spring-websocket, '
-            'org.springframework.boot:spring-boot-starter-web': 1
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 1
         }
 
     def test_multiple_dep_multiple_test_dep(self):
@@ -135,10 +147,10 @@ class TestMavenCollector:
         collector = MavenCollector()
         collector.parse_and_collect(
             MANIFEST_START + DEP_1 + TEST_DEP_1 + DEP_2 + TEST_DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
-            'org.springframework:spring-websocket, '
-            'org.springframework.boot:spring-boot-starter-web': 1
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 1
         }
 
     def test_multiple_manifests(self):
@@ -150,10 +162,10 @@ class TestMavenCollector:
             MANIFEST_START + DEP_1 + TEST_DEP_1 + DEP_2 + TEST_DEP_2 + MANIFEST_END, True)
         collector.parse_and_collect(
             MANIFEST_START + DEP_1 + TEST_DEP_1 + DEP_2 + TEST_DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
-            'org.springframework:spring-websocket, '
-            'org.springframework.boot:spring-boot-starter-web': 2,
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 2,
             'org.springframework:spring-websocket': 1,
             'org.springframework.boot:spring-boot-starter-web': 1
         }
@@ -162,7 +174,7 @@ class TestMavenCollector:
         """Test empty / invalid manifest."""
         collector = MavenCollector()
         collector.parse_and_collect(None, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {}
 
     def test_valid_and_empty_manifest(self):
@@ -170,7 +182,63 @@ class TestMavenCollector:
         collector = MavenCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(None, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
+        assert packages == {
+            'org.springframework:spring-websocket': 1
+        }
+
+    @patch.object(SETTINGS, 'maven_parser', 'streaming')
+    def test_streaming_parser(self):
+        """Test streaming extractor gives the same packages as mercator."""
+        manifests = [
+            MANIFEST_START + DEP_1 + MANIFEST_END,
+            MANIFEST_START + DEP_1 + TEST_DEP_1 + DEP_2 + TEST_DEP_2 + MANIFEST_END,
+            MANIFEST_START + TEST_DEP_1 + MANIFEST_END,
+            None,
+        ]
+        with open('tests/data/pom.xml', 'r') as f:
+            manifests.append(f.read())
+
+        streaming = MavenCollector()
+        for manifest in manifests:
+            streaming.parse_and_collect(manifest, True)
+
+        with patch.object(SETTINGS, 'maven_parser', 'mercator'):
+            mercator = MavenCollector()
+        for manifest in manifests:
+            mercator.parse_and_collect(manifest, True)
+
+        assert streaming.streaming and not mercator.streaming
+        assert streaming.most_common() == mercator.most_common()
+
+    @patch.object(SETTINGS, 'package_set_order', 'document')
+    def test_document_order(self):
+        """Test legacy document order of dependencies."""
+        collector = MavenCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
+        collector.parse_and_collect(MANIFEST_START + DEP_2 + DEP_1 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
         assert packages == {
+            'org.springframework:spring-websocket, '
+            'org.springframework.boot:spring-boot-starter-web': 1,
+            'org.springframework.boot:spring-boot-starter-web, '
             'org.springframework:spring-websocket': 1
         }
+
+    def test_canonical_order(self):
+        """Test dependencies in another order are counted under the same key."""
+        collector = MavenCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
+        collector.parse_and_collect(MANIFEST_START + DEP_2 + DEP_1 + DEP_2 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'org.springframework.boot:spring-boot-starter-web, '
+            'org.springframework:spring-websocket': 2
+        }
+
+    def test_may_have_dependencies(self):
+        """Test prefilter keeps every manifest that could have dependencies."""
+        collector = MavenCollector()
+        assert collector.may_have_dependencies(MANIFEST_START + DEP_1 + MANIFEST_END)
+        assert not collector.may_have_dependencies(MANIFEST_START + MANIFEST_END)
+        assert not collector.may_have_dependencies(b'<project></project>')
@@ -0,0 +1,102 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test pom.xml dependencies extractor."""
+import pytest
+import tracemalloc
+import xml.etree.ElementTree as ET
+from src.collector.maven_extractor import extract_dependencies
+
+POM = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <dependencyManagement>
+    <dependencies>
+      <dependency>
+        <groupId>managed</groupId>
+        <artifactId>managed</artifactId>
+      </dependency>
+    </dependencies>
+  </dependencyManagement>
+  <build>
+    <plugins>
+      <plugin>
+        <dependencies>
+          <dependency>
+            <groupId>plugin</groupId>
+            <artifactId>plugin</artifactId>
+          </dependency>
+        </dependencies>
+      </plugin>
+    </plugins>
+  </build>
+  <dependencies>
+    <dependency>
+      <groupId> org.springframework </groupId>
+      <artifactId>spring-websocket</artifactId>
+    </dependency>
+    <dependency>
+      <groupId>junit</groupId>
+      <artifactId>junit</artifactId>
+      <scope>test</scope>
+    </dependency>
+    <dependency>
+      <artifactId>no-group</artifactId>
+      <scope>provided</scope>
+    </dependency>
+  </dependencies>
+  %s
+</project>
+"""
+
+
+class TestMavenExtractor:
+    """Pom.xml dependencies extractor test cases."""
+
+    def test_project_dependencies(self):
+        """Test only direct project dependencies are extracted."""
+        assert extract_dependencies(POM % '') == [
+            ('org.springframework', 'spring-websocket', 'compile'),
+            ('junit', 'junit', 'test'),
+            ('', 'no-group', 'provided'),
+        ]
+
+    def test_stops_after_dependencies(self):
+        """Test content after the dependencies section is not parsed."""
+        assert len(extract_dependencies(POM % '<broken')) == 3
+
+    def test_without_dependencies(self):
+        """Test pom without dependencies."""
+        assert extract_dependencies('<project><version>1</version></project>') == []
+
+    def test_malformed(self):
+        """Test malformed pom raises parse error."""
+        with pytest.raises(ET.ParseError):
+            extract_dependencies('<project><dependencies><dependency></project>')
+
+    def test_bounded_memory(self):
+        """Test memory stays bounded on a multi MB pom."""
+        dependency = ('<dependency><groupId>g</groupId><artifactId>a</artifactId>'
+                      '<version>1.0</version></dependency>')
+        content = ('<project><dependencyManagement><dependencies>' + dependency * 20000 +
+                   '</dependencies></dependencyManagement><dependencies>' + dependency +
+                   '</dependencies></project>')
+        tracemalloc.start()
+        try:
+            assert extract_dependencies(content) == [('g', 'a', 'compile')]
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < len(content)
@@ -15,6 +15,11 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Test npm manifests and extract dependencies."""
+import json
+import pytest
+import demjson
+from unittest.mock import patch
+from src.config.settings import SETTINGS
 from src.collector.npm_collector import NpmCollector
 
 MANIFEST_START = """
@@ -69,7 +74,7 @@ class TestNpmCollector:
         """Test single dep."""
         collector = NpmCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser': 1
         }
@@ -80,16 +85,26 @@ class TestNpmCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser': 3
         }
 
+    def test_single_dep_with_count(self):
+        """Test single dep of a manifest shared by multiple files."""
+        collector = NpmCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True, 4)
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'body-parser': 5
+        }
+
     def test_multiple_dep(self):
         """Test mutiple deps."""
         collector = NpmCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser, ejs': 1
         }
@@ -99,7 +114,7 @@ class TestNpmCollector:
         collector = NpmCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser, ejs': 2
         }
@@ -111,7 +126,7 @@ class TestNpmCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_2 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser, ejs': 2,
             'body-parser': 1,
@@ -122,7 +137,7 @@ class TestNpmCollector:
         """Test manifest with invalid deps."""
         collector = NpmCollector()
         collector.parse_and_collect(MANIFEST_START + INVALID_DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'core-js': 1
         }
@@ -132,7 +147,7 @@ class TestNpmCollector:
         collector = NpmCollector()
         collector.parse_and_collect(
             MANIFEST_START.replace('"repository": {', '') + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser': 1
         }
@@ -142,7 +157,7 @@ class TestNpmCollector:
         collector = NpmCollector()
         collector.parse_and_collect(
             MANIFEST_START.replace('"dependencies": {', '') + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {}
 
     def test_valid_and_corrupt_dep_section(self):
@@ -151,7 +166,118 @@ class TestNpmCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
         collector.parse_and_collect(
             MANIFEST_START.replace('"dependencies": {', '') + DEP_1 + MANIFEST_END, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'body-parser': 1
         }
+
+    def test_decoder_tiers(self):
+        """Test strict JSON, non-strict JSON and corrupt manifests use their own tier."""
+        collector = NpmCollector()
+        collector.parse_and_collect(json.dumps({'dependencies': {'ejs': '1.0.0'}}), True)
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + MANIFEST_END, True)
+        collector.parse_and_collect(
+            MANIFEST_START.replace('"repository": {', '') + DEP_1 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'body-parser': 2,
+            'ejs': 1
+        }
+        assert dict(collector.stats) == {'json': 1, 'demjson': 1, 'corrupt': 1}
+
+    def test_bytes_content(self):
+        """Test manifest content given as bytes."""
+        collector = NpmCollector()
+        collector.parse_and_collect(json.dumps({'dependencies': {'ejs': '1.0.0'}}).encode(), True)
+        assert dict(collector.most_common()) == {'ejs': 1}
+
+    @patch('src.collector.npm_collector._decode_json', json.loads)
+    def test_stdlib_json_tier(self):
+        """Test strict JSON tier without orjson."""
+        collector = NpmCollector()
+        collector.parse_and_collect(json.dumps({'dependencies': {'ejs': '1.0.0', 'a': '1'}}), True)
+        assert dict(collector.most_common()) == {'a, ejs': 1}
+        assert dict(collector.stats) == {'json': 1}
+
+    @patch.object(SETTINGS, 'npm_parser', 'streaming')
+    def test_streaming_parser(self):
+        """Test streaming extractor on valid, non-strict and corrupt manifests."""
+        collector = NpmCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2 + MANIFEST_END, True)
+        collector.parse_and_collect(MANIFEST_START + INVALID_DEP_1 + MANIFEST_END, True)
+        collector.parse_and_collect(
+            MANIFEST_START.replace('"repository": {', '') + DEP_1 + MANIFEST_END, True)
+        collector.parse_and_collect(
+            MANIFEST_START.replace('"dependencies": {', '') + DEP_1 + MANIFEST_END, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'body-parser, ejs': 1,
+            'core-js': 1,
+            'body-parser': 1
+        }
+        assert dict(collector.stats) == {'streaming': 2, 'recovered': 2}
+
+    @pytest.mark.parametrize('content', [
+        "{'dependencies': {'a': '1', 'b': '2'}}",
+        '{dependencies: {a: "1", b: "2"}}',
+    ])
+    def test_streaming_parser_non_strict(self, content):
+        """Test streaming extractor finds the dependencies decoders find in non-strict JSON."""
+        decoded = NpmCollector()
+        decoded.parse_and_collect(content, True)
+        with patch.object(SETTINGS, 'npm_parser', 'streaming'):
+            collector = NpmCollector()
+            collector.parse_and_collect(content, True)
+        assert dict(collector.most_common()) == dict(decoded.most_common()) == {'a, b': 1}
+        assert dict(collector.stats) == {'recovered': 1}
+
+    def test_out_of_memory(self):
+        """Test running out of memory skips the manifest, unless raising it is asked for."""
+        def decode(content):
+            try:
+                raise MemoryError()
+            except MemoryError:
+                raise demjson.JSONDecodeError('An unexpected failure occured', content)
+
+        collector = NpmCollector()
+        with patch('src.collector.npm_collector._decode_json', side_effect=MemoryError()), \
+                patch('src.collector.npm_collector.demjson.decode', decode):
+            assert collector.parse_and_collect('{"dependencies": {"a": "1"}}', True) is None
+        assert dict(collector.stats) == {'corrupt': 1}
+
+        # Isolated workers quarantine the manifest, also when demjson reports it as bad content.
+        collector.raise_memory_errors = True
+        with patch('src.collector.npm_collector._decode_json', side_effect=MemoryError()):
+            with pytest.raises(MemoryError):
+                collector.parse_and_collect('{"dependencies": {"a": "1"}}', True)
+        with patch('src.collector.npm_collector.demjson.decode', decode):
+            with pytest.raises(MemoryError):
+                collector.parse_and_collect("{'dependencies': {'a': '1'}}", True)
+            with pytest.raises(MemoryError):
+                collector._handle_corrupt_packagejson('{"dependencies": {"a": "1"},')
+
+    @patch.object(SETTINGS, 'package_set_order', 'document')
+    def test_document_order(self):
+        """Test legacy document order of dependencies."""
+        collector = NpmCollector()
+        collector.parse_and_collect(json.dumps({'dependencies': {'ejs': '1', 'a': '1'}}), True)
+        collector.parse_and_collect(json.dumps({'dependencies': {'a': '1', 'ejs': '1'}}), True)
+        assert dict(collector.most_common()) == {'ejs, a': 1, 'a, ejs': 1}
+
+    def test_canonical_order(self):
+        """Test dependencies in another order are counted under the same key."""
+        collector = NpmCollector()
+        collector.parse_and_collect(json.dumps({'dependencies': {'ejs': '1', 'a': '1'}}), True)
+        collector.parse_and_collect(json.dumps({'dependencies': {'a': '1', 'ejs': '1'}}), True)
+        collector.parse_and_collect(json.dumps({'dependencies': {'A': '1', 'ejs': '1'}}), True)
+        assert dict(collector.most_common()) == {'a, ejs': 2, 'A, ejs': 1}
+
+    def test_may_have_dependencies(self):
+        """Test prefilter keeps every manifest that could have dependencies."""
+        collector = NpmCollector()
+        assert collector.may_have_dependencies(MANIFEST_START + DEP_1 + MANIFEST_END)
+        assert not collector.may_have_dependencies(
+            MANIFEST_START.replace('"dependencies": {', '') + DEP_1 + MANIFEST_END)
+        assert collector.may_have_dependencies('{"\\u0064ependencies": {"ejs": "1"}}')
+        assert not collector.may_have_dependencies('{"name": "a", "devDependencies": {}}')
+        assert not collector.may_have_dependencies(b'{"name": "a"}')
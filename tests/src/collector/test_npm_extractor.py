@@ -0,0 +1,88 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test package.json dependencies extractor."""
+import json
+import time
+import pytest
+from src.collector.npm_extractor import extract_dependencies, recover_dependencies
+
+VALID_MANIFESTS = [
+    '{"dependencies": {"a": "1", "b": {"c": "x"}, "d": [1, 2]}, "x": {"dependencies": {"z": 1}}}',
+    '{"dependencies": {"a": "1"}, "dependencies": "x"}',
+    '{"dependencies": {"a": "1"}, "dependencies": null}',
+    '{"dependencies": {"a": "1"}, "dependencies": {"b": 2}}',
+    '[{"dependencies": {"a": 1}}]',
+    '{"scripts": {"a": "}{\\"dependencies\\": {"}, "dependencies": {"a\\u00e9": "1"}}',
+    '{"dependencies": {"a\\"b": "1", "c": true, "d": -1.5e3}}',
+    '{"devDependencies": {"a": "1"}}',
+    '{"dependencies": []}',
+    '{"dependencies": {}}',
+    '{}',
+]
+
+
+def json_dependencies(content):
+    """Get dependencies the way a full JSON decode does."""
+    decoded = json.loads(content)
+    if isinstance(decoded, dict) and isinstance(decoded.get('dependencies'), dict):
+        return list(decoded['dependencies'].keys())
+    return []
+
+
+class TestNpmExtractor:
+    """Package.json dependencies extractor test cases."""
+
+    @pytest.mark.parametrize('content', VALID_MANIFESTS)
+    def test_matches_json_decode(self, content):
+        """Test extracted dependencies match a full JSON decode."""
+        assert extract_dependencies(content) == json_dependencies(content)
+
+    @pytest.mark.parametrize('content', [
+        '', '{"a": 1', '{"a": "1}', '{"a": 1}}', '{"a": 1}{"b": 2}', '{"a\\x": 1}',
+        '{"a": "b\\"', '{"a": 1]', "{'dependencies': {'a': '1'}}", '{dependencies: {a: "1"}}',
+        '{"a": 1, b: 2}',
+    ])
+    def test_malformed(self, content):
+        """Test malformed content is reported."""
+        assert extract_dependencies(content) is None
+
+    def test_recover(self):
+        """Test dependencies of corrupt content are recovered."""
+        content = '{"name": "x", "repository": "type": "git"}, "dependencies": {\n' \
+                  '  "body-parser": "1.9.0",\n  \'ejs\': \'1.0.0\',\n}, "license": "MIT"}'
+        assert extract_dependencies(content) is None
+        assert recover_dependencies(content) == ['body-parser', 'ejs']
+
+    def test_recover_without_dependencies(self):
+        """Test corrupt content without dependencies."""
+        assert recover_dependencies('{"devDependencies": {"a": "1"}, "b": "2",}}') == []
+        assert recover_dependencies('{"dependencies": {"a": "1"') == []
+
+    def test_recover_bare_keys(self):
+        """Test dependencies with bare keys of non-strict content are recovered."""
+        content = '{dependencies: {a: "1", "@s/b": \'2\', "": "3"}}'
+        assert recover_dependencies(content) == ['a', '@s/b', '']
+
+    def test_linear_time(self):
+        """Test pathological content is scanned in linear time."""
+        size = 200000
+        content = '{"dependencies"' + ' ' * size + ':' + '"\\' * size
+        start = time.monotonic()
+        assert extract_dependencies(content) is None
+        assert recover_dependencies(content) == []
+        assert recover_dependencies('"dependencies": {' * size) == []
+        assert time.monotonic() - start < 5
@@ -0,0 +1,93 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test parse cache class."""
+import pytest
+from src.collector.base_collector import BaseCollector
+from src.collector.parse_cache import ParseCache, content_digest
+
+
+class WordCollector(BaseCollector):
+    """Collects words of the content as packages and counts parse calls."""
+
+    def __init__(self):
+        """Word collector init."""
+        super().__init__('words')
+        self.parse_calls = 0
+
+    def parse_and_collect(self, content, _, count=1):
+        """Split content in words."""
+        self.parse_calls += 1
+        return self._update_counter(content.split(), count)
+
+
+class TestParseCache:
+    """Parse cache test cases."""
+
+    def test_content_digest(self):
+        """Test digest of str and bytes content."""
+        assert content_digest('a b') == content_digest(b'a b')
+        assert content_digest('a b') != content_digest('a c')
+        assert len(content_digest('a b')) == 16
+
+    def test_unknown_policy(self):
+        """Test unknown eviction policy."""
+        with pytest.raises(Exception) as e:
+            ParseCache(10, 'random')
+
+        assert str(e.value) == 'Unknown parse cache eviction policy random'
+
+    def test_hits_skip_parsing(self):
+        """Test identical contents are parsed once and counted every time."""
+        cache = ParseCache(10)
+        collector = WordCollector()
+        for content in ['a b', 'c', 'a b', 'a b', '']:
+            cache.parse_and_collect(collector, content, True, 2)
+
+        assert collector.parse_calls == 3
+        assert dict(collector.most_common()) == {'a, b': 6, 'c': 2}
+        assert cache.stats == {'hits': 2, 'misses': 3}
+
+    def test_same_content_other_collector(self):
+        """Test entries are not shared between collectors."""
+        cache = ParseCache(10)
+        first, second = WordCollector(), WordCollector()
+        second.name = 'other'
+        cache.parse_and_collect(first, 'a', True)
+        cache.parse_and_collect(second, 'a', True)
+
+        assert first.parse_calls == second.parse_calls == 1
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted."""
+        cache = ParseCache(2, 'lru')
+        collector = WordCollector()
+        for content in ['a', 'b', 'a', 'c', 'a']:
+            cache.parse_and_collect(collector, content, True)
+
+        assert collector.parse_calls == 3
+        assert cache.stats == {'hits': 2, 'misses': 3, 'evictions': 1}
+
+    def test_fifo_eviction(self):
+        """Test first inserted entry is evicted."""
+        cache = ParseCache(2, 'fifo')
+        collector = WordCollector()
+        for content in ['a', 'b', 'a', 'c', 'a']:
+            cache.parse_and_collect(collector, content, True)
+
+        assert collector.parse_calls == 4
+        assert cache.stats == {'hits': 1, 'misses': 4, 'evictions': 2}
+        assert dict(collector.most_common()) == {'a': 3, 'b': 1, 'c': 1}
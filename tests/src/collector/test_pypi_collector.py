@@ -15,6 +15,13 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Test pypi manifests and extract dependencies."""
+import os
+import pytest
+import tempfile
+from unittest.mock import patch
+from rudra.utils.pypi_parser import pip_req
+from src.config.settings import SETTINGS
+from src.collector import pypi_parser
 from src.collector.pypi_collector import PypiCollector
 
 MANIFEST_START = """
@@ -37,6 +44,23 @@ pydantic==1.8.1
 """
 
 
+# Differential corpus, the native parser must give the same names as pip_req.
+REQUIREMENTS_CORPUS = [
+    MANIFEST_START + DEP_1 + DEP_2,
+    'flask\nrequests==2.25.1\nDjango>=2.0,<3.0\n',
+    'Flask==1.0 # web framework\n# requests\n\nnumpy',
+    'requests[security,socks]==2.25.1\n',
+    'pywin32>=1.0 ; sys_platform == "win32"\nsix; python_version < "3"\n',
+    'zope.interface~=5.0\ntyping_extensions!=3.7.4\nruamel.yaml===0.15.88\n',
+    'requests \\\n    ==2.25.1\n',
+    '-r requirements.in\n-c constraints.txt\nflask\n',
+    '--index-url https://pypi.org/simple\nflask==1.0 --hash=sha256:abcdef\n',
+    'PyYAML==5.4.1\nSQLAlchemy\nJinja2\n',
+    '# comment \\\nflask',
+    'requests\\\n# comment \\\nflask',
+]
+
+
 class TestPypiCollector:
     """Pypi collector test cases."""
 
@@ -44,7 +68,7 @@ class TestPypiCollector:
         """Test single dep."""
         collector = PypiCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri': 1
         }
@@ -55,16 +79,26 @@ class TestPypiCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_1, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri': 3
         }
 
+    def test_single_dep_with_count(self):
+        """Test single dep of a manifest shared by multiple files."""
+        collector = PypiCollector()
+        collector.parse_and_collect(MANIFEST_START + DEP_1, True, 4)
+        collector.parse_and_collect(MANIFEST_START + DEP_1, True)
+        packages = dict(collector.most_common())
+        assert packages == {
+            'daiquiri': 5
+        }
+
     def test_multiple_dep(self):
         """Test mutiple deps."""
         collector = PypiCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri, pydantic': 1
         }
@@ -74,7 +108,7 @@ class TestPypiCollector:
         collector = PypiCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri, pydantic': 2
         }
@@ -86,7 +120,7 @@ class TestPypiCollector:
         collector.parse_and_collect(MANIFEST_START + DEP_2, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2, True)
         collector.parse_and_collect(MANIFEST_START + DEP_1 + DEP_2, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri, pydantic': 2,
             'daiquiri': 1,
@@ -97,7 +131,7 @@ class TestPypiCollector:
         """Test empty / invalid manifest."""
         collector = PypiCollector()
         collector.parse_and_collect(None, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {}
 
     def test_valid_and_empty_manifest(self):
@@ -105,7 +139,84 @@ class TestPypiCollector:
         collector = PypiCollector()
         collector.parse_and_collect(MANIFEST_START + DEP_1, True)
         collector.parse_and_collect(None, True)
-        packages = dict(collector.counter.most_common())
+        packages = dict(collector.most_common())
         assert packages == {
             'daiquiri': 1
         }
+
+    @pytest.mark.parametrize('content', REQUIREMENTS_CORPUS)
+    def test_native_parser_matches_pip_req(self, content):
+        """Test native parser gives the same names as pip_req."""
+        assert (sorted(set(pypi_parser.parse_requirements(content))) ==
+                sorted(set(pip_req.parse_requirements(content))))
+
+    def test_native_parser_matches_pip_req_on_test_data(self):
+        """Test native parser gives the same names as pip_req on test data."""
+        with open('tests/data/requirements.txt', 'r') as f:
+            content = f.read()
+        assert (sorted(set(pypi_parser.parse_requirements(content))) ==
+                sorted(set(pip_req.parse_requirements(content))))
+
+    def test_pip_parser_fallback(self):
+        """Test collected packages are the same with the pip_req fallback."""
+        native = PypiCollector()
+        with patch.object(SETTINGS, 'pypi_parser', 'pip'):
+            pip = PypiCollector()
+
+        assert native.native and not pip.native
+        for collector in (native, pip):
+            for content in REQUIREMENTS_CORPUS:
+                collector.parse_and_collect(content, False)
+
+        assert native.most_common() == pip.most_common()
+
+    def test_names_validated_once(self):
+        """Test each distinct name is validated once and counter is unchanged."""
+        collector = PypiCollector()
+        expected = PypiCollector()
+        validate_pypi = collector.bq_validation.validate_pypi
+        with patch.object(collector.bq_validation, 'validate_pypi',
+                          side_effect=validate_pypi) as mock_validate:
+            for content in REQUIREMENTS_CORPUS * 3:
+                collector.parse_and_collect(content, True)
+
+        for content in REQUIREMENTS_CORPUS * 3:
+            packages = sorted(set(pypi_parser.parse_requirements(content)))
+            expected._update_counter(sorted(validate_pypi(packages)))
+
+        names = [name for args, _ in mock_validate.call_args_list for name in args[0]]
+        assert len(names) == len(set(names)) == len(collector.verdicts)
+        assert collector.stats['validated'] == len(names)
+        assert collector.most_common() == expected.most_common()
+
+    def test_validation_cache_across_runs(self):
+        """Test verdicts of a previous run are used instead of validating again."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(SETTINGS, 'pypi_validation_cache_path',
+                              os.path.join(tmp, 'cache.sqlite')):
+                cold = PypiCollector()
+                warm = PypiCollector()
+
+            for content in REQUIREMENTS_CORPUS:
+                cold.parse_and_collect(content, True)
+            with patch.object(warm.bq_validation, 'validate_pypi') as mock_validate:
+                for content in REQUIREMENTS_CORPUS:
+                    warm.parse_and_collect(content, True)
+
+            mock_validate.assert_not_called()
+            assert warm.stats['validation_cache_hits'] == cold.stats['validated']
+            assert warm.most_common() == cold.most_common()
+
+    def test_may_have_dependencies(self):
+        """Test prefilter skips only blank and comment lines."""
+        collector = PypiCollector()
+        for content in REQUIREMENTS_CORPUS:
+            assert collector.may_have_dependencies(content)
+            assert collector.may_have_dependencies(content.encode())
+
+        assert collector.may_have_dependencies('# comment \\\nflask')
+        assert collector.may_have_dependencies('-e .\n')
+        assert not collector.may_have_dependencies('')
+        assert not collector.may_have_dependencies(MANIFEST_START)
+        assert not collector.may_have_dependencies(b'  \r\n# flask\n\t\n')
+        assert collector.may_have_dependencies('flask'.encode('utf-16'))
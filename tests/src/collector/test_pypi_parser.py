@@ -0,0 +1,60 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test requirements.txt parser."""
+import pytest
+from src.collector.pypi_parser import parse_requirements
+
+
+class TestPypiParser:
+    """Requirements.txt parser test cases."""
+
+    @pytest.mark.parametrize('content,names', [
+        ('flask', ['flask']),
+        ('Flask==1.0\nrequests>=2,<3', ['flask', 'requests']),
+        ('# comment\n\n   \nflask  # trailing comment', ['flask']),
+        ('requests \\\n    ==2.0', ['requests']),
+        ('Django[bcrypt,argon2]>=2.0', ['django']),
+        ('pywin32 ; sys_platform == "win32"', ['pywin32']),
+        ('zope.interface~=5.0', ['zope.interface']),
+        ('a_b-c.d', ['a_b-c.d']),
+        ('pkg @ https://example.com/pkg-1.0.whl', ['pkg']),
+        ('pkg==1.0 --hash=sha256:abcdef', ['pkg']),
+        ('pkg (>=1.0)', ['pkg']),
+        ('-r other.txt\n--requirement=more.txt\n-c constraints.txt', []),
+        ('-i https://pypi.org/simple\n--extra-index-url https://example.com', []),
+        ('-e git+https://github.com/org/repo.git#egg=MyPkg', ['mypkg']),
+        ('--editable=git+https://github.com/org/repo.git@v1#egg=other-pkg&subdirectory=x',
+         ['other-pkg']),
+        ('-e .', []),
+        ('git+https://github.com/org/repo.git', []),
+        ('https://example.com/pkg.tar.gz#egg=pkg', ['pkg']),
+        ('./local/path', []),
+        ('file:///tmp/pkg', []),
+        ('invalid/name', []),
+        ('trailing \\', ['trailing']),
+        ('# comment \\\nflask', ['flask']),
+        ('requests\\\n# comment \\\nflask', ['requests', 'flask']),
+    ])
+    def test_parse(self, content, names):
+        """Test names of required packages."""
+        assert parse_requirements(content) == names
+
+    def test_test_data(self):
+        """Test requirements of test data."""
+        with open('tests/data/requirements.txt', 'r') as f:
+            assert parse_requirements(f.read()) == [
+                'boto', 'chardet', 'cryptography', 'unknown1', 'unknown2', 'flask', 'cookies']
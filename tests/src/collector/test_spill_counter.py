@@ -0,0 +1,97 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test spill counter class."""
+import os
+import random
+from collections import Counter
+from unittest.mock import patch
+from src.collector.spill_counter import SpillCounter
+
+
+def _count(counter, keys):
+    """Count keys with random counts in the given counter."""
+    rng = random.Random(7)
+    for key in keys:
+        counter[key] += rng.randint(1, 3)
+    return counter
+
+
+def _get_keys(size):
+    """Get keys with a long tail, like package sets of manifests."""
+    rng = random.Random(42)
+    return ['k{}'.format(int(rng.paretovariate(1.2))).encode() for _ in range(size)]
+
+
+class TestSpillCounter:
+    """Spill counter test cases."""
+
+    def test_in_memory(self):
+        """Test counts below the memory budget are never spilled."""
+        keys = _get_keys(1000)
+        counter = _count(SpillCounter(1024 * 1024), keys)
+
+        assert counter.spills == 0
+        assert list(counter.most_common()) == _count(Counter(), keys).most_common()
+        assert list(counter.most_common(5)) == _count(Counter(), keys).most_common(5)
+
+    def test_spilled_runs_match_counter(self):
+        """Test merged runs give the same counts and tie order as Counter."""
+        keys = _get_keys(5000)
+        counter = _count(SpillCounter(2000), keys)
+        expected = _count(Counter(), keys)
+
+        assert counter.spills > 0
+        assert list(counter.most_common()) == expected.most_common()
+        assert list(counter.most_common(3)) == expected.most_common(3)
+        counter.close()
+
+    @patch('src.collector.spill_counter.MAX_MERGE_WIDTH', 4)
+    def test_multi_pass_merge(self):
+        """Test more runs than can be merged at once are merged in several passes."""
+        keys = _get_keys(5000)
+        counter = _count(SpillCounter(300), keys)
+
+        assert counter.spills > 16
+        assert list(counter.most_common()) == _count(Counter(), keys).most_common()
+        counter.close()
+
+    def test_bool(self):
+        """Test an empty counter is false, also after spilling."""
+        counter = SpillCounter(1)
+        assert not counter
+
+        counter[b'a'] += 1
+        assert counter
+        assert counter[b'a'] == 0
+        assert list(counter.most_common()) == [(b'a', 1)]
+        counter.close()
+
+    def test_close_removes_runs(self):
+        """Test spilled runs are removed on close."""
+        with patch('src.collector.spill_counter.tempfile.TemporaryDirectory.cleanup') as cleanup:
+            counter = _count(SpillCounter(1), [b'a', b'b'])
+            counter.close()
+
+        cleanup.assert_called_once()
+
+    def test_spill_directory(self, tmpdir):
+        """Test runs are written to the given directory."""
+        counter = _count(SpillCounter(1, str(tmpdir)), [b'a', b'b'])
+
+        assert len(os.listdir(str(tmpdir))) == 1
+        counter.close()
+        assert os.listdir(str(tmpdir)) == []
@@ -0,0 +1,89 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test PyPI validation cache class."""
+import os
+import tempfile
+from unittest.mock import patch
+from src.collector.validation_cache import ValidationCache
+
+
+class TestValidationCache:
+    """PyPI validation cache test cases."""
+
+    def test_put_and_get(self):
+        """Test stored verdicts are found, unknown names are left out."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ValidationCache(os.path.join(tmp, 'cache.sqlite'), 60)
+            cache.put_many({'flask': True, 'not-a-package': False})
+
+            assert cache.get_many(['flask', 'not-a-package', 'django']) == {
+                'flask': True,
+                'not-a-package': False,
+            }
+            assert len(cache) == 2
+            cache.close()
+
+    def test_verdicts_persist(self):
+        """Test verdicts are found again after reopening the file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            cache = ValidationCache(path, 60)
+            cache.put_many({'flask': True})
+            cache.close()
+
+            cache = ValidationCache(path, 60)
+            assert cache.get_many(['flask']) == {'flask': True}
+            cache.close()
+
+    def test_put_replaces_verdict(self):
+        """Test a new verdict replaces the old one."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ValidationCache(os.path.join(tmp, 'cache.sqlite'), 60)
+            cache.put_many({'flask': False})
+            cache.put_many({'flask': True})
+
+            assert cache.get_many(['flask']) == {'flask': True}
+            assert len(cache) == 1
+            cache.close()
+
+    def test_many_names(self):
+        """Test lookup of more names than fit in a single query."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ValidationCache(os.path.join(tmp, 'cache.sqlite'), 60)
+            names = ['pkg{}'.format(i) for i in range(1200)]
+            cache.put_many({name: i % 2 == 0 for i, name in enumerate(names)})
+
+            verdicts = cache.get_many(names)
+            assert len(verdicts) == 1200
+            assert sum(verdicts.values()) == 600
+            cache.close()
+
+    def test_expired_verdicts(self):
+        """Test verdicts older than the ttl are ignored and expired."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ValidationCache(os.path.join(tmp, 'cache.sqlite'), 60)
+            with patch('src.collector.validation_cache.time.time', return_value=1000.0):
+                cache.put_many({'flask': True})
+            with patch('src.collector.validation_cache.time.time', return_value=1050.0):
+                cache.put_many({'django': True})
+
+            with patch('src.collector.validation_cache.time.time', return_value=1070.0):
+                assert cache.get_many(['flask', 'django']) == {'django': True}
+                assert cache.expire() == 1
+
+            assert len(cache) == 1
+            cache.close()
@@ -0,0 +1,75 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test on the fly compression."""
+import io
+import gzip
+import pytest
+from unittest.mock import patch
+from src.datastore.compression import CompressingWriter, get_encoding, get_extension, zstandard
+
+
+class TestCompression:
+    """Compression test cases."""
+
+    def test_extension(self):
+        """Test extensions of the codecs."""
+        assert get_extension('') == ''
+        assert get_extension('gzip') == '.gz'
+
+        with pytest.raises(Exception) as e:
+            get_extension('brotli')
+        assert str(e.value) == 'Unknown output compression brotli'
+
+        with patch('src.datastore.compression.zstandard', None):
+            with pytest.raises(Exception) as e:
+                get_extension('zstd')
+        assert str(e.value) == 'zstandard is required for zstd output compression'
+
+    @pytest.mark.skipif(zstandard is None, reason='zstandard is not installed')
+    def test_zstd_extension(self):
+        """Test extension of zstd when zstandard is installed."""
+        assert get_extension('zstd') == '.zst'
+
+    def test_encoding(self):
+        """Test encodings of file names."""
+        assert get_encoding('collated.json') == ''
+        assert get_encoding('collated.json.gz') == 'gzip'
+        assert get_encoding('collated.json.zst') == 'zstd'
+
+    @patch('src.datastore.compression.BUFFER_SIZE', 16)
+    def test_gzip(self):
+        """Test data written in small chunks is one gzip stream."""
+        stream = io.BytesIO()
+        writer = CompressingWriter(stream, 'gzip')
+        for index in range(100):
+            writer.write('"package-{}": {}, '.format(index, index).encode('utf-8'))
+        writer.close()
+
+        data = gzip.decompress(stream.getvalue())
+        assert data.startswith(b'"package-0": 0, ') and data.endswith(b'"package-99": 99, ')
+        assert writer.bytes_written == len(data) > len(stream.getvalue())
+
+    @pytest.mark.skipif(zstandard is None, reason='zstandard is not installed')
+    def test_zstd(self):
+        """Test zstd compressed data is read back."""
+        stream = io.BytesIO()
+        writer = CompressingWriter(stream, 'zstd')
+        writer.write(b'{"a": 1}')
+        writer.close()
+
+        stream.seek(0)
+        assert zstandard.ZstdDecompressor().stream_reader(stream).read() == b'{"a": 1}'
@@ -0,0 +1,47 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test chunked JSON serialization."""
+import json
+from src.datastore.json_stream import iter_json_object, iter_json_pairs
+
+
+class TestJsonStream:
+    """JSON stream test cases."""
+
+    def test_same_as_json_dumps(self):
+        """Test streamed objects are identical to json.dumps() output."""
+        data = {
+            'maven': {'a:b, c:d': 3, 'e:f': 1},
+            'npm': {},
+            'pypi': {'flask, über': 2, 'quote"d': 1},
+        }
+        items = [(key, iter(value.items())) for key, value in data.items()]
+
+        assert b''.join(iter_json_object(items)) == json.dumps(data).encode('utf-8')
+
+    def test_dict_values(self):
+        """Test dict values are written at once, next to streamed ones."""
+        items = [('maven', {'a': 1}), ('npm', [('b', 2)])]
+
+        assert b''.join(iter_json_object(items)) == b'{"maven": {"a": 1}, "npm": {"b": 2}}'
+        assert b''.join(iter_json_object([])) == b'{}'
+
+    def test_pairs(self):
+        """Test flat objects of pairs."""
+        assert b''.join(iter_json_pairs(iter([('a, b', 2), ('c', 1)]))) == \
+            b'{"a, b": 2, "c": 1}'
+        assert b''.join(iter_json_pairs([])) == b'{}'
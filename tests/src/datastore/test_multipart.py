@@ -0,0 +1,66 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test multipart uploads."""
+import os
+import pytest
+import tempfile
+from unittest.mock import patch
+from src.datastore.local_s3 import LocalS3Client
+from src.datastore.multipart import MultipartWriter
+
+
+@patch('src.datastore.multipart.MIN_PART_SIZE', 4)
+class TestMultipartWriter:
+    """Multipart writer test cases."""
+
+    def test_parts(self):
+        """Test written data is uploaded in parts of part size."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp, min_part_size=4)
+            with MultipartWriter(client, 'bucket', 'data/file.json', 4) as writer:
+                for chunk in (b'{"a"', b': 1, ', b'"bc": 22', b'}'):
+                    writer.write(chunk)
+
+            assert len(writer._parts) == 5
+            with client.get_object(Bucket='bucket', Key='data/file.json')['Body'] as f:
+                assert f.read() == b'{"a": 1, "bc": 22}'
+            assert client.metadata[('bucket', 'data/file.json')] == {
+                'ContentType': 'application/json'}
+            assert os.listdir(os.path.join(tmp, '.uploads')) == []
+
+    def test_empty(self):
+        """Test an empty object is uploaded as one empty part."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            with MultipartWriter(client, 'bucket', 'empty', 4):
+                pass
+
+            with client.get_object(Bucket='bucket', Key='empty')['Body'] as f:
+                assert f.read() == b''
+
+    def test_abort(self):
+        """Test a failure aborts the upload and leaves no object."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            with pytest.raises(Exception) as e:
+                with MultipartWriter(client, 'bucket', 'file.json', 4) as writer:
+                    writer.write(b'0123456789')
+                    raise Exception('Serialization failed')
+
+            assert str(e.value) == 'Serialization failed'
+            assert not os.path.exists(os.path.join(tmp, 'bucket', 'file.json'))
+            assert os.listdir(os.path.join(tmp, '.uploads')) == []
@@ -15,10 +15,16 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Test persistence store class."""
+import os
+import gzip
 import pytest
+import tempfile
 import unittest
 from unittest import mock
 from unittest.mock import patch
+from src.config.settings import SETTINGS
+from src.datastore.local_s3 import LocalS3Client
+from src.datastore.compression import zstandard
 from src.datastore.persistence_store import PersistenceStore
 
 
@@ -53,6 +59,15 @@ class S3NewUpload(S3NotConnected):
         """Mock to write json file."""
         pass
 
+    def download_file(self, src, target):
+        """Mock to download a file."""
+        with open(target, 'w') as f:
+            f.write(src)
+
+    def upload_file(self, src, target):
+        """Mock to upload a file."""
+        self.uploaded = (src, target)
+
 
 class S3ExistingEmptyUpload(S3NewUpload):
     """S3 class with existing file containing no content."""
@@ -74,6 +89,44 @@ class S3ExistingUpload(S3ExistingEmptyUpload):
         return {'test': 'cool'}
 
 
+class S3ExistingPlainUpload(S3ExistingUpload):
+    """S3 class with an existing uncompressed file only."""
+
+    def object_exists(self, fname):
+        """Mock function to check if object exists."""
+        return not fname.endswith(('.gz', '.zst'))
+
+    def read_json_file(self, fname):
+        """Read json file mock function."""
+        return {'maven': {'b': 2}}
+
+
+class StreamingBody():
+    """Body of a boto3 response, it can only be read and closed."""
+
+    def __init__(self, f):
+        """Wrap an open file."""
+        self._f = f
+
+    def read(self, size=-1):
+        """Read from the body."""
+        return self._f.read(size)
+
+    def close(self):
+        """Close the body."""
+        self._f.close()
+
+
+class BotoLikeS3Client(LocalS3Client):
+    """Local S3 client returning bodies like boto3 does."""
+
+    def get_object(self, Bucket, Key):
+        """Get an object, its body has no context manager support."""
+        response = super().get_object(Bucket, Key)
+        response['Body'] = StreamingBody(response['Body'])
+        return response
+
+
 class TestPersistenceStore(unittest.TestCase):
     """Unit test cases for Data processing class."""
 
@@ -123,3 +176,147 @@ class TestPersistenceStore(unittest.TestCase):
             ps.update({'test': 'super cool'}, 'bucket_name', 'filename.json')
         except Exception:
             assert False, 'Exception raised'
+
+    def test_download_missing_file(self):
+        """Download an object that does not exist."""
+        ps = PersistenceStore(s3_client=S3NewUpload())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            assert not ps.download_file('cache.sqlite', path)
+            assert not os.path.exists(path)
+
+    def test_download_existing_file(self):
+        """Download an existing object to a local file."""
+        ps = PersistenceStore(s3_client=S3ExistingUpload())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            assert ps.download_file('cache.sqlite', path)
+            with open(path) as f:
+                assert f.read() == 'cache.sqlite'
+
+    def test_upload_file(self):
+        """Upload a local file."""
+        ps = PersistenceStore(s3_client=S3NewUpload())
+        ps.upload_file('/tmp/cache.sqlite', 'cache.sqlite')
+
+        assert ps.s3_client.uploaded == ('/tmp/cache.sqlite', 'cache.sqlite')
+
+    def test_upload_file_no_connection(self):
+        """Upload a local file without connection."""
+        ps = PersistenceStore(s3_client=S3NotConnected())
+
+        with pytest.raises(Exception) as e:
+            ps.upload_file('/tmp/cache.sqlite', 'cache.sqlite')
+
+        assert str(e.value) == 'Unable to connect to s3.'
+
+    def test_stream_update_new_file(self):
+        """Stream sections to a new file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3NewUpload(), multipart_client=client)
+            ps.stream_update({'npm': iter([('a, b', 2), ('c', 1)]), 'pypi': iter([])},
+                             'bucket_name', 'data/collated.json')
+
+            with client.get_object(Bucket='bucket_name', Key='data/collated.json')['Body'] as f:
+                assert f.read() == b'{"npm": {"a, b": 2, "c": 1}, "pypi": {}}'
+
+    def test_stream_update_existing_file(self):
+        """Stream sections into an existing file, keeping its other keys in place."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3ExistingUpload(), multipart_client=client)
+            ps.stream_update({'npm': iter([('a', 1)]), 'test': iter([('b', 2)])},
+                             'bucket_name', 'collated.json')
+
+            with client.get_object(Bucket='bucket_name', Key='collated.json')['Body'] as f:
+                assert f.read() == b'{"test": {"b": 2}, "npm": {"a": 1}}'
+
+            ps.stream_update({'npm': iter([])}, 'bucket_name', 'collated.json', merge=False)
+            with client.get_object(Bucket='bucket_name', Key='collated.json')['Body'] as f:
+                assert f.read() == b'{"npm": {}}'
+
+    def test_write_object(self):
+        """Write an object at once or streamed, without reading the existing one."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3ExistingUpload(), multipart_client=client)
+            ps.s3_client.read_json_file = mock.Mock()
+            ps.write_object(iter([('a, b', 2), ('c', 1)]), 'bucket_name', 'maven.json')
+            with client.get_object(Bucket='bucket_name', Key='maven.json')['Body'] as f:
+                assert f.read() == b'{"a, b": 2, "c": 1}'
+
+            with patch.object(SETTINGS, 'output_streaming', True):
+                ps.write_object(iter([('d', 3)]), 'bucket_name', 'maven.json')
+            with client.get_object(Bucket='bucket_name', Key='maven.json')['Body'] as f:
+                assert f.read() == b'{"d": 3}'
+            ps.s3_client.read_json_file.assert_not_called()
+
+    @patch.object(SETTINGS, 'output_compression', 'gzip')
+    def test_write_object_compressed(self):
+        """Write a gzip compressed object, named and typed accordingly."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3NewUpload(), multipart_client=client)
+            assert ps.write_object(iter([('a', 1)]), 'bucket_name', 'maven.json') == \
+                'maven.json.gz'
+
+            response = client.get_object(Bucket='bucket_name', Key='maven.json.gz')
+            with response['Body'] as f:
+                assert gzip.decompress(f.read()) == b'{"a": 1}'
+            assert response['ContentType'] == 'application/gzip'
+            assert 'ContentEncoding' not in response
+
+    @pytest.mark.skipif(zstandard is None, reason='zstandard is not installed')
+    @patch.object(SETTINGS, 'output_compression', 'zstd')
+    def test_stream_update_compressed(self):
+        """Stream sections into an existing zstd compressed file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3NewUpload(), multipart_client=client)
+            assert ps.stream_update({'maven': iter([('a', 1)])}, 'bucket_name') == \
+                'collated.json.zst'
+
+            ps.s3_client = S3ExistingUpload()
+            ps.stream_update({'npm': iter([('b', 2)])}, 'bucket_name')
+            response = client.get_object(Bucket='bucket_name', Key='collated.json.zst')
+            with response['Body'] as f:
+                data = zstandard.ZstdDecompressor().stream_reader(f).read()
+            assert data == b'{"maven": {"a": 1}, "npm": {"b": 2}}'
+            assert response['ContentType'] == 'application/zstd'
+
+    @patch.object(SETTINGS, 'output_compression', 'gzip')
+    def test_update_compressed(self):
+        """Update a compressed file without streaming, merging the uncompressed file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = LocalS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3ExistingPlainUpload(), multipart_client=client)
+            ps.s3_client.write_json_file = mock.Mock()
+            assert ps.update({'npm': {'a': 1}}, 'bucket_name') == 'collated.json.gz'
+
+            with client.get_object(Bucket='bucket_name', Key='collated.json.gz')['Body'] as f:
+                assert gzip.decompress(f.read()) == b'{"maven": {"b": 2}, "npm": {"a": 1}}'
+            ps.s3_client.write_json_file.assert_not_called()
+
+    @patch.object(SETTINGS, 'output_compression', 'gzip')
+    def test_stream_update_compressed_boto_body(self):
+        """Merge into a compressed file read through a boto3 like body."""
+        with tempfile.TemporaryDirectory() as tmp:
+            client = BotoLikeS3Client(tmp)
+            ps = PersistenceStore(s3_client=S3NewUpload(), multipart_client=client)
+            ps.stream_update({'maven': iter([('a', 1)])}, 'bucket_name')
+
+            ps.s3_client = S3ExistingUpload()
+            ps.stream_update({'npm': iter([('b', 2)])}, 'bucket_name')
+            with open(os.path.join(tmp, 'bucket_name', 'collated.json.gz'), 'rb') as f:
+                assert gzip.decompress(f.read()) == b'{"maven": {"a": 1}, "npm": {"b": 2}}'
+
+    @patch.object(SETTINGS, 'output_compression', 'zstd')
+    @patch('src.datastore.compression.zstandard', None)
+    def test_init_without_zstandard(self):
+        """Test zstd output compression fails at once when zstandard is not installed."""
+        with pytest.raises(Exception) as e:
+            PersistenceStore(s3_client=S3NewUpload())
+        assert str(e.value) == 'zstandard is required for zstd output compression'
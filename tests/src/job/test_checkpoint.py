@@ -0,0 +1,116 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test checkpoints of a data job run."""
+import os
+import pytest
+import tempfile
+from unittest import mock
+from src.collector.base_collector import BaseCollector
+from src.job.checkpoint import Checkpoint
+
+
+class WordCollector(BaseCollector):
+    """Collects words of the content as packages."""
+
+    def __init__(self):
+        """Word collector init."""
+        super().__init__('words')
+
+    def parse_and_collect(self, content, _, count=1):
+        """Split content in words."""
+        return self._update_counter(content.split(), count)
+
+
+class TestCheckpoint:
+    """Checkpoint test cases."""
+
+    def test_save_and_restore(self):
+        """Test restored collectors match the ones saved in several deltas."""
+        collectors = {'words': WordCollector()}
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Checkpoint(tmp)
+            assert checkpoint.load() is None
+            checkpoint.start({'words': 'job'}, collectors)
+
+            collectors['words'].parse_and_collect('b a', True)
+            collectors['words'].parse_and_collect('c', True, 2)
+            checkpoint.save(collectors, {'job': 2})
+            collectors['words'].parse_and_collect('a b', True)
+            collectors['words'].parse_and_collect('d c', True)
+            checkpoint.save(collectors, {'job': 4})
+            # Rows after the last checkpoint are read again on resume.
+            collectors['words'].parse_and_collect('e', True)
+
+            resumed = Checkpoint(tmp)
+            manifest = resumed.load()
+            assert manifest['jobs'] == [['words', 'job']]
+            assert manifest['deltas'] == ['delta-0.json.gz', 'delta-1.json.gz']
+
+            restored = {'words': WordCollector()}
+            assert resumed.restore(restored) == {'job': 4}
+            assert restored['words'].most_common() == [('a, b', 2), ('c', 2), ('c, d', 1)]
+            assert restored['words'].package_names == ['a', 'b', 'c', 'd']
+
+            # Restored collectors keep saving deltas of new counts only.
+            restored['words'].parse_and_collect('e', True)
+            resumed.save(restored, {'job': 5})
+            assert Checkpoint(tmp).load()['offsets'] == {'job': 5}
+
+    def test_complete(self):
+        """Test a completed run is not resumed and a new start drops its deltas."""
+        collectors = {'words': WordCollector()}
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Checkpoint(tmp)
+            checkpoint.start({None: 'job'}, collectors)
+            checkpoint.save(collectors, {'job': 0})
+            checkpoint.complete()
+            assert Checkpoint(tmp).load() is None
+
+            Checkpoint(tmp).start({None: 'job'}, collectors)
+            assert not os.path.exists(os.path.join(tmp, 'delta-0.json.gz'))
+
+    def test_ecosystem_mismatch(self):
+        """Test a checkpoint of other ecosystems is not restored."""
+        with tempfile.TemporaryDirectory() as tmp:
+            collectors = {'words': WordCollector()}
+            checkpoint = Checkpoint(tmp)
+            checkpoint.start({None: 'job'}, collectors)
+            checkpoint.save(collectors, {'job': 0})
+
+            resumed = Checkpoint(tmp)
+            resumed.load()
+            with pytest.raises(Exception) as e:
+                resumed.restore({'other': WordCollector()})
+
+            assert str(e.value) == 'Checkpoint of ecosystems words does not match other'
+
+    def test_data_store(self):
+        """Test checkpoint files are uploaded and downloaded when missing locally."""
+        data_store = mock.Mock()
+        data_store.download_file.return_value = False
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Checkpoint(tmp, data_store)
+            assert checkpoint.load() is None
+            data_store.download_file.assert_called_once_with(
+                'big-query-data/checkpoint/checkpoint.json', os.path.join(tmp, 'checkpoint.json'))
+
+            collectors = {'words': WordCollector()}
+            checkpoint.start({None: 'job'}, collectors)
+            checkpoint.save(collectors, {'job': 0})
+            assert [c[0][1] for c in data_store.upload_file.call_args_list] == [
+                'big-query-data/checkpoint/delta-0.json.gz',
+                'big-query-data/checkpoint/checkpoint.json']
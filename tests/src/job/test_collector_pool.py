@@ -0,0 +1,102 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test collector process pool."""
+from unittest.mock import patch
+from src.config.settings import SETTINGS
+from src.collector.base_collector import BaseCollector
+from src.job.collector_pool import CollectorPool
+
+
+class WordCollector(BaseCollector):
+    """Collects words of the content as packages."""
+
+    def __init__(self):
+        """Word collector init."""
+        super().__init__('words')
+
+    def parse_and_collect(self, content, _, count=1):
+        """Split content in words."""
+        return self._update_counter(content.split(), count)
+
+
+CONTENTS = ['a b', 'c', 'a b', 'd e f', 'c', 'g', 'a b', 'g', 'h'] * 7
+
+
+class TestCollectorPool:
+    """Collector pool test cases."""
+
+    def _serial(self):
+        """Collect contents in the current process."""
+        collector = WordCollector()
+        for content in CONTENTS:
+            collector.parse_and_collect(content, True)
+        return collector
+
+    def test_merge_matches_serial_run(self):
+        """Test merged counters are identical to a serial run."""
+        collectors = {'words': WordCollector()}
+        pool = CollectorPool(collectors, 2, 4)
+        for content in CONTENTS:
+            pool.add('words', content)
+        pool.close()
+
+        assert collectors['words'].most_common() == self._serial().most_common()
+
+    def test_partial_batch(self):
+        """Test a batch smaller than batch size is collected on close."""
+        collectors = {'words': WordCollector()}
+        pool = CollectorPool(collectors, 2, 1000)
+        pool.add('words', 'a b')
+        pool.close()
+
+        assert dict(collectors['words'].most_common()) == {'a, b': 1}
+
+    def test_counts(self):
+        """Test manifest counts are sent to the workers."""
+        collectors = {'words': WordCollector()}
+        pool = CollectorPool(collectors, 2, 1)
+        pool.add('words', 'a b', 5)
+        pool.add('words', 'a b')
+        pool.close()
+
+        assert dict(collectors['words'].most_common()) == {'a, b': 6}
+
+    @patch.object(SETTINGS, 'parse_cache_size', 10)
+    def test_parse_cache(self):
+        """Test workers use a parse cache and report its stats."""
+        collectors = {'words': WordCollector()}
+        pool = CollectorPool(collectors, 1, 3)
+        for content in CONTENTS:
+            pool.add('words', content)
+        pool.close()
+
+        assert collectors['words'].most_common() == self._serial().most_common()
+        assert pool.cache_stats['hits'] + pool.cache_stats['misses'] == len(CONTENTS)
+        assert pool.cache_stats['misses'] == 5
+
+    def test_flush(self):
+        """Test flush merges all queued manifests and the pool keeps running."""
+        collectors = {'words': WordCollector()}
+        pool = CollectorPool(collectors, 2, 1000)
+        pool.add('words', 'a b')
+        pool.flush()
+
+        assert dict(collectors['words'].most_common()) == {'a, b': 1}
+        pool.add('words', 'a b')
+        pool.close()
+
+        assert dict(collectors['words'].most_common()) == {'a, b': 2}
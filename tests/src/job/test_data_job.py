@@ -15,9 +15,13 @@
 # Author: Dharmendra G Patel <dhpatel@redhat.com>
 #
 """Test data job class."""
+import os
+import pytest
+import tempfile
 import unittest
 from unittest import mock
 from unittest.mock import patch
+from src.config.settings import SETTINGS
 from src.job.data_job import DataJob
 
 
@@ -33,11 +37,11 @@ class MockBigquery(mock.Mock):
     """Mocks Google's Big Query Runner."""
 
     def run(self, query):
-        """Run the bigquery synchronously."""
-        return 1234
+        """Run the bigquery synchronously, query itself is used as job id."""
+        return query
 
-    def get_result(self):
-        """Get last query results."""
+    def get_result(self, job_id=None, start_index=0):
+        """Get query results, only manifests named in the query when a job id is given."""
         bigquery_data = []
 
         with open('tests/data/pom.xml', 'r') as f:
@@ -68,7 +72,8 @@ class MockBigquery(mock.Mock):
             'content': 'dummy_content',
         })
 
-        return bigquery_data
+        return [row for row in bigquery_data
+                if job_id is None or os.path.basename(row['path']) in job_id][start_index:]
 
 
 class TestDataJob(unittest.TestCase):
@@ -79,7 +84,7 @@ class TestDataJob(unittest.TestCase):
     def test_big_query(self, _bq, _ps):
         """Test data job init."""
         dj = DataJob()
-        assert dj.big_query is not None
+        assert dj.source is not None
         assert dj.collectors is not None
         assert len(dj.collectors) == 3
         assert dj.data_store is not None
@@ -90,17 +95,389 @@ class TestDataJob(unittest.TestCase):
         """Test data job run."""
         dj = DataJob()
         dj.run()
+        self._assert_collected_data(dj)
 
+    @patch.object(SETTINGS, 'prefetch_queue_depth', 2)
+    @patch.object(SETTINGS, 'prefetch_page_size', 2)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_data_processing_with_prefetch(self, _bq, _ps):
+        """Test data job run with background prefetching."""
+        dj = DataJob()
+        dj.run()
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'collector_workers', 2)
+    @patch.object(SETTINGS, 'collector_batch_size', 2)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_data_processing_with_workers(self, _bq, _ps):
+        """Test data job run with collectors in worker processes."""
+        dj = DataJob()
+        dj.run()
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'isolated_parsing', True)
+    @patch.object(SETTINGS, 'collector_workers', 2)
+    @patch.object(SETTINGS, 'collector_batch_size', 2)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_data_processing_isolated(self, _bq, _ps):
+        """Test data job run with collectors in supervised worker processes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'quarantine.jsonl')
+            with patch.object(SETTINGS, 'quarantine_path', path):
+                dj = DataJob()
+                dj.run()
+
+            assert not os.path.exists(path)
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'bigquery_query_mode', 'combined')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_data_processing_combined_query(self, _bq, _ps):
+        """Test data job run with a single query for all ecosystems."""
+        dj = DataJob()
+        dj.run()
+        self._assert_collected_data(dj)
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_per_ecosystem(self, _bq, _ps):
+        """Test one query is built per ecosystem."""
+        dj = DataJob()
+        assert dj._run_queries() == {
+            ecosystem: dj._get_big_query([ecosystem]) for ecosystem in ('maven', 'npm', 'pypi')}
+        assert "LIKE '%pom.xml'" in dj._get_big_query(['maven'])
+        assert "(?i)java" in dj._get_big_query(['maven'])
+        assert "LIKE '%package.json'" not in dj._get_big_query(['maven'])
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_ecosystem_subset(self, _bq, _ps):
+        """Test data job run for a subset of ecosystems."""
+        dj = DataJob(ecosystems=['npm', 'pypi'])
+        assert list(dj.collectors.keys()) == ['npm', 'pypi']
+        dj.run()
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'job_ecosystems', 'maven, npm')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_ecosystem_subset_from_settings(self, _bq, _ps):
+        """Test data job ecosystems from settings."""
+        dj = DataJob()
+        assert list(dj.collectors.keys()) == ['maven', 'npm']
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_unknown_ecosystem(self, _bq, _ps):
+        """Test data job with unknown ecosystem."""
+        with pytest.raises(Exception) as e:
+            DataJob(ecosystems=['golang'])
+
+        assert str(e.value) == 'Unknown ecosystem golang'
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_spool_and_replay(self, _bq, _ps):
+        """Test data job replay of a spooled big query result."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spool_path = os.path.join(tmp_dir, 'rows.jsonl.gz')
+            with patch.object(SETTINGS, 'spool_path', spool_path):
+                DataJob().run()
+
+            with patch('src.job.data_job.Bigquery', side_effect=Exception('No client')):
+                dj = DataJob(source_path=spool_path)
+                dj.run()
+
+        self._assert_collected_data(dj)
+
+    @patch('src.job.data_job.Bigquery', side_effect=Exception('No client'))
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_file_source_data_processing(self, _bq, _ps):
+        """Test data job run over a directory tree of manifests."""
+        dj = DataJob(source_path='tests/data')
+        dj.run()
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'bigquery_dedup_content', True)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_dedup_content(self, _bq, _ps):
+        """Test deduplicated query groups by content and rows are counted count times."""
+        dj = DataJob()
+        query = dj._get_big_query(['npm'])
+        assert 'GROUP BY con.id' in query
+        assert 'COUNT(*) AS count' in query
+        assert 'manifest' not in query
+
+        query = dj._get_big_query(['npm', 'pypi'])
+        assert ("CASE WHEN L.path LIKE '%package.json' THEN 'package.json' "
+                "WHEN L.path LIKE '%requirements.txt' THEN 'requirements.txt' END AS manifest"
+                in query)
+        assert 'GROUP BY con.id, manifest' in query
+
+        with patch.object(MockBigquery, 'get_result', lambda self, job_id=None: [
+                {'path': 'a/package.json', 'content': '{"dependencies": {"ejs": "1.0.0"}}',
+                 'count': 3}]):
+            dj = DataJob(ecosystems=['npm'])
+            dj.run()
+
+        assert dict(dj.collectors['npm'].most_common()) == {'ejs': 3}
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_prefilter(self, _bq, _ps):
+        """Test manifests without dependencies are skipped and counted per ecosystem."""
+        get_result = MockBigquery.get_result
+
+        def get_result_with_empty_manifests(self, job_id=None):
+            empty_manifests = [
+                {'path': 'a/package.json', 'content': '{"name": "a", "version": "1.0.0"}'},
+                {'path': 'a/pom.xml', 'content': '<project><artifactId>a</artifactId></project>'},
+                {'path': 'a/requirements.txt', 'content': '# no requirements\n\n'},
+            ]
+            return get_result(self, job_id) + [
+                row for row in empty_manifests
+                if job_id is None or os.path.basename(row['path']) in job_id]
+
+        with patch.object(MockBigquery, 'get_result', get_result_with_empty_manifests):
+            dj = DataJob()
+            dj.run()
+
+        self._assert_collected_data(dj)
+        assert dj.prefilter_stats['rows'] == {'maven': 2, 'npm': 2, 'pypi': 2}
+        assert dj.prefilter_stats['skipped'] == {'maven': 1, 'npm': 1, 'pypi': 1}
+
+    @patch.object(SETTINGS, 'parse_cache_size', 10)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_data_processing_with_parse_cache(self, _bq, _ps):
+        """Test data job run with parse cache, repeated manifests hit the cache."""
+        dj = DataJob()
+        assert dj.parse_cache is not None
+        dj.run()
+        self._assert_collected_data(dj)
+        assert dj.parse_cache.stats['misses'] == 3
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_pypi_validation_cache(self, _bq, _ps):
+        """Test PyPI validation cache is loaded at start and saved after the run."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            with patch.object(SETTINGS, 'pypi_validation_cache_path', path):
+                dj = DataJob()
+                dj.run()
+
+            filename = 'big-query-data/pypi_validation_cache.sqlite'
+            dj.data_store.download_file.assert_called_once_with(filename, path)
+            dj.data_store.upload_file.assert_called_once_with(path, filename)
+            assert len(dj.collectors['pypi'].validation_cache) > 0
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'spill')
+    @patch.object(SETTINGS, 'aggregation_memory_budget', 0)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_spill_backend(self, _bq, _ps):
+        """Test data job run with package sets spilled to disk."""
+        dj = DataJob()
+        with patch.object(dj.data_store, 'update') as update:
+            dj.run()
+
+        assert update.call_args[1]['data'] == {
+            'maven': {'org.apache.camel:camel-spring-boot-starter, '
+                      'org.springframework.boot:spring-boot-starter-web': 1},
+            'npm': {'request, winston, xml2object': 1},
+            'pypi': {'boto, chardet, cookies, cryptography, flask': 1},
+        }
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'topk')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_topk_backend(self, _bq, _ps):
+        """Test top-K counts are saved with their error estimates."""
+        dj = DataJob()
+        with patch.object(dj.data_store, 'update') as update:
+            dj.run()
+
+        self._assert_collected_data(dj)
+        assert update.call_count == 2
+        assert update.call_args[1]['filename'] == 'big-query-data/collated_errors.json'
+        assert update.call_args[1]['data'] == {
+            'maven': {'org.apache.camel:camel-spring-boot-starter, '
+                      'org.springframework.boot:spring-boot-starter-web': 0},
+            'npm': {'request, winston, xml2object': 0},
+            'pypi': {'boto, chardet, cookies, cryptography, flask': 0},
+        }
+
+    @patch.object(SETTINGS, 'checkpoint_interval', 0)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_checkpoint_resume(self, _bq, _ps):
+        """Test a run failing to update S3 is resumed without reading its rows again."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(SETTINGS, 'checkpoint_path', tmp):
+                dj = DataJob()
+                with patch.object(dj.data_store, 'update', side_effect=Exception('S3 error')):
+                    with pytest.raises(Exception):
+                        dj.run()
+
+                dj = DataJob()
+                assert set(dj.offsets.values()) == {1}
+                with patch.object(DataJob, '_run_queries') as run_queries:
+                    dj.run()
+                run_queries.assert_not_called()
+                self._assert_collected_data(dj)
+
+                # A finished run is not resumed.
+                assert DataJob().jobs is None
+
+    @patch.object(SETTINGS, 'checkpoint_path', 'checkpoint')
+    @patch.object(SETTINGS, 'bigquery_fetch_mode', 'storage')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_checkpoint_storage_mode(self, _bq, _ps):
+        """Test checkpoints are refused with the storage fetch mode."""
+        with pytest.raises(Exception) as e:
+            DataJob()
+
+        assert str(e.value) == 'Checkpoints are only supported with the rest fetch mode'
+
+    @patch.object(SETTINGS, 'checkpoint_path', 'checkpoint')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_checkpoint_aggregation_backend(self, _bq, _ps):
+        """Test checkpoints are refused with aggregation backends other than counter."""
+        for backend in ('spill', 'topk'):
+            with patch.object(SETTINGS, 'aggregation_backend', backend):
+                with pytest.raises(Exception) as e:
+                    DataJob()
+
+            assert str(e.value) == \
+                'Checkpoints are only supported with the counter aggregation backend'
+
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_shard(self, _bq, _ps):
+        """Test a shard queries its part of the manifests and saves a partial result."""
+        dj = DataJob(shard=(1, 4))
+        assert 'AND MOD(ABS(MOD(FARM_FINGERPRINT(files.id), 4)), 4) = 1' in \
+            dj._get_big_query(['npm'])
+        assert 'FARM_FINGERPRINT' not in DataJob()._get_big_query(['npm'])
+
+        with patch.object(dj.data_store, 'update') as update:
+            dj.run()
+
+        update.assert_not_called()
+        path, filename = dj.data_store.upload_file.call_args[0]
+        assert filename == 'big-query-data/shards/latest/partial-0001-of-0004.jsonl.gz'
+        assert not os.path.exists(path)
+        self._assert_collected_data(dj)
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'topk')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_shard_topk(self, _bq, _ps):
+        """Test shards are refused with top-K counts, their partials can not be merged."""
+        with pytest.raises(Exception) as e:
+            DataJob(shard=(0, 2))
+
+        assert str(e.value) == 'Shards are not supported with the topk aggregation backend'
+
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_file_source_shard(self, _ps):
+        """Test shards are refused when reading rows from files."""
+        with pytest.raises(Exception) as e:
+            DataJob(source_path='tests/data', shard=(0, 2))
+
+        assert str(e.value) == 'Shards are only supported with Big Query'
+
+    @patch.object(SETTINGS, 'output_streaming', True)
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_output_streaming(self, _bq, _ps):
+        """Test collated data is streamed, other ecosystems are only kept for a subset."""
+        dj = DataJob()
+        sections = {}
+        dj.data_store.stream_update.side_effect = lambda **kwargs: sections.update(
+            {ecosystem: dict(pairs) for ecosystem, pairs in kwargs['sections'].items()})
+        dj.run()
+
+        assert dj.data_store.stream_update.call_args[1]['merge'] is False
+        assert sections == {
+            'maven': {'org.apache.camel:camel-spring-boot-starter, '
+                      'org.springframework.boot:spring-boot-starter-web': 1},
+            'npm': {'request, winston, xml2object': 1},
+            'pypi': {'boto, chardet, cookies, cryptography, flask': 1},
+        }
+
+        dj = DataJob(ecosystems=['npm'])
+        dj.run()
+        assert dj.data_store.stream_update.call_args[1]['merge'] is True
+
+    @patch.object(SETTINGS, 'output_layout', 'both')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_ecosystem_objects(self, _bq, _ps):
+        """Test each ecosystem is written to its own object next to the legacy file."""
+        dj = DataJob()
+        objects = {}
+        dj.data_store.write_object.side_effect = lambda pairs, bucket_name, filename: \
+            objects.update({filename: dict(pairs)}) or filename
+        with patch.object(dj.data_store, 'update') as update:
+            dj.run()
+
+        assert objects == {
+            'big-query-data/maven.json': {
+                'org.apache.camel:camel-spring-boot-starter, '
+                'org.springframework.boot:spring-boot-starter-web': 1},
+            'big-query-data/npm.json': {'request, winston, xml2object': 1},
+            'big-query-data/pypi.json': {'boto, chardet, cookies, cryptography, flask': 1},
+        }
+        index, collated = update.call_args_list
+        assert index[1]['filename'] == 'big-query-data/index.json'
+        assert index[1]['data']['npm']['filename'] == 'big-query-data/npm.json'
+        assert set(index[1]['data']) == {'maven', 'npm', 'pypi'}
+        assert collated[1]['filename'] == 'big-query-data/collated.json'
+        assert collated[1]['data']['npm'] == {'request, winston, xml2object': 1}
+
+    @patch.object(SETTINGS, 'output_layout', 'ecosystem')
+    @patch.object(SETTINGS, 'output_compression', 'gzip')
+    @patch.object(SETTINGS, 'aggregation_backend', 'topk')
+    @patch('src.job.data_job.Bigquery', new_callable=MockBigquery)
+    @patch('src.job.data_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_big_query_ecosystem_objects_topk(self, _bq, _ps):
+        """Test top-K error estimates and encoding of each ecosystem are listed in the index."""
+        dj = DataJob(ecosystems=['npm'])
+        dj.data_store.write_object.side_effect = lambda pairs, bucket_name, filename: \
+            filename + '.gz'
+        with patch.object(dj.data_store, 'update') as update:
+            dj.run()
+
+        filenames = [c[0][2] for c in dj.data_store.write_object.call_args_list]
+        assert filenames == ['big-query-data/npm.json', 'big-query-data/npm_errors.json']
+        update.assert_called_once()
+        assert update.call_args[1]['data']['npm']['filename'] == 'big-query-data/npm.json.gz'
+        assert update.call_args[1]['data']['npm']['errors_filename'] == \
+            'big-query-data/npm_errors.json.gz'
+        assert update.call_args[1]['data']['npm']['encoding'] == 'gzip'
+
+    def _assert_collected_data(self, dj):
+        """Check collected data of the mocked big query result."""
         for ecosystem, object in dj.collectors.items():
             if ecosystem == 'maven':
-                maven_data = dict(object.counter.most_common())
+                maven_data = dict(object.most_common())
                 assert maven_data == {'org.apache.camel:camel-spring-boot-starter, '
                                       'org.springframework.boot:spring-boot-starter-web': 1}
 
             elif ecosystem == 'pypi':
-                pypi_data = dict(object.counter.most_common())
+                pypi_data = dict(object.most_common())
                 assert pypi_data == {'boto, chardet, cookies, cryptography, flask': 1}
 
             elif ecosystem == 'npm':
-                npm_data = dict(object.counter.most_common())
+                npm_data = dict(object.most_common())
                 assert npm_data == {'request, winston, xml2object': 1}
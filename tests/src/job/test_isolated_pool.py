@@ -0,0 +1,102 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test isolated collector process pool."""
+import os
+import json
+import time
+from src.collector.base_collector import BaseCollector
+from src.collector.pypi_collector import PypiCollector
+from src.job.isolated_pool import IsolatedPool
+
+
+class FaultyCollector(BaseCollector):
+    """Collects words of the content as packages, some words misbehave."""
+
+    def __init__(self):
+        """Faulty collector init."""
+        super().__init__('words')
+
+    def parse_and_collect(self, content, _, count=1):
+        """Split content in words, stall, allocate too much or crash on request."""
+        if content == 'stall':
+            time.sleep(60)
+        if content == 'allocate':
+            return self._update_counter([str(len(bytearray(1024 * 1024 * 1024)))], count)
+        if content == 'crash':
+            os._exit(1)
+        self.stats['parsed'] += 1
+        return self._update_counter(content.split(), count)
+
+
+CONTENTS = ['a b', 'c', 'a b', 'd e f', 'c', 'g', 'a b', 'g', 'h'] * 3
+
+
+class TestIsolatedPool:
+    """Isolated pool test cases."""
+
+    def _serial(self, contents):
+        """Collect contents in the current process."""
+        collector = FaultyCollector()
+        for content in contents:
+            collector.parse_and_collect(content, True)
+        return collector
+
+    def _collect(self, tmpdir, contents, workers=2, batch_size=4):
+        """Collect contents in an isolated pool."""
+        collectors = {'words': FaultyCollector()}
+        pool = IsolatedPool(collectors, workers, batch_size, 2, 256 * 1024 * 1024,
+                            str(tmpdir.join('quarantine.jsonl')))
+        for content in contents:
+            pool.add('words', content)
+        pool.close()
+        return collectors['words'], pool
+
+    def test_merge_matches_serial_run(self, tmpdir):
+        """Test merged counters and stats are identical to a serial run."""
+        collector, pool = self._collect(tmpdir, CONTENTS)
+
+        assert collector.most_common() == self._serial(CONTENTS).most_common()
+        assert collector.stats == {'parsed': len(CONTENTS)}
+        assert pool.stats == {}
+        assert not tmpdir.join('quarantine.jsonl').exists()
+
+    def test_faulty_manifests_are_quarantined(self, tmpdir):
+        """Test stalling, allocating and crashing manifests do not stop the others."""
+        contents = CONTENTS[:4] + ['stall'] + CONTENTS[4:8] + ['allocate', 'crash'] + CONTENTS[8:]
+        collector, pool = self._collect(tmpdir, contents, workers=1)
+
+        assert collector.most_common() == self._serial(CONTENTS).most_common()
+        assert pool.stats == {'timeouts': 1, 'memory': 1, 'crashes': 1, 'quarantined': 3}
+        with open(str(tmpdir.join('quarantine.jsonl'))) as f:
+            records = [json.loads(line) for line in f]
+        assert records == [
+            {'ecosystem': 'words', 'reason': 'timeouts', 'count': 1, 'content': 'stall'},
+            {'ecosystem': 'words', 'reason': 'memory', 'count': 1, 'content': 'allocate'},
+            {'ecosystem': 'words', 'reason': 'crashes', 'count': 1, 'content': 'crash'},
+        ]
+
+    def test_collector_out_of_memory_is_quarantined(self, tmpdir):
+        """Test memory exceeded by a real collector is not swallowed as bad content."""
+        collectors = {'pypi': PypiCollector()}
+        pool = IsolatedPool(collectors, 1, 4, 10, 32 * 1024 * 1024,
+                            str(tmpdir.join('quarantine.jsonl')))
+        for content in ['flask', '\n'.join('p{}'.format(i) for i in range(1000000)), 'six']:
+            pool.add('pypi', content)
+        pool.close()
+
+        assert collectors['pypi'].most_common() == [('flask', 1), ('six', 1)]
+        assert pool.stats == {'memory': 1, 'quarantined': 1}
@@ -0,0 +1,97 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test reduce job of sharded runs."""
+import os
+import shutil
+import pytest
+import tempfile
+from unittest import mock
+from unittest.mock import patch
+from src.config.settings import SETTINGS
+from src.collector.base_collector import BaseCollector
+from src.job.shard import get_partial_filename, write_partial
+from src.job.reduce_job import ReduceJob
+
+
+class MockPersistenceStore(mock.Mock):
+    """Mocks persistence storage with objects kept in a local directory."""
+
+    objects = None
+
+    def download_file(self, filename, path):
+        """Copy an object to a local file."""
+        if filename not in self.objects:
+            return False
+        shutil.copyfile(self.objects[filename], path)
+        return True
+
+
+class TestReduceJob:
+    """Reduce job test cases."""
+
+    def _write_partials(self, tmp, shards, count=None):
+        """Write partials with package sets of the first shards of count ones."""
+        count = count or len(shards)
+        objects = {}
+        for index, package_sets in enumerate(shards):
+            collector = BaseCollector('pypi')
+            for packages in package_sets:
+                collector._update_counter(packages)
+
+            path = os.path.join(tmp, str(index))
+            write_partial(path, (index, count), {'pypi': collector})
+            objects[get_partial_filename(SETTINGS.shard_run_id, (index, count))] = path
+        return objects
+
+    @patch('src.job.reduce_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_reduce(self, _ps):
+        """Test counts of all shards are merged into the collated file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            MockPersistenceStore.objects = self._write_partials(tmp, [
+                [['flask'], ['Django', 'boto']],
+                [['boto', 'django'], ['flask']],
+                [['boto', 'django']],
+            ])
+            job = ReduceJob(3, ['pypi'])
+            job.run()
+
+        job.data_store.update.assert_called_once_with(
+            data={'pypi': {'boto, django': 3, 'flask': 2}},
+            bucket_name=mock.ANY,
+            filename='big-query-data/collated.json')
+
+    @patch.object(SETTINGS, 'aggregation_backend', 'topk')
+    @patch('src.job.reduce_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_topk(self, _ps):
+        """Test top-K counts of shards are not merged."""
+        with pytest.raises(Exception) as e:
+            ReduceJob(2, ['pypi'])
+
+        assert str(e.value) == 'Shards are not supported with the topk aggregation backend'
+
+    @patch('src.job.reduce_job.PersistenceStore', new_callable=MockPersistenceStore)
+    def test_missing_partial(self, _ps):
+        """Test a missing partial fails the reduce job without writing the collated file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            MockPersistenceStore.objects = self._write_partials(tmp, [[['flask']]], 2)
+            job = ReduceJob(2, ['pypi'])
+            with pytest.raises(Exception) as e:
+                job.run()
+
+        assert str(e.value) == 'Partial result {} is missing'.format(
+            get_partial_filename(SETTINGS.shard_run_id, (1, 2)))
+        job.data_store.update.assert_not_called()
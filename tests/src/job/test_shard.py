@@ -0,0 +1,64 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test partial results of shards."""
+import os
+import pytest
+import tempfile
+from src.collector.base_collector import BaseCollector
+from src.job.shard import (parse_shard, get_shard_filter, get_partial_filename,
+                           write_partial, read_partial)
+
+
+class TestShard:
+    """Shard test cases."""
+
+    def test_parse_shard(self):
+        """Test shards are parsed from i/N."""
+        assert parse_shard('0/1') == (0, 1)
+        assert parse_shard('3/4') == (3, 4)
+
+        for value in ('4/4', '-1/4', '0/0', '1', 'a/b'):
+            with pytest.raises(ValueError):
+                parse_shard(value)
+
+    def test_shard_filter(self):
+        """Test shard condition and partial names."""
+        assert get_shard_filter((1, 4), 'files.id') == \
+            'MOD(ABS(MOD(FARM_FINGERPRINT(files.id), 4)), 4) = 1'
+        assert get_partial_filename('run', (1, 4)) == \
+            'big-query-data/shards/run/partial-0001-of-0004.jsonl.gz'
+
+    def test_write_and_read_partial(self):
+        """Test package set counts of a partial are read back."""
+        collectors = {'npm': BaseCollector('npm'), 'pypi': BaseCollector('pypi')}
+        collectors['npm']._update_counter(['b', 'a'], 2)
+        collectors['npm']._update_counter(['c'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'partial.jsonl.gz')
+            write_partial(path, (1, 2), collectors)
+
+            assert list(read_partial(path, (1, 2), ['pypi', 'npm'])) == [
+                ('npm', 'a, b', 2), ('npm', 'c', 1)]
+
+            with pytest.raises(Exception) as e:
+                list(read_partial(path, (0, 2), ['npm', 'pypi']))
+            assert str(e.value) == 'Partial of shard 1/2 found instead of 0/2'
+
+            with pytest.raises(Exception) as e:
+                list(read_partial(path, (1, 2), ['npm']))
+            assert str(e.value) == 'Partial of shard 1/2 has ecosystems npm, pypi instead of npm'
@@ -0,0 +1,41 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test base source class."""
+import pytest
+from src.source.base_source import BaseSource
+
+
+class TestBaseSource:
+    """Base source test cases."""
+
+    def test_run(self):
+        """Test missing run implementation."""
+        with pytest.raises(Exception) as e:
+            BaseSource().run('query')
+
+        assert str(e.value) == 'Missing run() method implementation!!'
+
+    def test_get_result(self):
+        """Test missing get result implementation."""
+        with pytest.raises(Exception) as e:
+            BaseSource().get_result()
+
+        assert str(e.value) == 'Missing get_result() method implementation!!'
+
+    def test_supports_query(self):
+        """Test base sources do not run queries."""
+        assert BaseSource.supports_query is False
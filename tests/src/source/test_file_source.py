@@ -0,0 +1,102 @@
+# Copyright © 2020 Red Hat Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Dharmendra G Patel <dhpatel@redhat.com>
+#
+"""Test file source class."""
+import json
+import pytest
+from src.bigquery.spool import SpoolWriter
+from src.source.file_source import FileSource
+
+MANIFESTS = ['pom.xml', 'package.json', 'requirements.txt']
+
+
+class TestFileSource:
+    """File source test cases."""
+
+    def test_missing_path(self):
+        """Test source path that does not exist."""
+        with pytest.raises(Exception) as e:
+            FileSource('tests/data/missing')
+
+        assert str(e.value) == 'Source path tests/data/missing does not exist'
+
+    def test_directory(self):
+        """Test manifests of a directory tree."""
+        source = FileSource('tests/data', MANIFESTS)
+        assert source.run(None) == 'tests/data'
+
+        rows = list(source.get_result())
+        assert [row['path'] for row in rows] == sorted(MANIFESTS)
+        with open('tests/data/pom.xml') as f:
+            assert rows[1]['content'] == f.read()
+
+    def test_start_index(self):
+        """Test rows before the start index are skipped."""
+        rows = list(FileSource('tests/data', MANIFESTS).get_result(None, 2))
+        assert [row['path'] for row in rows] == ['requirements.txt']
+
+    def test_directory_without_filter(self):
+        """Test all files of a directory tree are read without manifest filter."""
+        rows = list(FileSource('tests/data').get_result())
+        assert '__init__.py' in [row['path'] for row in rows]
+
+    def test_nested_directory(self, tmp_path):
+        """Test manifests of nested directories get relative paths."""
+        (tmp_path / 'a' / 'b').mkdir(parents=True)
+        (tmp_path / 'a' / 'b' / 'package.json').write_text('{}')
+        (tmp_path / 'a' / 'README.md').write_text('readme')
+
+        rows = list(FileSource(str(tmp_path), MANIFESTS).get_result())
+        assert rows == [{'path': 'a/b/package.json', 'content': '{}'}]
+
+    def test_jsonl_dump(self, tmp_path):
+        """Test plain JSONL dump."""
+        path = tmp_path / 'rows.jsonl'
+        path.write_text(json.dumps({'path': 'pom.xml', 'content': '<project/>'}) + '\n')
+
+        assert list(FileSource(str(path)).get_result()) == [
+            {'path': 'pom.xml', 'content': '<project/>'}]
+
+    def test_spool_dump(self, tmp_path):
+        """Test compressed spool dump."""
+        path = str(tmp_path / 'rows.jsonl.gz')
+        writer = SpoolWriter(path, 10)
+        list(writer.tee(iter([{'path': 'package.json', 'content': '{}'}])))
+        writer.close()
+
+        assert list(FileSource(path).get_result()) == [{'path': 'package.json', 'content': '{}'}]
+
+    def test_parquet_dump(self, tmp_path):
+        """Test Parquet dump."""
+        pa = pytest.importorskip('pyarrow')
+        pq = pytest.importorskip('pyarrow.parquet')
+        path = str(tmp_path / 'rows.parquet')
+        pq.write_table(pa.table({'path': ['pom.xml', 'package.json'],
+                                 'content': ['<project/>', '{}']}), path)
+
+        assert list(FileSource(path, batch_size=1).get_result()) == [
+            {'path': 'pom.xml', 'content': '<project/>'},
+            {'path': 'package.json', 'content': '{}'}]
+
+    def test_unsupported_file(self, tmp_path):
+        """Test unsupported source file."""
+        path = tmp_path / 'rows.csv'
+        path.write_text('path,content')
+
+        with pytest.raises(Exception) as e:
+            list(FileSource(str(path)).get_result())
+
+        assert str(e.value) == 'Unsupported source file {}'.format(path)
@@ -16,10 +16,11 @@
 #
 """Test main class."""
 import time
+import pytest
 import unittest
 from unittest import mock
 from unittest.mock import patch
-from src.main import main
+from src.main import main, parse_args
 
 
 class MockDataJob(mock.Mock):
@@ -40,3 +41,14 @@ class TestMain(unittest.TestCase):
             main()
         except Exception:
             assert False, 'Exception raised'
+
+    def test_parse_args(self):
+        """Test command line arguments."""
+        assert parse_args([]).source is None
+        assert parse_args(['--source', 'tests/data']).source == 'tests/data'
+        assert parse_args([]).fresh is False
+        assert parse_args(['--fresh']).fresh is True
+        assert parse_args([]).shard is None
+        assert parse_args(['--shard', '2/8']).shard == (2, 8)
+        with pytest.raises(SystemExit):
+            parse_args(['--shard', '8/8'])
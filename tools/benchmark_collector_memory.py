@@ -0,0 +1,71 @@
+"""Measure peak memory of collected package sets on a synthetic corpus.
+
+Package sets are drawn from a skewed vocabulary of package names, the way
+popular dependencies dominate real manifests. Every run is a separate process,
+so that peak RSS of one key layout does not hide the other one.
+
+Usage:
+python3 tools/benchmark_collector_memory.py strings [manifests]
+python3 tools/benchmark_collector_memory.py compact [manifests]
+"""
+
+import os
+import sys
+import random
+import resource
+from itertools import accumulate
+from collections import Counter
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.config.settings import SETTINGS  # noqa: E402
+from src.collector.base_collector import BaseCollector  # noqa: E402
+
+VOCABULARY_SIZE = 200000
+
+
+def get_package_sets(manifests):
+    """Yield package sets of a reproducible synthetic corpus."""
+    rng = random.Random(42)
+    names = ['org.example.group{}:artifact-{}'.format(i % 997, i) for i in range(VOCABULARY_SIZE)]
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in range(VOCABULARY_SIZE)))
+    for _ in range(manifests):
+        yield rng.choices(names, cum_weights=cum_weights, k=rng.randint(1, 30))
+
+
+def collect_strings(package_sets):
+    """Count package sets under comma separated strings."""
+    counter = Counter()
+    for packages in package_sets:
+        counter[', '.join(packages)] += 1
+    return len(counter)
+
+
+def collect_compact(package_sets):
+    """Count package sets under interned compact keys, in document order like the strings."""
+    with patch.object(SETTINGS, 'package_set_order', 'document'):
+        collector = BaseCollector('benchmark')
+    for packages in package_sets:
+        collector._update_counter(packages)
+    return len(collector.counter)
+
+
+def main(arguments):
+    """Collect the corpus with the given key layout and print peak RSS."""
+    if len(arguments) < 2 or arguments[1] not in ('strings', 'compact'):
+        print(__doc__)
+        raise Exception("CLI arguments missing")
+
+    manifests = int(arguments[2]) if len(arguments) > 2 else 1000000
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    collect = collect_strings if arguments[1] == 'strings' else collect_compact
+    keys = collect(get_package_sets(manifests))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print('{}: {} manifests, {} distinct keys, peak RSS {:.1f} MiB ({:.1f} MiB above start)'
+          .format(arguments[1], manifests, keys, peak / 1024, (peak - baseline) / 1024))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
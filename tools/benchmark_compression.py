@@ -0,0 +1,98 @@
+"""Compare output compression codecs on a collated counter dump.
+
+Package sets of a reproducible synthetic corpus are counted by a collector,
+then its most common package sets are serialized and uploaded in parts to a
+local S3 stand-in, uncompressed and with every available codec, like the
+persistence store streams them. The script prints the compressed size and
+ratio, the CPU and wall time of each upload, the time to transfer the object
+at the given bandwidth and the CPU time a reader needs to decompress it.
+
+Usage:
+python3 tools/benchmark_compression.py [manifests] [bandwidth_mib_per_second]
+"""
+
+import os
+import sys
+import gzip
+import time
+import random
+import tempfile
+from contextlib import closing
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.collector.base_collector import BaseCollector  # noqa: E402
+from src.datastore.compression import CONTENT_TYPES, CompressingWriter, zstandard  # noqa: E402
+from src.datastore.json_stream import iter_json_pairs  # noqa: E402
+from src.datastore.local_s3 import LocalS3Client  # noqa: E402
+from src.datastore.multipart import MultipartWriter  # noqa: E402
+
+VOCABULARY_SIZE = 50000
+PART_SIZE = 8 * 1024 * 1024
+
+
+def get_package_sets(manifests):
+    """Yield package sets of a reproducible synthetic corpus."""
+    rng = random.Random(42)
+    names = ['org.example.group{}:artifact-{}'.format(i % 997, i) for i in range(VOCABULARY_SIZE)]
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in range(VOCABULARY_SIZE)))
+    for _ in range(manifests):
+        yield rng.choices(names, cum_weights=cum_weights, k=rng.randint(1, 12))
+
+
+def upload(client, collector, encoding):
+    """Stream the counter dump to the client, returns object name, CPU and wall time."""
+    filename = 'collated.json' + {'': '', 'gzip': '.gz', 'zstd': '.zst'}[encoding]
+    start, start_cpu = time.monotonic(), time.process_time()
+    with MultipartWriter(client, 'bucket', filename, PART_SIZE,
+                         content_type=CONTENT_TYPES[encoding]) as writer:
+        stream = CompressingWriter(writer, encoding) if encoding else writer
+        for chunk in iter_json_pairs(collector.iter_most_common()):
+            stream.write(chunk)
+        if encoding:
+            stream.close()
+    return filename, time.process_time() - start_cpu, time.monotonic() - start
+
+
+def read(client, filename, encoding):
+    """Read the object back like a downstream reader, returns the CPU time taken."""
+    start_cpu = time.process_time()
+    with closing(client.get_object(Bucket='bucket', Key=filename)['Body']) as body:
+        if encoding == 'gzip':
+            body = gzip.GzipFile(fileobj=body)
+        elif encoding == 'zstd':
+            body = zstandard.ZstdDecompressor().stream_reader(body)
+        while body.read(PART_SIZE):
+            pass
+    return time.process_time() - start_cpu
+
+
+def main(arguments):
+    """Upload the dump with every codec and print the results."""
+    manifests = int(arguments[1]) if len(arguments) > 1 else 1000000
+    bandwidth = float(arguments[2]) if len(arguments) > 2 else 20.0
+
+    collector = BaseCollector('maven')
+    for packages in get_package_sets(manifests):
+        collector._update_counter(packages)
+    print('{} manifests, {} distinct package sets, transfer at {} MiB/s'.format(
+        manifests, len(collector.counter), bandwidth))
+
+    encodings = [''] + ['gzip'] + (['zstd'] if zstandard else [])
+    size = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalS3Client(tmp_dir)
+        for encoding in encodings:
+            filename, cpu_time, wall_time = upload(client, collector, encoding)
+            compressed = os.path.getsize(os.path.join(tmp_dir, 'bucket', filename))
+            size = size or compressed
+            print('{:<5} {:>8.1f} MiB  ratio {:>5.2f}  upload cpu {:>6.2f} s wall {:>6.2f} s  '
+                  'transfer {:>6.2f} s  read cpu {:>5.2f} s'.format(
+                      encoding or 'none', compressed / 1024 / 1024, size / compressed,
+                      cpu_time, wall_time, compressed / 1024 / 1024 / bandwidth,
+                      read(client, filename, encoding)))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,77 @@
+"""Compare the approximate top-K aggregation with the exact Counter.
+
+Package sets of a reproducible synthetic corpus are counted by collectors with
+the counter and the topk aggregation backends. The script prints the traced
+peak memory of both, and how well the approximate top-K package sets and
+their counts match the exact ones.
+
+Usage:
+python3 tools/benchmark_heavy_hitters.py [manifests] [top_k] [capacity_factor]
+"""
+
+import os
+import sys
+import random
+import tracemalloc
+from itertools import accumulate
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.config.settings import SETTINGS  # noqa: E402
+from src.collector.base_collector import BaseCollector  # noqa: E402
+
+VOCABULARY_SIZE = 20000
+
+
+def get_package_sets(manifests):
+    """Yield package sets of a reproducible synthetic corpus."""
+    rng = random.Random(42)
+    names = ['package-{}'.format(i) for i in range(VOCABULARY_SIZE)]
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in range(VOCABULARY_SIZE)))
+    for _ in range(manifests):
+        yield rng.choices(names, cum_weights=cum_weights, k=rng.randint(1, 4))
+
+
+def collect(backend, manifests):
+    """Collect the corpus with an aggregation backend, returns collector and peak memory."""
+    with patch.object(SETTINGS, 'aggregation_backend', backend):
+        tracemalloc.start()
+        collector = BaseCollector('benchmark')
+        for packages in get_package_sets(manifests):
+            collector._update_counter(packages)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return collector, peak
+
+
+def main(arguments):
+    """Run both backends and print memory and accuracy."""
+    manifests = int(arguments[1]) if len(arguments) > 1 else 1000000
+    top_k = int(arguments[2]) if len(arguments) > 2 else 1000
+    capacity_factor = float(arguments[3]) if len(arguments) > 3 else 4
+
+    exact, exact_peak = collect('counter', manifests)
+    with patch.object(SETTINGS, 'topk_size', top_k), \
+            patch.object(SETTINGS, 'topk_capacity_factor', capacity_factor):
+        approximate, approximate_peak = collect('topk', manifests)
+
+    exact_counts = dict(exact.most_common())
+    exact_top = {key for key, _ in exact.most_common(top_k)}
+    approximate_top = approximate.most_common()
+    found = sum(1 for key, _ in approximate_top if key in exact_top)
+    overestimates = [count - exact_counts[key] for key, count in approximate_top]
+
+    print('{} manifests, {} distinct package sets, top {} with capacity factor {}'.format(
+        manifests, len(exact_counts), top_k, capacity_factor))
+    print('counter: peak traced memory {:.1f} MiB'.format(exact_peak / 1024 / 1024))
+    print('topk: peak traced memory {:.1f} MiB, {} tracked package sets'.format(
+        approximate_peak / 1024 / 1024, len(approximate.counter)))
+    print('topk: recall of exact top {} is {:.4f}'.format(top_k, found / len(exact_top)))
+    print('topk: max overestimation {}, mean {:.2f}, max error estimate {}'.format(
+        max(overestimates), sum(overestimates) / len(overestimates),
+        max(approximate.get_errors().values())))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,52 @@
+"""Convert package set keys of a collated file to canonical keys.
+
+Collated files written with PACKAGE_SET_ORDER=document count the same package
+set under every order it appeared in. This script merges them under sorted,
+deduplicated keys, the way the job counts them by default, and prints how
+much the number of distinct keys dropped for each ecosystem.
+
+Usage:
+python3 tools/migrate_collated.py collated.json canonical_collated.json
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.collector.base_collector import BaseCollector  # noqa: E402
+
+
+def migrate(data):
+    """Get collated data with package strings of every ecosystem merged under canonical keys."""
+    migrated = {}
+    for ecosystem, counts in data.items():
+        collector = BaseCollector(ecosystem)
+        collector.canonical = True
+        for pkg_string, count in counts.items():
+            collector.collect_package_string(pkg_string, count)
+
+        migrated[ecosystem] = dict(collector.most_common())
+        dropped = len(counts) - len(migrated[ecosystem])
+        print('{}: {} -> {} distinct keys, {} fewer ({:.1f}%)'.format(
+            ecosystem, len(counts), len(migrated[ecosystem]), dropped,
+            100.0 * dropped / len(counts) if counts else 0.0))
+    return migrated
+
+
+def main(arguments):
+    """Read a collated file and write the migrated one."""
+    if len(arguments) <= 2:
+        print(__doc__)
+        raise Exception("CLI arguments missing")
+
+    with open(arguments[1], 'r') as f:
+        data = json.load(f)
+
+    with open(arguments[2], 'w') as f:
+        json.dump(migrate(data), f)
+
+
+if __name__ == "__main__":
+    main(sys.argv)